@@ -19,7 +19,8 @@ def create_educational_assistant():
            - Use task_search_tool with the topic they mentioned
            - Set similarity_threshold to 0.4 (not too strict)
            - Present the actual task titles and descriptions you find
-           - If you don't find enough, lower the threshold to 0.2 and try again
+           - The tool relaxes the threshold to 0.2 by itself if needed (see threshold_used),
+             so never repeat the same search with a lower threshold
 
         2. When someone asks for courses:
            - Use course_search_tool with their topic
@@ -34,12 +35,13 @@ def create_educational_assistant():
            - Then organize the results according to what they asked for
 
         CRITICAL RULES:
-        - Always start with similarity_threshold of 0.4
-        - If no results, try 0.2
-        - If still no results, be honest and suggest alternatives
+        - Always use similarity_threshold of 0.4; the tools fall back to 0.2 automatically
+        - If a search still returns no results, be honest and suggest alternatives
         - Present ACTUAL titles and content from the database
         - Don't make up fake content
         - If user asks for a specific number (like 5 tasks), try to give them that many
+        - For long lists of titles, pass slim=True to task_search_tool / course_search_tool to get short
+          snippets, then use database_query_tool get_items for the items you describe in full
 
         RESPONSE FORMAT:
         - Start with "I found X [tasks/courses/resources] for [topic]"
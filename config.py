@@ -11,8 +11,91 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 EMBEDDING_MODEL = "text-embedding-3-small"
 VECTOR_DIM = 1536
 
+# === EMBEDDING CACHE CONFIG ===
+EMBEDDING_CACHE_SIZE = 2048  # max cached query embeddings per process
+EMBEDDING_CACHE_TTL = 3600  # seconds
+EMBEDDING_STORE_ENABLED = os.getenv('EMBEDDING_STORE_ENABLED', '1') != '0'
+EMBEDDING_STORE_DIR = os.getenv('EMBEDDING_STORE_DIR', '.embedding_store')
+
+# === EMBEDDING BATCHING CONFIG ===
+EMBEDDING_BATCHING_ENABLED = True
+EMBEDDING_BATCH_WINDOW_MS = 10  # how long to collect concurrent requests
+EMBEDDING_BATCH_MAX_SIZE = 64  # dispatch early once this many requests are waiting
+EMBEDDING_BATCH_CONCURRENCY = 4  # batched API calls allowed in flight at once
+
+# === BULK EMBEDDING / SEEDING CONFIG ===
+EMBEDDING_PIPELINE_MAX_TOKENS = 100000  # tokens per embeddings.create call
+EMBEDDING_PIPELINE_MAX_ITEMS = 512  # inputs per embeddings.create call
+EMBEDDING_PIPELINE_CONCURRENCY = 4  # batches embedded in parallel
+EMBEDDING_PIPELINE_MAX_RETRIES = 6
+SEED_INSERT_CHUNK_SIZE = 500  # rows per bulk insert request
+
+# === VECTOR SEARCH CONFIG ===
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'rpc')  # 'rpc' (Supabase match_* functions), 'local' (in-memory index) or 'ann'
+VECTOR_INDEX_REFRESH_SECONDS = 600  # reload local indexes after this long
+VECTOR_INDEX_PAGE_SIZE = 1000  # rows per request when loading local indexes
+
+# === ANN (IVF-PQ) INDEX CONFIG ===
+ANN_INDEX_DIR = os.getenv('ANN_INDEX_DIR', '.ann_index')
+ANN_NLIST = None  # coarse cells; None derives about 4 * sqrt(rows) from the table size
+ANN_PQ_SUBVECTORS = 64  # bytes per compressed vector; must divide VECTOR_DIM
+ANN_TRAIN_SAMPLE = 100000  # vectors used to train the quantizers
+ANN_NPROBE = 16  # cells scanned per query: higher = better recall, slower
+ANN_RERANK = 4  # exact re-rank of match_count * ANN_RERANK candidates (needs ANN_KEEP_VECTORS; 0 disables)
+ANN_KEEP_VECTORS = False  # keep a float16 copy of the vectors for re-ranking (costs 2 * VECTOR_DIM bytes per row)
+ANN_BUILD_RETRY_SECONDS = 300  # wait this long before retrying a failed background index build
+
+# === SLIM SEARCH CONFIG ===
+SLIM_SNIPPET_LENGTH = 160  # characters of description/content returned by slim searches
+
+# === SEARCH RESULT CACHE CONFIG ===
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024  # approximate memory budget for cached results
+SEARCH_CACHE_TTL = 3600  # seconds
+DATA_VERSION_POLL_SECONDS = 30  # how often the background poller re-checks table versions (max id, max updated_at)
+
+# === CATALOG STATS CONFIG ===
+CATALOG_STATS_REFRESH_SECONDS = 300  # background refresh of the cached counts snapshot
+CATALOG_MIRROR_RELOAD_SECONDS = 900  # full reload of the catalog mirror, which is how deleted rows are dropped
+
+# === COMPREHENSIVE SEARCH CONFIG ===
+UNIFIED_SEARCH_RPC = True  # use the match_all SQL function (db_setup/sql/match_all.sql) when installed
+UNIFIED_SEARCH_RETRY_SECONDS = 300  # wait before retrying match_all after it failed
+UNIFIED_SEARCH_TIMEOUT_SHARE = 0.5  # share of the table timeout match_all may use before falling back to per-table searches
+COMPREHENSIVE_SEARCH_WORKERS = 12  # shared threads for parallel table searches
+COMPREHENSIVE_SEARCH_TIMEOUTS = {  # seconds before a table is reported as timed out
+    'courses': 5.0,
+    'tasks': 5.0,
+    'resources': 5.0
+}
+
+# === FAST PATH ROUTER CONFIG ===
+FAST_PATH_ENABLED = True  # answer simple search requests without the crew
+FAST_PATH_SIMILARITY_THRESHOLD = 0.4
+INTENT_CLASSIFIER_ENABLED = True  # embedding fallback when the keyword rules can't decide
+INTENT_MIN_SIMILARITY = 0.45  # best prototype must be at least this similar to the query
+INTENT_MIN_MARGIN = 0.02  # and beat the runner-up intent by this much
+INTENT_RETRY_SECONDS = 300  # wait before embedding the prototypes again after a failure
+
+# === ANSWER CACHE CONFIG ===
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_TTL = 1800  # seconds
+ANSWER_CACHE_SEMANTIC = False  # also reuse answers of queries whose embeddings are this similar
+ANSWER_CACHE_SEMANTIC_CUTOFF = 0.95
+
+# === CREW POOL CONFIG ===
+CREW_POOL_SIZE = int(os.getenv('CREW_POOL_SIZE', '2'))  # pre-built assistant crews (max parallel crew runs)
+CREW_POOL_TIMEOUT = 120  # seconds a query waits for a free crew before giving up
+
+# === WORKER POOL CONFIG ===
+# Threads for blocking coordinator work (crew runs) started from async callers; extra calls queue
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', str(CREW_POOL_SIZE + 2)))
+
 # === AGENT CONFIG ===
 DEFAULT_SIMILARITY_THRESHOLD = 0.7
+# Search tools fetch once at the lowest tier and fall back through these thresholds client-side
+SIMILARITY_THRESHOLD_LADDER = [0.4, 0.2]
 DEFAULT_SEARCH_LIMIT = 5
 MAX_SEARCH_LIMIT = 10
 
@@ -35,4 +118,9 @@ RESOURCE_KEYWORDS = [
 GENERAL_KEYWORDS = [
     'learn', 'study', 'understand', 'explore', 'research', 'find',
     'discover', 'help', 'explain', 'teach', 'knowledge', 'information'
-]
\ No newline at end of file
+]
+
+PLANNING_KEYWORDS = [
+    'plan', 'roadmap', 'schedule', 'timeline', 'week', 'month', 'day', 'become', 'career',
+    'explain', 'why', 'how', 'compare', 'difference', 'should', 'step', 'organize'
+]
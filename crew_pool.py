@@ -0,0 +1,197 @@
+"""
+Pool of pre-built agent/crew workers.
+
+Building the assistant Agent, its Task and the Crew is done once per
+worker instead of once per query. The Task description is a
+template with a ``{user_query}`` placeholder that ``Crew.kickoff(inputs=...)``
+fills in. Each worker runs one query at a time; callers check one out,
+and it is reset before going back to the pool.
+
+Crews are built without crewai memory: its storage is keyed by agent role,
+so every worker would share (and reset) one store, and each query would pay
+for extra embedding calls.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from crewai import Crew, Process, Task
+from agents.educational_assistant import create_educational_assistant
+from config import CREW_POOL_SIZE, CREW_POOL_TIMEOUT
+
+CREW_TASK_DESCRIPTION = """
+            The user asked: "{user_query}"
+
+            Your job is to help them by searching our educational database.
+
+            STEP BY STEP:
+            1. Look at what they're asking for (tasks, courses, resources, plans)
+            2. Use the appropriate search tool to find real content
+            3. Present what you actually find in the database
+            4. If they want a specific number of items, try to provide that many
+            5. If they mention a timeframe, organize accordingly
+
+            SEARCH STRATEGY:
+            - Use similarity_threshold=0.4; the tools already fall back to 0.2 when results are thin
+            - Do not repeat a search with a lower threshold
+            - Use comprehensive_search_tool for broad requests
+            - Use specific tools (task_search_tool, course_search_tool, resource_search_tool) for focused requests
+            - Pass slim=True to task_search_tool and course_search_tool when you only list titles; load
+              full rows with database_query_tool (query_type='get_items') for the items you describe
+
+            BE HELPFUL AND HONEST:
+            - Show actual titles and descriptions from the database
+            - If you don't find much, say so and suggest alternatives
+            - Always offer to help find more or different content
+            """
+
+
+class CrewWorker:
+    """One assistant agent with its task and crew, reused across queries."""
+
+    def __init__(self):
+        self.assistant = create_educational_assistant()
+        self.task = Task(
+            description=CREW_TASK_DESCRIPTION,
+            agent=self.assistant,
+            expected_output="A helpful response with actual database content that addresses the user's specific request"
+        )
+        # No crew memory (see module docstring): each query starts from the task alone
+        self.crew = Crew(
+            agents=[self.assistant],
+            tasks=[self.task],
+            process=Process.sequential,
+            memory=False,
+            verbose=False
+        )
+        self.runs = 0
+
+    def run(self, user_query: str, step_callback=None, task_callback=None) -> str:
+        """Run the crew for one query, optionally reporting each agent step and the finished task."""
+        # Set on the agent too: the crew only copies its callback to agents that have none
+        self.assistant.step_callback = step_callback
+        self.crew.step_callback = step_callback
+        self.crew.task_callback = task_callback
+        self.runs += 1
+        return str(self.crew.kickoff(inputs={'user_query': user_query}))
+
+    def reset(self):
+        """Forget the previous user's conversation before the worker is reused."""
+        self.assistant.step_callback = None
+        self.crew.step_callback = None
+        self.crew.task_callback = None
+        self.task.output = None
+
+
+def describe_step(step):
+    """One progress line for an agent step (tool calls only), or None."""
+    tool = getattr(step, 'tool', None)
+    if not tool:
+        return None
+    tool_input = str(getattr(step, 'tool_input', '') or '')
+    if len(tool_input) > 80:
+        tool_input = tool_input[:80] + '...'
+    return f"🔎 Using {tool}: {tool_input}" if tool_input else f"🔎 Using {tool}"
+
+
+class ProgressReporter:
+    """Turns crew step/task callbacks into progressively longer text for a progress(text) callback."""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.lines = ["🤖 Working on it..."]
+
+    def step(self, step):
+        """Crew step_callback: add a line per tool call."""
+        line = describe_step(step)
+        if line:
+            self.lines.append(line)
+            self._emit('\n'.join(self.lines))
+
+    def task(self, output):
+        """Crew task_callback: show the finished answer as soon as the task completes."""
+        text = getattr(output, 'raw', None) or str(output)
+        if text:
+            self._emit(text)
+
+    def _emit(self, text: str):
+        try:
+            self.progress(text)
+        except Exception as e:
+            print(f"Progress callback failed: {e}")
+
+
+class CrewPool:
+    """Fixed-size pool of CrewWorkers with checkout wait-time metrics."""
+
+    def __init__(self, size: int = CREW_POOL_SIZE, timeout: float = CREW_POOL_TIMEOUT, factory=CrewWorker):
+        self.size = size
+        self.timeout = timeout
+        self.factory = factory
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(factory())
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "in_use": 0,
+            "waiting": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "rebuilds": 0
+        }
+
+    def _count(self, **changes):
+        """Apply counter increments under the metrics lock."""
+        with self._metrics_lock:
+            for name, delta in changes.items():
+                self._metrics[name] += delta
+
+    @contextmanager
+    def worker(self, timeout: float = None):
+        """Check out an idle worker for the duration of the block (raises queue.Empty on timeout)."""
+        started = time.perf_counter()
+        self._count(waiting=1)
+        try:
+            worker = self._idle.get(timeout=self.timeout if timeout is None else timeout)
+        except queue.Empty:
+            self._count(waiting=-1, timeouts=1)
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            self._metrics["waiting"] -= 1
+            self._metrics["in_use"] += 1
+            self._metrics["checkouts"] += 1
+            self._metrics["total_wait_ms"] += wait_ms
+            self._metrics["max_wait_ms"] = max(self._metrics["max_wait_ms"], wait_ms)
+
+        try:
+            yield worker
+        finally:
+            try:
+                worker.reset()
+            except Exception as e:
+                print(f"Crew worker reset failed, rebuilding it: {e}")
+                worker = self.factory()
+                self._count(rebuilds=1)
+            self._count(in_use=-1)
+            self._idle.put(worker)
+
+    def stats(self) -> dict:
+        """Return pool occupancy and checkout wait-time metrics."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics["checkouts"]
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": metrics["in_use"],
+            "waiting": metrics["waiting"],
+            "checkouts": checkouts,
+            "timeouts": metrics["timeouts"],
+            "rebuilds": metrics["rebuilds"],
+            "avg_wait_ms": round(metrics["total_wait_ms"] / checkouts, 2) if checkouts else 0.0,
+            "max_wait_ms": round(metrics["max_wait_ms"], 2)
+        }
@@ -1,27 +1,12 @@
-import openai
 import random
 from supabase import create_client
 from tqdm import tqdm
 import json
-import time
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
+from config import SUPABASE_URL, SUPABASE_KEY, VECTOR_DIM, SEED_INSERT_CHUNK_SIZE
+from services import embedding_pipeline
 
-# Initialize clients
+# Initialize client
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def embed_text(text: str):
-    """Generate embedding for text with error handling."""
-    try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return [0.0] * 1536  # fallback dummy embedding
 
 
 def safe_insert(table_name, data):
@@ -34,6 +19,23 @@ def safe_insert(table_name, data):
         return None
 
 
+def safe_bulk_insert(table_name, rows, chunk_size: int = SEED_INSERT_CHUNK_SIZE):
+    """Insert rows in chunks, falling back to row-by-row inserts for a chunk that fails."""
+    inserted = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            result = supabase.table(table_name).insert(chunk).execute()
+            inserted.extend(result.data or [])
+        except Exception as e:
+            print(f"Bulk insert failed for {table_name} rows {start}-{start + len(chunk) - 1}: {e}")
+            for row in chunk:
+                result = safe_insert(table_name, row)
+                if result:
+                    inserted.append(result)
+    return inserted
+
+
 # Course definitions with detailed content
 COURSES_DATA = {
     "Machine Learning": {
@@ -540,32 +542,40 @@ COURSES_DATA = {
 }
 
 
+def embed_records(texts, desc):
+    """Embed texts with the batched pipeline, using the dummy fallback for failures."""
+    with tqdm(total=len(set(texts)), desc=desc) as progress:
+        embeddings = embedding_pipeline.embed_texts(texts, progress=progress.update)
+    return [embedding or [0.0] * VECTOR_DIM for embedding in embeddings]
+
+
 def create_courses():
     """Create the 5 main courses."""
     print("🎓 Creating courses...")
     course_ids = {}
 
-    for course_name, course_data in COURSES_DATA.items():
-        print(f"Creating course: {course_name}")
-
-        # Generate embedding for course description
-        embedding = embed_text(f"{course_name} {course_data['description']}")
+    course_names = list(COURSES_DATA)
+    embeddings = embed_records(
+        [f"{course_name} {COURSES_DATA[course_name]['description']}" for course_name in course_names],
+        "Course embeddings"
+    )
 
-        course_record = {
+    course_records = [
+        {
             "title": course_name,
-            "description": course_data["description"],
+            "description": COURSES_DATA[course_name]["description"],
             "embedding": embedding
         }
+        for course_name, embedding in zip(course_names, embeddings)
+    ]
 
-        result = safe_insert("courses", course_record)
-        if result:
-            course_ids[course_name] = result["id"]
-            print(f"✅ Created course: {course_name} (ID: {result['id']})")
-        else:
-            print(f"❌ Failed to create course: {course_name}")
+    for result in safe_bulk_insert("courses", course_records):
+        course_ids[result["title"]] = result["id"]
+        print(f"✅ Created course: {result['title']} (ID: {result['id']})")
 
-        # Small delay to avoid rate limiting
-        time.sleep(0.1)
+    for course_name in course_names:
+        if course_name not in course_ids:
+            print(f"❌ Failed to create course: {course_name}")
 
     return course_ids
 
@@ -574,63 +584,50 @@ def create_tasks(course_ids):
     """Create tasks for each course."""
     print("\n📝 Creating tasks...")
 
+    task_records = []
     for course_name, course_id in course_ids.items():
-        print(f"Creating tasks for {course_name}...")
-
         tasks_data = COURSES_DATA[course_name]["tasks"]
 
-        for i, task_content in enumerate(tqdm(tasks_data, desc=f"Tasks for {course_name}")):
+        for i, task_content in enumerate(tasks_data):
             task_title = f"Task {i + 1}: {task_content.split()[0:5]}"  # First 5 words as title
             task_title = " ".join(task_title[1:])  # Remove "Task X:"
 
-            # Generate embedding for task
-            embedding = embed_text(f"{task_title} {task_content}")
-
-            task_record = {
+            task_records.append({
                 "title": task_title,
                 "content": task_content,
-                "course_id": course_id,
-                "embedding": embedding
-            }
+                "course_id": course_id
+            })
 
-            result = safe_insert("tasks", task_record)
-            if not result:
-                print(f"❌ Failed to create task: {task_title}")
+    embeddings = embed_records([f"{task['title']} {task['content']}" for task in task_records], "Task embeddings")
+    for task_record, embedding in zip(task_records, embeddings):
+        task_record["embedding"] = embedding
 
-            # Small delay every 10 tasks
-            if i % 10 == 0:
-                time.sleep(0.1)
+    inserted = safe_bulk_insert("tasks", task_records)
+    print(f"✅ Created {len(inserted)}/{len(task_records)} tasks")
 
 
 def create_resources(course_ids):
     """Create resources for each course."""
     print("\n📚 Creating resources...")
 
+    resource_records = []
+    texts_for_embedding = []
     for course_name, course_id in course_ids.items():
-        print(f"Creating resources for {course_name}...")
-
-        resources_data = COURSES_DATA[course_name]["resources"]
-
-        for i, resource_data in enumerate(tqdm(resources_data, desc=f"Resources for {course_name}")):
-            # Generate embedding for resource
-            text_for_embedding = f"{resource_data['title']} {' '.join(resource_data['tags'])}"
-            embedding = embed_text(text_for_embedding)
-
-            resource_record = {
+        for resource_data in COURSES_DATA[course_name]["resources"]:
+            texts_for_embedding.append(f"{resource_data['title']} {' '.join(resource_data['tags'])}")
+            resource_records.append({
                 "title": resource_data["title"],
                 "url": resource_data["url"],
                 "tags": resource_data["tags"],
-                "course_id": course_id,
-                "embedding": embedding
-            }
+                "course_id": course_id
+            })
 
-            result = safe_insert("resources", resource_record)
-            if not result:
-                print(f"❌ Failed to create resource: {resource_data['title']}")
+    embeddings = embed_records(texts_for_embedding, "Resource embeddings")
+    for resource_record, embedding in zip(resource_records, embeddings):
+        resource_record["embedding"] = embedding
 
-            # Small delay every 10 resources
-            if i % 10 == 0:
-                time.sleep(0.1)
+    inserted = safe_bulk_insert("resources", resource_records)
+    print(f"✅ Created {len(inserted)}/{len(resource_records)} resources")
 
 
 def verify_data():
@@ -0,0 +1,33 @@
+-- Per-course task and resource counts in a single grouped query.
+--
+-- Returns one row per course plus one final row with course_id = null that
+-- counts tasks/resources not attached to any existing course, so the sums of
+-- task_count and resource_count are the table totals.
+--
+-- Usage (supabase-py):
+--   supabase.rpc('course_content_counts', {}).execute()
+
+create or replace function course_content_counts()
+returns table (course_id bigint, title text, task_count bigint, resource_count bigint)
+language sql stable
+as $$
+    with task_counts as (
+        select tasks.course_id, count(*) as n from tasks group by tasks.course_id
+    ),
+    resource_counts as (
+        select resources.course_id, count(*) as n from resources group by resources.course_id
+    )
+    select * from (
+        select courses.id, courses.title, coalesce(task_counts.n, 0), coalesce(resource_counts.n, 0)
+        from courses
+        left join task_counts on task_counts.course_id = courses.id
+        left join resource_counts on resource_counts.course_id = courses.id
+        order by courses.id
+    ) per_course
+    union all
+    select null, null,
+           (select count(*) from tasks
+            where not exists (select 1 from courses where courses.id = tasks.course_id)),
+           (select count(*) from resources
+            where not exists (select 1 from courses where courses.id = resources.course_id));
+$$;
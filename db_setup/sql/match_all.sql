@@ -0,0 +1,67 @@
+-- Unified vector search across courses, tasks and resources in one round trip.
+--
+-- Returns a JSON object {"courses": [...], "tasks": [...], "resources": [...]}
+-- whose rows have the same columns as match_courses / match_tasks /
+-- match_resources. Tables not listed in include_tables come back as [].
+-- When snippet_length is given, courses.description and tasks.content are
+-- cut to that many characters on the server.
+--
+-- Usage (supabase-py):
+--   supabase.rpc('match_all', {
+--       'query_embedding': embedding, 'match_threshold': 0.4,
+--       'course_count': 3, 'task_count': 5, 'resource_count': 3,
+--       'include_tables': ['courses', 'tasks']
+--   }).execute()
+
+create or replace function match_all(
+    query_embedding vector(1536),
+    match_threshold float,
+    course_count int default 3,
+    task_count int default 3,
+    resource_count int default 3,
+    include_tables text[] default array['courses', 'tasks', 'resources'],
+    snippet_length int default null
+)
+returns jsonb
+language sql stable
+as $$
+    select jsonb_build_object(
+        'courses', case when 'courses' = any(include_tables) then coalesce((
+            select jsonb_agg(to_jsonb(c) order by c.similarity desc)
+            from (
+                select courses.id, courses.title,
+                       coalesce(left(courses.description, snippet_length), courses.description) as description,
+                       1 - (courses.embedding <=> query_embedding) as similarity
+                from courses
+                where 1 - (courses.embedding <=> query_embedding) > match_threshold
+                order by courses.embedding <=> query_embedding
+                limit course_count
+            ) c
+        ), '[]'::jsonb) else '[]'::jsonb end,
+
+        'tasks', case when 'tasks' = any(include_tables) then coalesce((
+            select jsonb_agg(to_jsonb(t) order by t.similarity desc)
+            from (
+                select tasks.id, tasks.title,
+                       coalesce(left(tasks.content, snippet_length), tasks.content) as content, tasks.course_id,
+                       1 - (tasks.embedding <=> query_embedding) as similarity
+                from tasks
+                where 1 - (tasks.embedding <=> query_embedding) > match_threshold
+                order by tasks.embedding <=> query_embedding
+                limit task_count
+            ) t
+        ), '[]'::jsonb) else '[]'::jsonb end,
+
+        'resources', case when 'resources' = any(include_tables) then coalesce((
+            select jsonb_agg(to_jsonb(r) order by r.similarity desc)
+            from (
+                select resources.id, resources.title, resources.url, resources.tags, resources.course_id,
+                       1 - (resources.embedding <=> query_embedding) as similarity
+                from resources
+                where 1 - (resources.embedding <=> query_embedding) > match_threshold
+                order by resources.embedding <=> query_embedding
+                limit resource_count
+            ) r
+        ), '[]'::jsonb) else '[]'::jsonb end
+    );
+$$;
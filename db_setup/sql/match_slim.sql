@@ -0,0 +1,43 @@
+-- Slim ("projection") variants of match_courses and match_tasks.
+--
+-- Same signature and columns as the full functions plus snippet_length:
+-- long text columns (courses.description, tasks.content) are cut to
+-- snippet_length characters on the server, so large rows never cross the
+-- wire. Fetch full rows afterwards by id when they are actually needed.
+-- Resources have no long text column, so match_resources is already slim.
+
+create or replace function match_courses_slim(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int,
+    snippet_length int default 160
+)
+returns table (id bigint, title text, description text, similarity float)
+language sql stable
+as $$
+    select courses.id, courses.title, left(courses.description, snippet_length),
+           1 - (courses.embedding <=> query_embedding) as similarity
+    from courses
+    where 1 - (courses.embedding <=> query_embedding) > match_threshold
+    order by courses.embedding <=> query_embedding
+    limit match_count;
+$$;
+
+create or replace function match_tasks_slim(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int,
+    course_filter bigint default null,
+    snippet_length int default 160
+)
+returns table (id bigint, title text, content text, course_id bigint, similarity float)
+language sql stable
+as $$
+    select tasks.id, tasks.title, left(tasks.content, snippet_length), tasks.course_id,
+           1 - (tasks.embedding <=> query_embedding) as similarity
+    from tasks
+    where 1 - (tasks.embedding <=> query_embedding) > match_threshold
+      and (course_filter is null or tasks.course_id = course_filter)
+    order by tasks.embedding <=> query_embedding
+    limit match_count;
+$$;
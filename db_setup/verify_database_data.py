@@ -2,25 +2,11 @@
 Script to verify the dummy data in the database and test the search functions.
 """
 from supabase import create_client
-import openai
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
+from config import SUPABASE_URL, SUPABASE_KEY
+from services.embedding_service import embed_query
 
-# Initialize clients
+# Initialize client
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def embed_query(text: str):
-    """Generate embedding for search query."""
-    try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return []
 
 
 def check_data_counts():
@@ -0,0 +1,353 @@
+"""
+Deterministic fast path for simple requests.
+
+Rules plus slot extraction (topic, count, content type, optional course)
+turn requests like "give me 5 blockchain tasks" into a direct search tool
+call and a templated answer. When the keyword rules can't decide, the query
+embedding is compared against intent prototypes (services/intent_classifier.py);
+the search then reuses that cached embedding. Anything open-ended (learning
+plans, timeframes, explanations) returns None so the coordinator hands it to the crew.
+``aroute`` does the same for async callers through the tools' ``_arun``.
+"""
+import asyncio
+import json
+import re
+
+from config import (COURSE_KEYWORDS, TASK_KEYWORDS, RESOURCE_KEYWORDS, GENERAL_KEYWORDS, PLANNING_KEYWORDS,
+                    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, FAST_PATH_SIMILARITY_THRESHOLD, INTENT_CLASSIFIER_ENABLED)
+from services.embedding_service import embed_query, aembed_query
+from services.intent_classifier import intent_classifier
+from services.query_parsing import STOPWORDS, tokenize, numbers_to_digits, extract_count
+from tools.course_search_tool import course_search_tool
+from tools.task_search_tool import task_search_tool
+from tools.resource_search_tool import resource_search_tool
+from tools.comprehensive_search_tool import comprehensive_search_tool
+from tools.database_query_tool import database_query_tool
+
+CONTENT_KEYWORDS = {
+    'courses': COURSE_KEYWORDS,
+    'tasks': TASK_KEYWORDS,
+    'resources': RESOURCE_KEYWORDS
+}
+
+SEARCH_TOOLS = {
+    'courses': course_search_tool,
+    'tasks': task_search_tool,
+    'resources': resource_search_tool
+}
+
+_COURSE_REFERENCE = re.compile(r"\bcourse\s*(?:id\s*)?(?:#|no\.?|number\s*)?\s*(\d+)\b")
+
+
+def _mentions(tokens, text: str, keywords) -> bool:
+    """True if any keyword (or its plural) appears in the query."""
+    words = set(tokens)
+    for keyword in keywords:
+        if ' ' in keyword:
+            if keyword in text:
+                return True
+        elif keyword in words or keyword + 's' in words or keyword + 'es' in words:
+            return True
+    return False
+
+
+ALL_KEYWORDS = COURSE_KEYWORDS + TASK_KEYWORDS + RESOURCE_KEYWORDS + GENERAL_KEYWORDS
+
+# Multi-word keywords are cut out of the text before the topic is taken
+KEYWORD_PHRASES = [keyword for keyword in ALL_KEYWORDS if ' ' in keyword]
+
+FILLER_WORDS = STOPWORDS | {
+    form for keyword in ALL_KEYWORDS if ' ' not in keyword for form in (keyword, keyword + 's', keyword + 'es')
+} | {'how', 'many', 'count', 'number', 'total', 'id', 'create', 'make', 'new', 'free', 'online', 'example',
+     'examples'}
+
+
+def extract_slots(user_query: str) -> dict:
+    """Pull the content types, topic, count and course reference out of a query."""
+    text = user_query.lower()
+
+    course_match = _COURSE_REFERENCE.search(text)
+    course_id = int(course_match.group(1)) if course_match else None
+    if course_match:
+        text = text[:course_match.start()] + ' ' + text[course_match.end():]
+
+    tokens = tokenize(text)
+    content_types = [name for name, keywords in CONTENT_KEYWORDS.items() if _mentions(tokens, text, keywords)]
+
+    topic_text = numbers_to_digits(text)
+    for phrase in KEYWORD_PHRASES:
+        topic_text = topic_text.replace(phrase, ' ')
+    topic_words = [token for token in tokenize(topic_text) if token not in FILLER_WORDS and not token.isdigit()]
+
+    return {
+        'content_types': content_types,
+        'topic': ' '.join(topic_words),
+        'count': extract_count(text),
+        'course_id': course_id,
+        'general': _mentions(tokens, text, GENERAL_KEYWORDS),
+        'planning': _mentions(tokens, text, PLANNING_KEYWORDS),
+        'how_many': 'how many' in text or text.startswith('count ')
+    }
+
+
+def classify(user_query: str):
+    """Return (intent, slots); intent is None when the request needs the crew."""
+    slots = extract_slots(user_query)
+    content_types = slots['content_types']
+
+    if slots['how_many'] and not slots['topic']:
+        return ('course_count' if slots['course_id'] is not None else 'count'), slots
+
+    if content_types == ['courses'] and not slots['topic'] and slots['course_id'] is None:
+        return 'list_courses', slots
+
+    if slots['planning'] or not slots['topic']:
+        return None, slots
+
+    if len(content_types) == 1:
+        return 'find_' + content_types[0], slots
+
+    if len(content_types) > 1 or not slots['general']:
+        return 'find_all', slots
+
+    return None, slots
+
+
+class QueryRouter:
+    """Answers simple requests directly from the tools; returns None for everything else."""
+
+    def __init__(self):
+        self.fast_path_answers = 0
+        self.fallbacks = 0
+        self.embedding_routes = 0
+
+    def answer(self, user_query: str):
+        """Return a templated answer, or None if the crew should handle the query."""
+        return self.route(user_query)[1]
+
+    def route(self, user_query: str):
+        """Return (intent, answer); answer is None if the crew should handle the query."""
+        intent, slots = classify(user_query)
+        if self._needs_embedding(intent, slots):
+            intent = self.classify_by_embedding(user_query, slots)
+
+        response = None
+        if intent is not None:
+            response = self.handle(intent, slots)
+        return intent, self._count_route(response)
+
+    async def aroute(self, user_query: str):
+        """Async route."""
+        intent, slots = classify(user_query)
+        if self._needs_embedding(intent, slots):
+            intent = await self.aclassify_by_embedding(user_query, slots)
+
+        response = None
+        if intent is not None:
+            response = await self.ahandle(intent, slots)
+        return intent, self._count_route(response)
+
+    def _needs_embedding(self, intent, slots: dict) -> bool:
+        """True when the rules couldn't decide but the query has a topic worth classifying."""
+        return intent is None and INTENT_CLASSIFIER_ENABLED and bool(slots['topic']) and not slots['planning']
+
+    def _count_route(self, response):
+        """Count a fast-path answer or a fallback to the crew; returns response."""
+        if response is None:
+            self.fallbacks += 1
+        else:
+            self.fast_path_answers += 1
+        return response
+
+    def classify_by_embedding(self, user_query: str, slots: dict):
+        """Pick an intent from the query embedding; None for learning plans or unclear queries."""
+        try:
+            return self._embedding_intent(user_query, slots, embed_query(user_query))
+        except Exception as e:
+            print(f"Intent classification failed: {e}")
+            return None
+
+    async def aclassify_by_embedding(self, user_query: str, slots: dict):
+        """Async classify_by_embedding."""
+        try:
+            # The classifier may have to embed its prototypes (blocking, with retries) on first use
+            return await asyncio.to_thread(self._embedding_intent, user_query, slots, await aembed_query(user_query))
+        except Exception as e:
+            print(f"Intent classification failed: {e}")
+            return None
+
+    def _embedding_intent(self, user_query: str, slots: dict, query_embedding):
+        if not query_embedding:
+            return None
+        intent, _ = intent_classifier.classify(query_embedding)
+        if intent is None or intent == 'learning_plan':
+            return None
+        self.embedding_routes += 1
+        # Search with the full query: its embedding is already cached, so no extra API call
+        slots['search_query'] = user_query
+        return intent
+
+    def handle(self, intent: str, slots: dict):
+        """Run the handler for intent; None means the handler could not answer."""
+        if intent == 'count':
+            return self._count(slots)
+        if intent == 'course_count':
+            return self._course_count(slots)
+        if intent == 'list_courses':
+            return self._list_courses()
+        if intent == 'find_all':
+            return self._find_all(slots)
+        if intent.startswith('find_'):
+            return self._find(intent[len('find_'):], slots)
+        return None
+
+    async def ahandle(self, intent: str, slots: dict):
+        """Async handle; counts and course listings come from in-memory snapshots, off the loop just in case."""
+        if intent == 'count':
+            return await asyncio.to_thread(self._count, slots)
+        if intent == 'course_count':
+            return await asyncio.to_thread(self._course_count, slots)
+        if intent == 'list_courses':
+            return await asyncio.to_thread(self._list_courses)
+        if intent == 'find_all':
+            return await self._afind_all(slots)
+        if intent.startswith('find_'):
+            return await self._afind(intent[len('find_'):], slots)
+        return None
+
+    def _count(self, slots: dict):
+        """Catalog totals from the stats snapshot, for the content types asked about (all by default)."""
+        try:
+            result = database_query_tool._run('count_all')
+            data = json.loads(result)
+            counts = {name: data[f'total_{name}'] for name in ('courses', 'tasks', 'resources')}
+            return (f"📊 We have {render_counts(counts, slots['content_types'])} in our database.\n"
+                    f"_(updated {int(data['snapshot_age_seconds'])}s ago)_")
+        except Exception as e:
+            return f"I had trouble checking the database: {e}"
+
+    def _course_count(self, slots: dict):
+        """Task and resource counts of one course, from the catalog mirror."""
+        try:
+            result = database_query_tool._run('course_details', course_id=slots['course_id'])
+            try:
+                data = json.loads(result)
+            except ValueError:
+                return result  # e.g. "Course with ID 7 not found."
+            summary = data['content_summary']
+            counts = {'tasks': summary['total_tasks'], 'resources': summary['total_resources']}
+            requested = [name for name in slots['content_types'] if name in counts]
+            course = data['course_details']
+            return f"📊 **{course['title']}** (course {course['id']}) has {render_counts(counts, requested)}."
+        except Exception as e:
+            return f"I had trouble checking the database: {e}"
+
+    def _list_courses(self):
+        """First page of the course catalog."""
+        try:
+            result = database_query_tool._run('list_courses', limit=10)
+            data = json.loads(result)
+            response = f"📚 **Our {data['total_courses']} courses:**\n\n"
+            for i, course in enumerate(data['courses'], 1):
+                response += f"{i}. **{course['title']}**\n   {course['description'][:100]}...\n\n"
+            return response
+        except Exception as e:
+            return f"I had trouble listing courses: {e}"
+
+    def _find(self, content_type: str, slots: dict):
+        """Search one table and render the matches."""
+        count, params = self._find_params(content_type, slots)
+        return self._render_find(content_type, slots, SEARCH_TOOLS[content_type]._run(**params), count)
+
+    async def _afind(self, content_type: str, slots: dict):
+        """Async _find."""
+        count, params = self._find_params(content_type, slots)
+        return self._render_find(content_type, slots, await SEARCH_TOOLS[content_type]._arun(**params), count)
+
+    def _find_params(self, content_type: str, slots: dict):
+        """Return (count, search tool parameters)."""
+        count = min(slots['count'] or DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+        params = {'query': slots.get('search_query') or slots['topic'], 'limit': count, 'similarity_threshold': FAST_PATH_SIMILARITY_THRESHOLD}
+        if content_type != 'courses' and slots['course_id'] is not None:
+            params['course_id'] = slots['course_id']
+        if content_type != 'resources':
+            params['slim'] = True  # only a snippet is shown
+        return count, params
+
+    def _render_find(self, content_type: str, slots: dict, result: str, count: int):
+        try:
+            items = json.loads(result)[content_type]
+        except ValueError:
+            if result.startswith('No '):
+                return render_not_found(content_type, slots['topic'])
+            return None  # tool error: let the crew try
+
+        return render_items(content_type, slots['topic'], items, count)
+
+    def _find_all(self, slots: dict):
+        """Search every table and render a short overview."""
+        count = min(slots['count'] or 3, MAX_SEARCH_LIMIT)
+        result = comprehensive_search_tool._run(query=slots.get('search_query') or slots['topic'],
+                                                limit_per_table=count,
+                                                similarity_threshold=FAST_PATH_SIMILARITY_THRESHOLD)
+        return self._render_find_all(slots, result)
+
+    async def _afind_all(self, slots: dict):
+        """Async _find_all."""
+        count = min(slots['count'] or 3, MAX_SEARCH_LIMIT)
+        result = await comprehensive_search_tool._arun(query=slots.get('search_query') or slots['topic'],
+                                                       limit_per_table=count,
+                                                       similarity_threshold=FAST_PATH_SIMILARITY_THRESHOLD)
+        return self._render_find_all(slots, result)
+
+    def _render_find_all(self, slots: dict, result: str):
+        try:
+            data = json.loads(result)
+        except ValueError:
+            return None
+
+        if not data['total_results']:
+            return render_not_found('content', slots['topic'])
+
+        sections = [f"I found {data['total_results']} items for **{slots['topic']}** in our database.\n"]
+        for content_type in ('courses', 'tasks', 'resources'):
+            if data[content_type]:
+                sections.append(f"**{content_type.capitalize()}:**\n" + render_list(content_type, data[content_type]))
+        sections.append("Would you like more of any of these, or a learning plan built from them?")
+        return '\n'.join(sections)
+
+
+def render_counts(counts: dict, requested) -> str:
+    """'**3 tasks** and **2 resources**' for the requested content types, or for every type in counts."""
+    parts = [f"**{counts[name]} {name}**" for name in (requested or counts)]
+    return parts[0] if len(parts) == 1 else ', '.join(parts[:-1]) + ' and ' + parts[-1]
+
+
+def render_list(content_type: str, items) -> str:
+    """Numbered list of titles with a short description, content or link."""
+    lines = []
+    for i, item in enumerate(items, 1):
+        lines.append(f"{i}. **{item['title']}**")
+        detail = item.get('url') if content_type == 'resources' else item.get('description') or item.get('content')
+        if detail:
+            lines.append(f"   {detail[:150] + '...' if len(detail) > 150 else detail}")
+    return '\n'.join(lines) + '\n'
+
+
+def render_items(content_type: str, topic: str, items, requested: int) -> str:
+    """Templated answer for a single-table search."""
+    others = ' and '.join(name for name in ('courses', 'tasks', 'resources') if name != content_type)
+    found = f"I found {len(items)} {content_type} for **{topic}**"
+    if len(items) < requested:
+        found += f" (you asked for {requested}, this is everything that matched)"
+    return (f"{found}:\n\n{render_list(content_type, items)}\n"
+            f"Would you like to see more {content_type}, or are you interested in {topic} {others} too?")
+
+
+def render_not_found(content_type: str, topic: str) -> str:
+    """Templated answer when a search came back empty."""
+    return (f"I couldn't find any {content_type} for **{topic}** in our database. "
+            f"Try a broader or related topic, or ask me for a learning plan and I'll look across everything.")
+
+
+query_router = QueryRouter()
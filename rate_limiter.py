@@ -0,0 +1,131 @@
+"""
+Admission control for the Telegram bot.
+
+Every user has two token buckets, refilled continuously: one holding
+``MAX_REQUESTS_PER_MINUTE`` tokens, refilled over a minute, and one holding
+``MAX_REQUESTS_PER_HOUR`` tokens, refilled over an hour. A request takes a
+token from both. The buckets of one user are a single slotted record, and
+users whose buckets have refilled completely are pruned, since a full bucket
+is the same as no record. Pruning runs when the number of tracked users
+doubles (starting at ``PRUNE_THRESHOLD``), so its cost is amortized.
+
+Separately, ``MAX_CONCURRENT_REQUESTS`` caps the requests in progress across
+all users; anything beyond it is shed immediately instead of queueing behind
+the crews. The bot takes a slot only once the update's turn in its chat has
+come, so a user with many queued messages holds at most one slot, and a shed
+request's rate-limit token is refunded.
+"""
+import threading
+import time
+
+from telegram_config import MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_HOUR, MAX_CONCURRENT_REQUESTS
+
+# Prune refilled users once this many are tracked (then again each time the count doubles)
+PRUNE_THRESHOLD = 1000
+
+RATE_LIMITED = 'rate_limited'
+OVERLOADED = 'overloaded'
+
+
+class _UserBuckets:
+    """Minute and hour buckets of one user."""
+
+    __slots__ = ("minute", "hour", "updated")
+
+    def __init__(self, minute: float, hour: float, updated: float):
+        self.minute = minute
+        self.hour = hour
+        self.updated = updated
+
+
+class RateLimiter:
+    """Per-user token buckets plus a global cap on requests in progress."""
+
+    def __init__(self, per_minute: int = MAX_REQUESTS_PER_MINUTE, per_hour: int = MAX_REQUESTS_PER_HOUR,
+                 max_concurrent: int = MAX_CONCURRENT_REQUESTS, exempt_users=()):
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self.max_concurrent = max_concurrent
+        self.exempt_users = set(exempt_users)
+        self._minute_rate = per_minute / 60.0
+        self._hour_rate = per_hour / 3600.0
+        self._users = {}
+        self._prune_at = PRUNE_THRESHOLD
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_overload = 0
+
+    def _refill(self, buckets: _UserBuckets, now: float):
+        """Add the tokens earned since the last update. Caller holds the lock."""
+        elapsed = now - buckets.updated
+        buckets.minute = min(self.per_minute, buckets.minute + elapsed * self._minute_rate)
+        buckets.hour = min(self.per_hour, buckets.hour + elapsed * self._hour_rate)
+        buckets.updated = now
+
+    def check(self, user_id: int):
+        """Take a token from the user's buckets: None if allowed, else RATE_LIMITED."""
+        if user_id in self.exempt_users:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._users.get(user_id)
+            if buckets is None:
+                if len(self._users) >= self._prune_at:
+                    self._prune(now)
+                buckets = self._users[user_id] = _UserBuckets(self.per_minute, self.per_hour, now)
+            else:
+                self._refill(buckets, now)
+
+            if buckets.minute < 1 or buckets.hour < 1:
+                self.rejected_rate += 1
+                return RATE_LIMITED
+            buckets.minute -= 1
+            buckets.hour -= 1
+            return None
+
+    def refund(self, user_id: int):
+        """Give back the token taken by check() for a request that was not handled (e.g. shed)."""
+        with self._lock:
+            buckets = self._users.get(user_id)
+            if buckets is not None:
+                buckets.minute = min(self.per_minute, buckets.minute + 1)
+                buckets.hour = min(self.per_hour, buckets.hour + 1)
+
+    def acquire(self):
+        """Take a global in-progress slot: None if taken (call release() when done), else OVERLOADED."""
+        with self._lock:
+            if self._in_flight >= self.max_concurrent:
+                self.rejected_overload += 1
+                return OVERLOADED
+            self._in_flight += 1
+            self.admitted += 1
+            return None
+
+    def release(self):
+        """Give back a slot taken by acquire()."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def _prune(self, now: float):
+        """Forget users whose buckets have refilled completely. Caller holds the lock."""
+        for user_id, buckets in list(self._users.items()):
+            self._refill(buckets, now)
+            if buckets.minute >= self.per_minute and buckets.hour >= self.per_hour:
+                del self._users[user_id]
+        self._prune_at = max(PRUNE_THRESHOLD, 2 * len(self._users))
+
+    def stats(self) -> dict:
+        """Return admission counters and current load."""
+        with self._lock:
+            requests = self.admitted + self.rejected_rate + self.rejected_overload
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrent": self.max_concurrent,
+                "tracked_users": len(self._users),
+                "admitted": self.admitted,
+                "rejected_rate_limit": self.rejected_rate,
+                "rejected_overload": self.rejected_overload,
+                "rejection_rate": round((self.rejected_rate + self.rejected_overload) / requests, 3) if requests else 0.0
+            }
@@ -0,0 +1,61 @@
+"""
+Educational RAG Services Package
+
+This package contains the shared infrastructure used by the tools, the
+coordinator and the Telegram bot (embedding generation, caching, indexes).
+"""
+
+from .embedding_service import (embed_query, aembed_query, embed_text, get_embedding_cache_stats,
+                                get_embedding_batch_stats)
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_store import DiskEmbeddingStore, get_embedding_store
+from .search_backend import (search_table, ladder_search, apply_threshold_ladder, match_all, memory_match_all,
+                             fetch_by_ids, asearch_table, aladder_search, amatch_all, local_store, ann_store)
+from .ann_index import IVFPQIndex, recall_report
+from .catalog_mirror import CatalogMirror, catalog_mirror
+from .catalog_stats import course_content_counts, CatalogStatsSnapshot, catalog_stats
+from .answer_cache import AnswerCache, answer_cache
+from .intent_classifier import IntentClassifier, intent_classifier
+from .worker_pool import WorkerPool
+from .data_version import DataVersionTracker, data_versions
+from .search_cache import SearchResultCache
+from .vector_index import VectorIndex, LocalVectorStore
+
+__all__ = [
+    'embed_query',
+    'aembed_query',
+    'embed_text',
+    'get_embedding_cache_stats',
+    'get_embedding_batch_stats',
+    'EmbeddingBatcher',
+    'DiskEmbeddingStore',
+    'get_embedding_store',
+    'search_table',
+    'ladder_search',
+    'apply_threshold_ladder',
+    'match_all',
+    'memory_match_all',
+    'fetch_by_ids',
+    'asearch_table',
+    'aladder_search',
+    'amatch_all',
+    'local_store',
+    'ann_store',
+    'IVFPQIndex',
+    'recall_report',
+    'CatalogMirror',
+    'catalog_mirror',
+    'course_content_counts',
+    'CatalogStatsSnapshot',
+    'catalog_stats',
+    'AnswerCache',
+    'answer_cache',
+    'IntentClassifier',
+    'intent_classifier',
+    'WorkerPool',
+    'DataVersionTracker',
+    'data_versions',
+    'SearchResultCache',
+    'VectorIndex',
+    'LocalVectorStore'
+]
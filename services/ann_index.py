@@ -0,0 +1,417 @@
+"""
+Approximate nearest neighbour (IVF-PQ) index for large catalogs.
+
+Vectors are assigned to ``nlist`` coarse k-means cells; the residual of each
+vector to its cell centroid is compressed with product quantization into
+``m`` one-byte codes. A query scans only the ``nprobe`` closest cells and
+scores candidates with asymmetric distance tables. Indexes built with
+``keep_vectors`` keep a float16 copy of the vectors, and with ``rerank`` > 0
+the best candidates are re-scored against it.
+
+The index serves the same ``search`` signature as ``VectorIndex`` so it can
+back ``search_table`` unchanged, and ``recall_report`` compares it to
+brute-force search to help pick ``nprobe`` / ``rerank``.
+
+``ANNStore`` builds indexes in a background thread (searches fall back to the
+RPC until the first one is ready) and tags each index with the table's data
+version, rebuilding it when the data changes. Building at catalog scale takes
+minutes, so building ahead of time with the command below is preferred.
+
+    python -m services.ann_index build tasks
+    python -m services.ann_index report tasks --nprobe 4 8 16 32
+"""
+import argparse
+import json
+import os
+import threading
+import math
+import time
+
+import numpy as np
+from config import (VECTOR_DIM, ANN_NLIST, ANN_PQ_SUBVECTORS, ANN_NPROBE, ANN_RERANK, ANN_INDEX_DIR,
+                    ANN_TRAIN_SAMPLE, ANN_KEEP_VECTORS, ANN_BUILD_RETRY_SECONDS)
+from services.vector_index import VectorIndex, normalize_rows
+
+PQ_CENTROIDS = 256  # one byte per sub-vector code
+
+
+def default_nlist(rows: int) -> int:
+    """Pick the number of coarse cells for a table of rows vectors (about 4 * sqrt(rows))."""
+    return max(1, int(4 * math.sqrt(rows)))
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means on float32 data; returns the centroid matrix."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    data_sq = np.einsum("ij,ij->i", data, data)
+
+    for _ in range(iterations):
+        assignments = assign(data, centroids, data_sq)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        counts = np.bincount(assignments, minlength=k).astype(np.float32)
+
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty cells with random points so every cell stays useful
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = sums / counts[:, None]
+    return centroids.astype(np.float32)
+
+
+def assign(data: np.ndarray, centroids: np.ndarray, data_sq=None, chunk_size: int = 65536) -> np.ndarray:
+    """Return the index of the nearest (L2) centroid for every row, in memory-bounded chunks."""
+    centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        block_sq = data_sq[start:start + chunk_size] if data_sq is not None else np.einsum("ij,ij->i", block, block)
+        distances = block_sq[:, None] - 2 * block @ centroids.T + centroid_sq[None, :]
+        out[start:start + chunk_size] = np.argmin(distances, axis=1)
+    return out
+
+
+class IVFPQIndex:
+    """Inverted-file index with product-quantized residuals (inner product on normalized vectors)."""
+
+    def __init__(self, table: str, rows, coarse: np.ndarray, codebooks: np.ndarray, codes: np.ndarray,
+                 list_ids: np.ndarray, list_offsets: np.ndarray, vectors: np.ndarray = None,
+                 nprobe: int = ANN_NPROBE, rerank: int = ANN_RERANK):
+        self.table = table
+        self.rows = rows
+        self.coarse = coarse  # (nlist, dim)
+        self.codebooks = codebooks  # (m, 256, dim / m)
+        self.codes = codes  # (n, m) uint8, grouped by list
+        self.list_ids = list_ids  # (n,) row position of each code, grouped by list
+        self.list_offsets = list_offsets  # (nlist + 1,) start of each list in codes/list_ids
+        self.vectors = vectors  # optional float16 normalized originals for re-ranking
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.loaded_at = time.time()
+        self.version = None  # data version the index was built from, if known
+        self.m, _, self.sub_dim = codebooks.shape
+        self.course_ids = np.fromiter(
+            (row.get("course_id") if row.get("course_id") is not None else -1 for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+
+    @classmethod
+    def build(cls, table: str, rows, vectors: np.ndarray, nlist: int = ANN_NLIST, m: int = ANN_PQ_SUBVECTORS,
+              train_sample: int = ANN_TRAIN_SAMPLE, keep_vectors: bool = ANN_KEEP_VECTORS, seed: int = 0):
+        """Train the coarse quantizer and PQ codebooks on a sample, then encode every vector."""
+        vectors = np.ascontiguousarray(normalize_rows(np.asarray(vectors, dtype=np.float32)))
+        n, dim = vectors.shape
+        if dim % m:
+            raise ValueError(f"Vector dimension {dim} is not divisible by {m} sub-vectors")
+
+        nlist = nlist or default_nlist(n)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, train_sample), replace=False)]
+
+        coarse = kmeans(sample, min(nlist, len(sample)), seed=seed)
+        assignments = assign(vectors, coarse)
+        residuals = vectors - coarse[assignments]
+
+        sub_dim = dim // m
+        sample_residuals = sample - coarse[assign(sample, coarse)]
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(sample_residuals[:, j * sub_dim:(j + 1) * sub_dim]),
+                   PQ_CENTROIDS, iterations=10, seed=seed + j)
+            for j in range(m)
+        ])
+        if codebooks.shape[1] < PQ_CENTROIDS:
+            # Tiny training sets: pad codebooks so codes always fit in a byte table
+            pad = np.zeros((m, PQ_CENTROIDS - codebooks.shape[1], sub_dim), dtype=np.float32)
+            codebooks = np.concatenate([codebooks, pad], axis=1)
+
+        codes = np.empty((n, m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = assign(np.ascontiguousarray(residuals[:, j * sub_dim:(j + 1) * sub_dim]), codebooks[j])
+
+        order = np.argsort(assignments, kind="stable")
+        list_offsets = np.zeros(len(coarse) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=len(coarse)), out=list_offsets[1:])
+
+        return cls(table, rows, coarse, codebooks, codes[order], order.astype(np.int64), list_offsets,
+                   vectors.astype(np.float16) if keep_vectors else None)
+
+    @classmethod
+    def from_vector_index(cls, index: VectorIndex, **kwargs):
+        """Build an ANN index from an already loaded brute-force index."""
+        return cls.build(index.table, index.rows, index.matrix, **kwargs)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+               nprobe: int = None, rerank: int = None):
+        """Return up to match_count approximate matches above match_threshold, most similar first."""
+        if not self.rows or match_count <= 0:
+            return []
+        nprobe = min(nprobe or self.nprobe, len(self.coarse))
+        rerank = self.rerank if rerank is None else rerank
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        coarse_scores = self.coarse @ query
+        probe = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        # Asymmetric distance tables: query sub-vector dot every codeword
+        tables = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.m, self.sub_dim))
+
+        candidate_ids, candidate_scores = [], []
+        for cell in probe:
+            start, end = self.list_offsets[cell], self.list_offsets[cell + 1]
+            if start == end:
+                continue
+            ids = self.list_ids[start:end]
+            if course_filter is not None:
+                keep = self.course_ids[ids] == course_filter
+                if not keep.any():
+                    continue
+                ids = ids[keep]
+                codes = self.codes[start:end][keep]
+            else:
+                codes = self.codes[start:end]
+            scores = coarse_scores[cell] + tables[np.arange(self.m), codes].sum(axis=1)
+            candidate_ids.append(ids)
+            candidate_scores.append(scores)
+
+        if not candidate_ids:
+            return []
+        ids = np.concatenate(candidate_ids)
+        scores = np.concatenate(candidate_scores)
+
+        if rerank and self.vectors is not None:
+            keep = min(len(ids), max(match_count, match_count * rerank))
+            top = np.argpartition(-scores, keep - 1)[:keep]
+            ids = ids[top]
+            scores = self.vectors[ids].astype(np.float32) @ query
+
+        k = min(match_count, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            if similarity <= match_threshold:
+                break
+            row = dict(self.rows[ids[i]])
+            row["similarity"] = similarity
+            results.append(row)
+        return results
+
+    def save(self, directory: str = ANN_INDEX_DIR):
+        """Persist the index as <table>.npz (arrays), <table>.rows.json (row metadata) and <table>.meta.json."""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            "coarse": self.coarse,
+            "codebooks": self.codebooks,
+            "codes": self.codes,
+            "list_ids": self.list_ids,
+            "list_offsets": self.list_offsets
+        }
+        if self.vectors is not None:
+            arrays["vectors"] = self.vectors.astype(np.float16)
+        np.savez(os.path.join(directory, f"{self.table}.npz"), **arrays)
+        with open(os.path.join(directory, f"{self.table}.rows.json"), "w") as f:
+            json.dump(self.rows, f)
+        # Written last: an index without metadata is treated as unknown and rebuilt
+        with open(os.path.join(directory, f"{self.table}.meta.json"), "w") as f:
+            json.dump({"version": list(self.version) if self.version is not None else None}, f)
+
+    @staticmethod
+    def saved_version(table: str, directory: str = ANN_INDEX_DIR):
+        """Return (found, version) for the index files of table."""
+        try:
+            with open(os.path.join(directory, f"{table}.meta.json")) as f:
+                version = json.load(f)["version"]
+        except (OSError, ValueError, KeyError):
+            return False, None
+        return os.path.exists(os.path.join(directory, f"{table}.npz")), tuple(version) if version else None
+
+    @classmethod
+    def load(cls, table: str, directory: str = ANN_INDEX_DIR):
+        """Load an index previously written by save()."""
+        with np.load(os.path.join(directory, f"{table}.npz")) as data:
+            arrays = {name: data[name] for name in data.files}
+        with open(os.path.join(directory, f"{table}.rows.json")) as f:
+            rows = json.load(f)
+        index = cls(table, rows, arrays["coarse"], arrays["codebooks"], arrays["codes"], arrays["list_ids"],
+                    arrays["list_offsets"], arrays.get("vectors"))
+        index.version = cls.saved_version(table, directory)[1]
+        return index
+
+
+class IndexNotReady(RuntimeError):
+    """The ANN index of a table is still being built."""
+
+
+class ANNStore:
+    """Per-table IVF-PQ indexes, loaded or built in the background and rebuilt when the data version changes."""
+
+    def __init__(self, exact_store, directory: str = ANN_INDEX_DIR, versions=None,
+                 retry_seconds: float = ANN_BUILD_RETRY_SECONDS):
+        self.exact_store = exact_store
+        self.directory = directory
+        self.versions = versions if versions is not None else exact_store.versions
+        self.retry_seconds = retry_seconds
+        self._indexes = {}
+        self._building = set()
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.build_failures = 0
+
+    def _version(self, table: str):
+        return self.versions.version(table) if self.versions is not None else None
+
+    def get_index(self, table: str) -> IVFPQIndex:
+        """Return the ANN index for table, scheduling a background (re)build when it is missing or outdated.
+
+        Raises IndexNotReady until the first index of the table is available; after a data change the
+        previous index keeps serving until its replacement is ready.
+        """
+        version = self._version(table)
+        index = self._indexes.get(table)
+        if index is None or (version is not None and index.version != version):
+            self._schedule(table, version)
+        if index is None:
+            raise IndexNotReady(f"{table} ANN index is not built yet")
+        return index
+
+    def start(self, tables=("courses", "tasks", "resources")):
+        """Load or build the indexes of tables in the background."""
+        for table in tables:
+            if table not in self._indexes:
+                self._schedule(table, self._version(table))
+
+    def _schedule(self, table: str, version):
+        """Start a build thread for table unless one is running or a failed build is cooling down."""
+        with self._lock:
+            if table in self._building or time.monotonic() < self._retry_at.get(table, 0.0):
+                return
+            self._building.add(table)
+        threading.Thread(target=self._build, args=(table, version), name=f"ann-build-{table}",
+                         daemon=True).start()
+
+    def _build(self, table: str, version):
+        """Load the saved index if it matches version, otherwise build and save a new one."""
+        try:
+            found, saved_version = IVFPQIndex.saved_version(table, self.directory)
+            if found and (version is None or saved_version == version):
+                index = IVFPQIndex.load(table, self.directory)
+            else:
+                # Load the exact vectors just for the build (not through exact_store, which would keep them)
+                exact = VectorIndex.load(self.exact_store.client, table)
+                index = IVFPQIndex.from_vector_index(exact)
+                del exact
+                index.version = version
+                index.save(self.directory)
+                self.builds += 1
+            self._indexes[table] = index
+        except Exception as e:
+            print(f"{table} ANN index build failed: {e}")
+            self.build_failures += 1
+            with self._lock:
+                self._retry_at[table] = time.monotonic() + self.retry_seconds
+        finally:
+            with self._lock:
+                self._building.discard(table)
+
+    def search(self, table: str, query_embedding, match_threshold: float, match_count: int,
+               course_filter=None):
+        """Answer a match_* query from the ANN index."""
+        return self.get_index(table).search(query_embedding, match_threshold, match_count, course_filter)
+
+    def stats(self) -> dict:
+        """Return the size, age and version of every loaded index, and build counters."""
+        return {
+            "indexes": {
+                table: {"rows": len(index), "age_seconds": round(time.time() - index.loaded_at, 1),
+                        "version": index.version, "rerank": index.rerank if index.vectors is not None else 0}
+                for table, index in self._indexes.items()
+            },
+            "building": sorted(self._building),
+            "builds": self.builds,
+            "build_failures": self.build_failures
+        }
+
+
+def recall_report(ann: IVFPQIndex, exact: VectorIndex, queries, k: int = 10, nprobe_values=(1, 4, 8, 16, 32),
+                  rerank_values=(0, ANN_RERANK)):
+    """Measure recall@k and mean latency of the ANN index against brute force for each setting."""
+    queries = np.asarray(queries, dtype=np.float32)
+    if ann.vectors is None and any(rerank_values):
+        print("⚠️ Index has no kept vectors, so re-ranking is skipped (build with --keep-vectors to measure it)")
+        rerank_values = [0]
+    truth = [
+        {row["id"] for row in exact.search(query, -1.0, k)}
+        for query in queries
+    ]
+
+    report = []
+    for rerank in rerank_values:
+        for nprobe in nprobe_values:
+            hits = 0
+            started = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                found = ann.search(query, -1.0, k, nprobe=nprobe, rerank=rerank)
+                hits += len(expected & {row["id"] for row in found})
+            elapsed = time.perf_counter() - started
+            report.append({
+                "nprobe": nprobe,
+                "rerank": rerank,
+                f"recall@{k}": round(hits / max(1, sum(len(t) for t in truth)), 4),
+                "avg_latency_ms": round(elapsed / max(1, len(queries)) * 1000, 3)
+            })
+    return report
+
+
+def main():
+    """Build ANN index files or print a recall report from the command line."""
+    from services.data_version import data_versions
+    from services.search_backend import local_store
+
+    parser = argparse.ArgumentParser(description="Build and evaluate IVF-PQ indexes")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("table", choices=["courses", "tasks", "resources"])
+    parser.add_argument("--nlist", type=int, default=ANN_NLIST, help="coarse cells (default: about 4 * sqrt(rows))")
+    parser.add_argument("--m", type=int, default=ANN_PQ_SUBVECTORS)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--keep-vectors", action="store_true", default=ANN_KEEP_VECTORS,
+                        help="keep float16 vectors for re-ranking")
+    args = parser.parse_args()
+
+    exact = local_store.get_index(args.table)
+    print(f"Loaded {len(exact)} {args.table} vectors")
+
+    if args.command == "build":
+        started = time.perf_counter()
+        ann = IVFPQIndex.from_vector_index(exact, nlist=args.nlist, m=args.m, keep_vectors=args.keep_vectors)
+        ann.version = data_versions.version(args.table)
+        ann.save()
+        print(f"✅ Built {args.table} index in {time.perf_counter() - started:.1f}s -> {ANN_INDEX_DIR}")
+        return
+
+    ann = IVFPQIndex.load(args.table)
+    rng = np.random.default_rng(0)
+    # Perturbed catalog vectors stand in for real queries
+    picks = rng.choice(len(exact), size=min(args.queries, len(exact)), replace=False)
+    queries = exact.matrix[picks] + rng.normal(scale=0.02, size=(len(picks), VECTOR_DIM)).astype(np.float32)
+    for line in recall_report(ann, exact, queries, k=args.k, nprobe_values=args.nprobe):
+        print(json.dumps(line))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Cache of complete coordinator answers.
+
+Answers are keyed by the normalized query (see ``normalize_query``), so
+"List all courses!" and "list courses" share an entry while "5 python tasks"
+and "10 python tasks" do not. Entries expire after a TTL, the cache is
+bounded by entry count (LRU), and every entry is tagged with the catalog data
+version so seeding or edits invalidate it. Optionally a miss can fall back to
+the most similar cached query by embedding, above a cutoff, when both
+queries ask for the same numbers.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL, ANSWER_CACHE_SEMANTIC, ANSWER_CACHE_SEMANTIC_CUTOFF
+from services.data_version import data_versions
+from services.embedding_service import embed_query
+from services.query_parsing import normalize_query
+
+
+class _Entry:
+    """One cached answer."""
+
+    __slots__ = ("answer", "expires_at", "version", "numbers", "embedding")
+
+    def __init__(self, answer: str, expires_at: float, version, numbers, embedding=None):
+        self.answer = answer
+        self.expires_at = expires_at
+        self.version = version
+        self.numbers = numbers
+        self.embedding = embedding
+
+
+class AnswerCache:
+    """LRU + TTL cache of answers keyed by normalized query, invalidated by catalog data version."""
+
+    def __init__(self, versions=data_versions, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = ANSWER_CACHE_TTL, semantic: bool = ANSWER_CACHE_SEMANTIC,
+                 semantic_cutoff: float = ANSWER_CACHE_SEMANTIC_CUTOFF, embed=embed_query):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic = semantic
+        self.semantic_cutoff = semantic_cutoff
+        self.embed = embed
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._matrix = None  # (keys, normalized embeddings) of the entries, rebuilt lazily
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _version(self):
+        """Current catalog version, or None if it can't be checked."""
+        return self.versions.catalog_version() if self.versions is not None else None
+
+    def _embedding(self, user_query: str):
+        """Unit-length query embedding, or None."""
+        embedding = self.embed(user_query)
+        if not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, user_query: str):
+        """Return the cached answer for user_query, or None."""
+        key = normalize_query(user_query)
+        if not key:
+            return None
+        version = self._version()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at <= now or entry.version != version:
+                    self._remove(key)
+                    self.invalidations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.answer
+
+        if self.semantic:
+            answer = self._semantic_get(user_query, key, version, now)
+            if answer is not None:
+                return answer
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _semantic_get(self, user_query: str, key: str, version, now: float):
+        """Return the answer of the most similar cached query above the cutoff with the same numbers."""
+        try:
+            query = self._embedding(user_query)
+        except Exception as e:
+            print(f"Answer cache embedding failed: {e}")
+            return None
+        if query is None:
+            return None
+
+        numbers = re.findall(r"\d+", key)
+        with self._lock:
+            if self._matrix is None:
+                keys = [k for k, entry in self._entries.items() if entry.embedding is not None]
+                vectors = [self._entries[k].embedding for k in keys]
+                self._matrix = (keys, np.vstack(vectors) if vectors else np.zeros((0, len(query)), np.float32))
+            keys, matrix = self._matrix
+            if not keys:
+                return None
+
+            scores = matrix @ query
+            for i in np.argsort(-scores):
+                if scores[i] < self.semantic_cutoff:
+                    break
+                entry = self._entries.get(keys[i])
+                if entry is None or entry.numbers != numbers:
+                    continue
+                if entry.expires_at <= now or entry.version != version:
+                    continue
+                self._entries.move_to_end(keys[i])
+                self.semantic_hits += 1
+                return entry.answer
+        return None
+
+    def put(self, user_query: str, answer: str):
+        """Cache answer for user_query under the current catalog version."""
+        key = normalize_query(user_query)
+        if not key:
+            return
+        embedding = None
+        if self.semantic:
+            try:
+                embedding = self._embedding(user_query)
+            except Exception as e:
+                print(f"Answer cache embedding failed: {e}")
+
+        entry = _Entry(answer, time.monotonic() + self.ttl, self._version(), re.findall(r"\d+", key), embedding)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Drop one entry. Caller holds the lock."""
+        del self._entries[key]
+        self._matrix = None
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and size."""
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0
+            }
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,291 @@
+"""
+In-memory mirror of the course catalog.
+
+Courses are mirrored in full (without embeddings). Tasks and resources can be
+large (``content``), so only their ids and course ids are kept: that is
+enough for counts and keyset pages, and the rows of a page are hydrated with
+one ``id in (...)`` query when it is served.
+
+The mirror is loaded once and then kept fresh by delta syncs: when a table's
+data version changes, only rows whose ``updated_at`` is at or after the last
+seen watermark (plus any rows with a higher id) are fetched. Deleted rows do
+not change the data version, so each table is also reloaded in full every
+``CATALOG_MIRROR_RELOAD_SECONDS``.
+Course listings, course details and per-course counts are then answered
+without any database round trip; a page of tasks or resources costs one
+hydration query, however many courses it covers (``course_pages``).
+
+Ids are kept in sorted ``array('q')`` buffers (8 bytes per id, plus 8 for the
+course id of a task or resource) per table and per course, so a keyset page
+is a bisect and a slice, and memory stays proportional to the row count.
+"""
+import bisect
+import threading
+import time
+from array import array
+
+from supabase import create_client
+from config import SUPABASE_URL, SUPABASE_KEY, DATA_VERSION_POLL_SECONDS, CATALOG_MIRROR_RELOAD_SECONDS
+from services.data_version import data_versions
+from services.vector_index import TABLE_COLUMNS, fetch_rows
+
+# Initialize client
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+TIMESTAMP_COLUMNS = ["created_at", "updated_at"]
+
+# Columns kept in memory; tasks and resources are hydrated from TABLE_COLUMNS per page
+MIRROR_COLUMNS = {
+    "courses": TABLE_COLUMNS["courses"],
+    "tasks": ["id", "course_id"],
+    "resources": ["id", "course_id"]
+}
+
+# Stored as the course id of rows without one
+NO_COURSE = -1
+
+# PostgreSQL error code for a column that does not exist
+UNDEFINED_COLUMN = "42703"
+
+
+def is_undefined_column(e: Exception) -> bool:
+    """True if a PostgREST error says a selected column does not exist."""
+    return getattr(e, "code", None) == UNDEFINED_COLUMN or UNDEFINED_COLUMN in str(e)
+
+
+class _TableMirror:
+    """Sorted ids of one table (plus course rows, or the course id of each task/resource) and sync watermarks."""
+
+    __slots__ = ("table", "ids", "course_ids", "rows", "columns", "has_updated_at", "updated_watermark", "max_id",
+                 "version", "loaded", "loaded_at", "synced_at")
+
+    def __init__(self, table: str):
+        self.table = table
+        self.ids = array("q")  # sorted
+        self.course_ids = array("q")  # course id of ids[i] (tasks and resources)
+        self.rows = {}  # id -> row (courses only)
+        self.columns = None
+        self.has_updated_at = False
+        self.updated_watermark = None
+        self.max_id = None
+        self.version = None
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.synced_at = 0.0
+
+
+class CatalogMirror:
+    """Local copy of courses, tasks and resources with per-course indexes."""
+
+    def __init__(self, client, versions=data_versions, poll_seconds: float = DATA_VERSION_POLL_SECONDS,
+                 reload_seconds: float = CATALOG_MIRROR_RELOAD_SECONDS):
+        self.client = client
+        self.versions = versions
+        self.poll_seconds = poll_seconds
+        self.reload_seconds = reload_seconds
+        self._tables = {table: _TableMirror(table) for table in TABLE_COLUMNS}
+        self._by_course = {"tasks": {}, "resources": {}}  # table -> course_id -> sorted array of ids
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self.full_loads = 0
+        self.delta_syncs = 0
+        self.delta_rows = 0
+
+    def _fetch(self, state: _TableMirror, **kwargs):
+        """Fetch rows of state.table, finding out on first use whether it has timestamp columns."""
+        if state.columns is None:
+            columns = MIRROR_COLUMNS[state.table] + TIMESTAMP_COLUMNS
+            try:
+                rows = fetch_rows(self.client, state.table, columns, **kwargs)
+                state.columns = columns
+                state.has_updated_at = True
+                return rows
+            except Exception as e:
+                if not is_undefined_column(e):
+                    raise
+                state.columns = MIRROR_COLUMNS[state.table]  # no created_at/updated_at columns
+        return fetch_rows(self.client, state.table, state.columns, **kwargs)
+
+    def _replace(self, state: _TableMirror, rows):
+        """Rebuild the id arrays of state.table from a full load. Caller holds the lock."""
+        rows = sorted(rows, key=lambda row: row["id"])
+        state.ids = array("q", (row["id"] for row in rows))
+        state.updated_watermark = None
+        if state.table == "courses":
+            state.rows = {row["id"]: row for row in rows}
+            return
+        state.course_ids = array("q", (NO_COURSE if row.get("course_id") is None else row["course_id"]
+                                       for row in rows))
+        by_course = self._by_course[state.table] = {}
+        for item_id, course_id in zip(state.ids, state.course_ids):
+            by_course.setdefault(course_id, array("q")).append(item_id)  # ids arrive sorted
+
+    def _upsert(self, state: _TableMirror, row):
+        """Add or update one row, keeping the id arrays sorted. Caller holds the lock."""
+        item_id = row["id"]
+        i = bisect.bisect_left(state.ids, item_id)
+        existed = i < len(state.ids) and state.ids[i] == item_id
+        if state.table == "courses":
+            state.rows[item_id] = row
+            if not existed:
+                state.ids.insert(i, item_id)
+            return
+
+        course_id = NO_COURSE if row.get("course_id") is None else row["course_id"]
+        by_course = self._by_course[state.table]
+        if existed:
+            previous = state.course_ids[i]
+            if previous == course_id:
+                return
+            # Moved to another course
+            state.course_ids[i] = course_id
+            ids = by_course[previous]
+            del ids[bisect.bisect_left(ids, item_id)]
+        else:
+            state.ids.insert(i, item_id)
+            state.course_ids.insert(i, course_id)
+        bisect.insort(by_course.setdefault(course_id, array("q")), item_id)
+
+    def _apply(self, state: _TableMirror, rows, replace: bool = False):
+        """Merge fetched rows into the mirror (or replace its contents) and advance the watermarks."""
+        with self._lock:
+            if replace:
+                self._replace(state, rows)
+            else:
+                for row in rows:
+                    self._upsert(state, row)
+            state.max_id = state.ids[-1] if state.ids else None
+            if state.has_updated_at:
+                stamps = [row["updated_at"] for row in rows if row.get("updated_at")]
+                if stamps:
+                    state.updated_watermark = max(stamps + [state.updated_watermark or stamps[0]])
+
+    def _hydrate(self, table: str, ids):
+        """Fetch the full rows (without embeddings) for ids, in id order."""
+        if not ids:
+            return []
+        rows = self.client.table(table).select(", ".join(TABLE_COLUMNS[table])).in_("id", list(ids)) \
+            .execute().data or []
+        by_id = {row["id"]: row for row in rows}
+        return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+    def sync_table(self, table: str, force: bool = False):
+        """Bring one table up to date: full load the first time and periodically, deltas in between."""
+        state = self._tables[table]
+        version = self.versions.version(table) if self.versions is not None else None
+        reload_due = time.time() - state.loaded_at >= self.reload_seconds
+        if not force and not reload_due and state.loaded and version is not None and version == state.version:
+            state.synced_at = time.time()
+            return
+
+        if not state.loaded or force or reload_due:
+            self._apply(state, self._fetch(state), replace=True)
+            state.loaded = True
+            state.loaded_at = time.time()
+            self.full_loads += 1
+        else:
+            changed = self._fetch(state, after_id=state.max_id)
+            if state.has_updated_at and state.updated_watermark is not None:
+                changed += self._fetch(state, updated_since=state.updated_watermark)
+            self._apply(state, changed)
+            self.delta_syncs += 1
+            self.delta_rows += len(changed)
+
+        state.version = version
+        state.synced_at = time.time()
+
+    def sync(self, force: bool = False):
+        """Sync every table."""
+        with self._sync_lock:
+            for table in self._tables:
+                self.sync_table(table, force)
+
+    def ensure_loaded(self):
+        """Load the mirror on first use and start the background sync thread."""
+        if not all(state.loaded for state in self._tables.values()):
+            self.sync()
+        self.start()
+
+    def start(self):
+        """Start the background sync thread (idempotent)."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self.poll_seconds)
+                    try:
+                        self.sync()
+                    except Exception as e:
+                        print(f"Catalog mirror sync failed: {e}")
+
+            self._thread = threading.Thread(target=loop, name="catalog-mirror-sync", daemon=True)
+            self._thread.start()
+
+    def get_course(self, course_id: int):
+        """Return one course row, or None."""
+        self.ensure_loaded()
+        return self._tables["courses"].rows.get(course_id)
+
+    def _page_ids(self, table: str, page_size: int, after_id=None, course_id=None):
+        """Return (ids, next_cursor) of one keyset page. Caller holds the lock."""
+        ids = self._tables[table].ids if course_id is None else self._by_course[table].get(course_id, array("q"))
+        start = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+        page_ids = ids[start:start + page_size].tolist()
+        more = start + page_size < len(ids)
+        return page_ids, page_ids[-1] if page_ids and more else None
+
+    def page(self, table: str, page_size: int, after_id=None, course_id=None):
+        """Return (rows, next_cursor) for one keyset page: rows with id > after_id, in id order.
+
+        next_cursor is the last id of the page, or None when there are no more rows. Task and
+        resource rows are fetched from the database for the page.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            page_ids, next_cursor = self._page_ids(table, page_size, after_id, course_id)
+            if table == "courses":
+                courses = self._tables["courses"].rows
+                return [courses[item_id] for item_id in page_ids], next_cursor
+        return self._hydrate(table, page_ids), next_cursor
+
+    def course_pages(self, table: str, page_size: int, course_ids) -> dict:
+        """Return {course_id: (rows, next_cursor)} with the first task or resource page of each course.
+
+        The rows of every page are fetched together, in one query.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            pages = {course_id: self._page_ids(table, page_size, course_id=course_id) for course_id in course_ids}
+        rows = {row["id"]: row for row in self._hydrate(table, [i for ids, _ in pages.values() for i in ids])}
+        return {
+            course_id: ([rows[item_id] for item_id in ids if item_id in rows], next_cursor)
+            for course_id, (ids, next_cursor) in pages.items()
+        }
+
+    def course_summary(self, course_id: int) -> dict:
+        """Return the task and resource counts of a course."""
+        self.ensure_loaded()
+        with self._lock:
+            return {
+                "tasks": len(self._by_course["tasks"].get(course_id, ())),
+                "resources": len(self._by_course["resources"].get(course_id, ()))
+            }
+
+    def stats(self) -> dict:
+        """Return mirror sizes, sync counters and ages."""
+        return {
+            "rows": {table: len(state.ids) for table, state in self._tables.items()},
+            "age_seconds": {table: round(time.time() - state.synced_at, 1) for table, state in self._tables.items()},
+            "full_loads": self.full_loads,
+            "delta_syncs": self.delta_syncs,
+            "delta_rows": self.delta_rows
+        }
+
+
+catalog_mirror = CatalogMirror(supabase)
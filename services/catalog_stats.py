@@ -0,0 +1,182 @@
+"""
+Per-course task and resource counts.
+
+``course_content_counts`` answers with one call to the ``course_content_counts``
+SQL function (db_setup/sql/course_content_counts.sql). If that function is
+not installed, it bulk-fetches the ``course_id`` columns with keyset
+pagination and groups them with NumPy, which still takes a handful of
+requests instead of two count queries per course.
+
+``catalog_stats`` keeps the resulting totals in memory so count and stats
+requests are answered without any database round trip.
+"""
+import threading
+import time
+
+import numpy as np
+from supabase import create_client
+from config import SUPABASE_URL, SUPABASE_KEY, UNIFIED_SEARCH_RETRY_SECONDS, CATALOG_STATS_REFRESH_SECONDS
+from services.data_version import data_versions
+from services.vector_index import fetch_rows
+
+# Initialize client
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# When the course_content_counts function is missing we use the bulk fallback until this time
+_counts_rpc_retry_at = 0.0
+
+
+def rpc_course_counts(client=supabase):
+    """Run the course_content_counts SQL function."""
+    rows = client.rpc('course_content_counts', {}).execute().data or []
+    return [
+        {
+            "course_id": row["course_id"],
+            "title": row["title"],
+            "task_count": int(row["task_count"]),
+            "resource_count": int(row["resource_count"])
+        }
+        for row in rows
+    ]
+
+
+def _count_by_course(client, table: str, course_ids: np.ndarray):
+    """Count table rows per course in course_ids; the extra last element counts rows of no known course."""
+    rows = fetch_rows(client, table, ["id", "course_id"])
+    keys = np.fromiter((row["course_id"] if row["course_id"] is not None else -1 for row in rows),
+                       dtype=np.int64, count=len(rows))
+    unique, counts = np.unique(keys, return_counts=True)
+    per_course = np.zeros(len(course_ids), dtype=np.int64)
+    if len(course_ids):
+        positions = np.searchsorted(course_ids, unique).clip(max=len(course_ids) - 1)
+        known = course_ids[positions] == unique
+        np.add.at(per_course, positions[known], counts[known])
+    return np.append(per_course, len(rows) - per_course.sum())
+
+
+def bulk_course_counts(client=supabase):
+    """Fallback for rpc_course_counts: fetch the course_id columns and group them client-side."""
+    courses = fetch_rows(client, "courses", ["id", "title"])
+    course_ids = np.fromiter((course["id"] for course in courses), dtype=np.int64, count=len(courses))
+    task_counts = _count_by_course(client, "tasks", course_ids)
+    resource_counts = _count_by_course(client, "resources", course_ids)
+
+    rows = [
+        {
+            "course_id": course["id"],
+            "title": course["title"],
+            "task_count": int(task_counts[i]),
+            "resource_count": int(resource_counts[i])
+        }
+        for i, course in enumerate(courses)
+    ]
+    rows.append({"course_id": None, "title": None,
+                 "task_count": int(task_counts[-1]), "resource_count": int(resource_counts[-1])})
+    return rows
+
+
+def course_content_counts(client=supabase):
+    """Return per-course counts, ending with a course_id=None row for unattached content."""
+    global _counts_rpc_retry_at
+
+    if time.monotonic() >= _counts_rpc_retry_at:
+        try:
+            return rpc_course_counts(client)
+        except Exception as e:
+            print(f"course_content_counts RPC unavailable, grouping client-side: {e}")
+            _counts_rpc_retry_at = time.monotonic() + UNIFIED_SEARCH_RETRY_SECONDS
+    return bulk_course_counts(client)
+
+
+class CatalogStatsSnapshot:
+    """In-memory snapshot of catalog counts, refreshed in the background.
+
+    Readers get the last snapshot without touching the database. A daemon
+    thread rebuilds it every ``refresh_seconds``, or sooner when the data
+    version of any catalog table changes or ``request_refresh`` is called
+    (e.g. after a write).
+    """
+
+    def __init__(self, client, refresh_seconds: float = CATALOG_STATS_REFRESH_SECONDS, versions=None):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.versions = versions
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresh_requested = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+
+    def refresh(self) -> dict:
+        """Rebuild the snapshot now and return it."""
+        version = self.versions.catalog_version() if self.versions is not None else None
+        counts = course_content_counts(self.client)
+        courses = [row for row in counts if row["course_id"] is not None]
+        snapshot = {
+            "total_courses": len(courses),
+            "total_tasks": sum(row["task_count"] for row in counts),
+            "total_resources": sum(row["resource_count"] for row in counts),
+            "courses": courses,
+            "refreshed_at": time.time(),
+            "version": version
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self.refreshes += 1
+        return snapshot
+
+    def get(self) -> dict:
+        """Return the current snapshot, building the first one synchronously."""
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def age(self) -> float:
+        """Seconds since the snapshot was built (inf if never)."""
+        snapshot = self._snapshot
+        return time.time() - snapshot["refreshed_at"] if snapshot else float("inf")
+
+    def request_refresh(self):
+        """Ask the background thread to rebuild the snapshot as soon as possible."""
+        if self.versions is not None:
+            self.versions.invalidate()
+        self._refresh_requested.set()
+
+    def _is_stale(self) -> bool:
+        """True if the snapshot is too old or the catalog data changed since it was built."""
+        snapshot = self._snapshot
+        if snapshot is None or self.age() >= self.refresh_seconds:
+            return True
+        return self.versions is not None and self.versions.catalog_version() != snapshot["version"]
+
+    def start(self):
+        """Start the background refresh thread (idempotent)."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            def loop():
+                interval = self.versions.poll_seconds if self.versions is not None else self.refresh_seconds
+                while True:
+                    self._refresh_requested.wait(timeout=interval)
+                    self._refresh_requested.clear()
+                    try:
+                        if self._is_stale():
+                            self.refresh()
+                    except Exception as e:
+                        print(f"Catalog stats refresh failed: {e}")
+
+            self._thread = threading.Thread(target=loop, name="catalog-stats-refresh", daemon=True)
+            self._thread.start()
+
+    def stats(self) -> dict:
+        """Return the snapshot age and refresh count."""
+        return {"age_seconds": round(self.age(), 1), "refreshes": self.refreshes}
+
+
+catalog_stats = CatalogStatsSnapshot(supabase, versions=data_versions)
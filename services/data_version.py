@@ -0,0 +1,131 @@
+"""
+Cheap per-table data versions used to invalidate caches.
+
+A table's version is (highest id, latest updated_at), read with two
+index-backed ``order ... limit 1`` queries. A background thread polls every
+table each ``DATA_VERSION_POLL_SECONDS``, and ``version()`` only returns the
+cached value, so caches can compare versions on every lookup without any
+database round trip. Inserts and updates that touch ``updated_at`` change the
+version. Deleting a row other than the newest one does not; the caches pick
+those up through their own TTLs and periodic reloads.
+"""
+import threading
+import time
+
+from supabase import create_client
+from config import SUPABASE_URL, SUPABASE_KEY, DATA_VERSION_POLL_SECONDS
+
+# Initialize client
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+CATALOG_TABLES = ('courses', 'tasks', 'resources')
+
+
+class DataVersionTracker:
+    """Polls and caches a version tuple per table."""
+
+    def __init__(self, client, tables=CATALOG_TABLES, poll_seconds: float = DATA_VERSION_POLL_SECONDS):
+        self.client = client
+        self.tables = tables
+        self.poll_seconds = poll_seconds
+        self._versions = {}  # table -> (checked_at, version)
+        self._lock = threading.Lock()
+        self._first_poll_locks = {table: threading.Lock() for table in tables}
+        self._listeners = []
+        self._thread = None
+        self._wake = threading.Event()
+
+    def _fetch_version(self, table: str):
+        """Query the current version of table."""
+        latest = self.client.table(table).select("id").order("id", desc=True).limit(1).execute()
+        max_id = latest.data[0]["id"] if latest.data else None
+
+        try:
+            # The gte filter skips NULL updated_at values, which would otherwise sort first
+            updated = self.client.table(table).select("updated_at").gte("updated_at", "1970-01-01") \
+                .order("updated_at", desc=True).limit(1).execute()
+            max_updated_at = updated.data[0]["updated_at"] if updated.data else None
+        except Exception:
+            max_updated_at = None  # table has no updated_at column
+
+        return max_id, max_updated_at
+
+    def version(self, table: str):
+        """Return the last polled version of table; only the very first lookup waits for a poll."""
+        cached = self._versions.get(table)
+        if cached is not None:
+            return cached[1]
+
+        self.start_polling()
+        # Single flight: concurrent first lookups wait for one poll instead of each querying
+        with self._first_poll_locks.setdefault(table, threading.Lock()):
+            cached = self._versions.get(table)
+            if cached is not None:
+                return cached[1]
+            return self.poll(table)
+
+    def poll(self, table: str):
+        """Fetch the version of table now and notify listeners if it changed."""
+        try:
+            version = self._fetch_version(table)
+        except Exception as e:
+            print(f"Data version check failed for {table}: {e}")
+            with self._lock:
+                previous = self._versions.get(table)
+                if previous is None:
+                    return None
+                # Keep serving the last known version; the poller tries again next interval
+                self._versions[table] = (time.monotonic(), previous[1])
+                return previous[1]
+
+        with self._lock:
+            previous = self._versions.get(table)
+            self._versions[table] = (time.monotonic(), version)
+            listeners = list(self._listeners)
+
+        if previous is not None and previous[1] != version:
+            for listener in listeners:
+                try:
+                    listener(table, version)
+                except Exception as e:
+                    print(f"Data version listener failed: {e}")
+        return version
+
+    def catalog_version(self):
+        """Return the combined version of every tracked table."""
+        return tuple(self.version(table) for table in self.tables)
+
+    def invalidate(self, table: str = None):
+        """Ask the poller to re-check table (or every table) now, e.g. after a write."""
+        with self._lock:
+            for name in [table] if table else list(self._versions):
+                if name in self._versions:
+                    self._versions[name] = (float("-inf"), self._versions[name][1])
+        self._wake.set()
+
+    def subscribe(self, listener):
+        """Call listener(table, version) whenever a polled version differs from the previous one."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def start_polling(self):
+        """Poll every table in a background thread (idempotent)."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            def loop():
+                while True:
+                    for table in self.tables:
+                        self.poll(table)
+                    self._wake.wait(self.poll_seconds)
+                    self._wake.clear()
+
+            self._thread = threading.Thread(target=loop, name="data-version-poller", daemon=True)
+            self._thread.start()
+
+
+data_versions = DataVersionTracker(supabase)
@@ -0,0 +1,168 @@
+"""
+Micro-batching dispatcher for the embeddings API.
+
+Callers from any thread (or asyncio task) submit single texts; a collector
+thread gathers everything that arrives within a short window, or until the
+batch is full, and sends it as one ``embeddings.create`` call. Vectors are
+fanned back out to the waiting callers through futures.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import (EMBEDDING_MODEL, EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_BATCH_MAX_SIZE,
+                    EMBEDDING_BATCH_CONCURRENCY)
+
+
+class _Request:
+    """A single text waiting to be embedded."""
+
+    __slots__ = ('text', 'future', 'submitted_at')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched API calls."""
+
+    def __init__(self, client, model: str = EMBEDDING_MODEL, window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE, concurrency: int = EMBEDDING_BATCH_CONCURRENCY):
+        self.client = client
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embedding-batch")
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "batches": 0,
+            "items": 0,
+            "unique_items": 0,
+            "max_batch_size": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_api_ms": 0.0,
+            "failed_batches": 0
+        }
+
+    def _ensure_started(self):
+        """Start the collector thread on first use."""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect_loop, name="embedding-batcher",
+                                                    daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue text for embedding and return a future resolving to its vector."""
+        self._ensure_started()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def embed(self, text: str, timeout: float = None):
+        """Embed a single text, blocking until its batch completes. Returns [] on failure."""
+        try:
+            return self.submit(text).result(timeout=timeout)
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+            return []
+
+    def embed_many(self, texts, timeout: float = None):
+        """Embed several texts through the dispatcher, preserving order."""
+        futures = [self.submit(text) for text in texts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=timeout))
+            except Exception as e:
+                print(f"Embedding failed: {e}")
+                results.append([])
+        return results
+
+    async def aembed(self, text: str):
+        """Embed a single text from asyncio code without blocking the event loop."""
+        try:
+            return await asyncio.wrap_future(self.submit(text))
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+            return []
+
+    def _collect_loop(self):
+        """Gather requests into batches and hand each batch to the executor."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        """Send one batched API call and resolve every request in the batch."""
+        dispatched_at = time.perf_counter()
+        waits = [(dispatched_at - request.submitted_at) * 1000 for request in batch]
+
+        # Identical texts inside one window share a single input slot
+        unique_texts = list(dict.fromkeys(request.text for request in batch))
+
+        try:
+            response = self.client.embeddings.create(input=unique_texts, model=self.model)
+            vectors = [None] * len(unique_texts)
+            for item in response.data:
+                vectors[item.index] = item.embedding
+            by_text = dict(zip(unique_texts, vectors))
+            for request in batch:
+                request.future.set_result(by_text[request.text])
+            failed = False
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            failed = True
+
+        api_ms = (time.perf_counter() - dispatched_at) * 1000
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics["batches"] += 1
+            metrics["items"] += len(batch)
+            metrics["unique_items"] += len(unique_texts)
+            metrics["max_batch_size"] = max(metrics["max_batch_size"], len(batch))
+            metrics["total_wait_ms"] += sum(waits)
+            metrics["max_wait_ms"] = max(metrics["max_wait_ms"], max(waits))
+            metrics["total_api_ms"] += api_ms
+            if failed:
+                metrics["failed_batches"] += 1
+
+    def stats(self) -> dict:
+        """Return batch-size and wait-time metrics."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        batches = metrics["batches"]
+        items = metrics["items"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size_limit": self.max_batch_size,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "unique_items": metrics["unique_items"],
+            "failed_batches": metrics["failed_batches"],
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "max_batch_size": metrics["max_batch_size"],
+            "avg_wait_ms": round(metrics["total_wait_ms"] / items, 2) if items else 0.0,
+            "max_wait_ms": round(metrics["max_wait_ms"], 2),
+            "avg_api_ms": round(metrics["total_api_ms"] / batches, 2) if batches else 0.0
+        }
@@ -0,0 +1,148 @@
+"""
+Token-aware bulk embedding pipeline used by the seeder.
+
+Texts already in the disk store are served from it; the rest are deduplicated,
+packed into batches bounded by tiktoken token counts, and embedded by several
+concurrent API calls with rate-limit-aware exponential backoff.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+import tiktoken
+from config import (EMBEDDING_MODEL, EMBEDDING_PIPELINE_MAX_TOKENS, EMBEDDING_PIPELINE_MAX_ITEMS,
+                    EMBEDDING_PIPELINE_CONCURRENCY, EMBEDDING_PIPELINE_MAX_RETRIES)
+from services.embedding_service import openai_client
+from services.embedding_store import get_embedding_store
+
+MAX_INPUT_TOKENS = 8191  # per-input limit of the embedding models
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """Return the tokenizer of the embedding model, loaded on first use (tiktoken may download it)."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    _encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens the embedding model sees for text."""
+    return len(get_encoding().encode(text))
+
+
+def _clip(text: str):
+    """Clip text to the per-input token limit and return (text, token_count)."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) > MAX_INPUT_TOKENS:
+        tokens = tokens[:MAX_INPUT_TOKENS]
+        text = encoding.decode(tokens)
+    return text, len(tokens)
+
+
+def pack_batches(texts, max_tokens: int = EMBEDDING_PIPELINE_MAX_TOKENS,
+                 max_items: int = EMBEDDING_PIPELINE_MAX_ITEMS):
+    """Greedily pack texts into batches bounded by total tokens and item count."""
+    batches = []
+    current, current_tokens = [], 0
+    for text in texts:
+        clipped, tokens = _clip(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((text, clipped))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _retry_delay(error, attempt: int) -> float:
+    """Honour Retry-After when the API sends it, otherwise back off exponentially with jitter."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+
+def _embed_batch(batch, max_retries: int):
+    """Embed one packed batch, retrying transient failures. Returns {text: embedding}."""
+    inputs = [clipped for _, clipped in batch]
+    for attempt in range(max_retries + 1):
+        try:
+            response = openai_client.embeddings.create(input=inputs, model=EMBEDDING_MODEL)
+            vectors = [None] * len(inputs)
+            for item in response.data:
+                vectors[item.index] = item.embedding
+            return {text: vector for (text, _), vector in zip(batch, vectors)}
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                print(f"Embedding batch failed after {max_retries} retries: {e}")
+                return {}
+            delay = _retry_delay(e, attempt)
+            print(f"Embedding batch throttled ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+        except Exception as e:
+            print(f"Embedding batch failed: {e}")
+            return {}
+    return {}
+
+
+def embed_texts(texts, concurrency: int = EMBEDDING_PIPELINE_CONCURRENCY,
+                max_retries: int = EMBEDDING_PIPELINE_MAX_RETRIES, progress=None):
+    """Embed many texts, returning vectors in input order ([] for texts that failed).
+
+    progress, if given, is called with the number of distinct texts resolved by each step.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    store = get_embedding_store()
+
+    embeddings = {}
+    if store is not None:
+        try:
+            embeddings.update(store.get_many(unique_texts))
+        except Exception as e:
+            print(f"Embedding store read failed: {e}")
+
+    missing = [text for text in unique_texts if text not in embeddings]
+    batches = pack_batches(missing)
+    if progress is not None:
+        progress(len(unique_texts) - len(missing))
+
+    if batches:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(lambda batch: _embed_batch(batch, max_retries), batches)
+            for batch_texts, result in zip(batches, results):
+                embeddings.update(result)
+                if store is not None and result:
+                    try:
+                        store.put_many(result)
+                    except Exception as e:
+                        print(f"Embedding store write failed: {e}")
+                if progress is not None:
+                    progress(len(batch_texts))
+
+    return [embeddings.get(text) or [] for text in texts]
@@ -0,0 +1,271 @@
+"""
+Shared embedding service used by every search tool.
+
+Query embeddings are cached in-process with a bounded LRU + TTL cache keyed by
+the normalized query text and the embedding model. Concurrent requests for the
+same key wait on a single in-flight API call instead of issuing their own.
+Misses consult the persistent disk store before calling the embeddings API,
+and API calls go through the micro-batching dispatcher. ``aembed_query`` is
+the same lookup for async callers; it awaits the dispatcher too, and uses the
+AsyncOpenAI client directly only when batching is disabled.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import openai
+from config import (OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL,
+                    EMBEDDING_BATCHING_ENABLED)
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_store import get_embedding_store
+
+# Initialize client
+openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+embedding_batcher = EmbeddingBatcher(openai_client)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry."""
+    return " ".join(text.split()).casefold()
+
+
+class _InFlight:
+    """A pending embedding request that other callers can wait on."""
+
+    __slots__ = ('event', 'result', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = []
+        self.waiters = []  # (loop, future) of async callers
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache with TTL eviction and stampede protection."""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, ttl: float = EMBEDDING_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, embedding)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _claim(self, key):
+        """Return (embedding, None, False) on a hit, else (None, pending request, whether we must compute it)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, embedding = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding, None, False
+                del self._entries[key]
+                self.evictions += 1
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = self._in_flight[key] = _InFlight()
+                self.misses += 1
+                return None, pending, True
+            self.coalesced += 1
+            return None, pending, False
+
+    def _finish(self, key, pending: _InFlight):
+        """Store the leader's result and wake the callers waiting on it."""
+        with self._lock:
+            if pending.result:
+                self._store(key, pending.result)
+            del self._in_flight[key]
+            pending.event.set()
+            waiters, pending.waiters = pending.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached embedding for key, computing it at most once concurrently."""
+        embedding, pending, leader = self._claim(key)
+        if pending is None:
+            return embedding
+        if not leader:
+            pending.event.wait()
+            return pending.result
+
+        try:
+            pending.result = compute()
+        finally:
+            self._finish(key, pending)
+        return pending.result
+
+    async def aget_or_compute(self, key, compute):
+        """Async get_or_compute: compute is a coroutine function, and waiters await a future instead of blocking.
+
+        Shares in-flight requests with get_or_compute, so sync and async callers never embed the same key twice.
+        """
+        embedding, pending, leader = self._claim(key)
+        if pending is None:
+            return embedding
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if pending.event.is_set():
+                    future.set_result(None)
+                else:
+                    pending.waiters.append((loop, future))
+            await future
+            return pending.result
+
+        try:
+            pending.result = await compute()
+        finally:
+            self._finish(key, pending)
+        return pending.result
+
+    def _store(self, key, embedding):
+        """Insert an entry and evict the least recently used ones. Caller holds the lock."""
+        self._entries[key] = (time.monotonic() + self.ttl, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+            }
+
+
+_query_cache = EmbeddingCache()
+
+
+def _create_embedding(text: str):
+    """Call the embeddings API for a single text."""
+    if EMBEDDING_BATCHING_ENABLED:
+        return embedding_batcher.embed(text)
+    try:
+        response = openai_client.embeddings.create(
+            input=[text],
+            model=EMBEDDING_MODEL
+        )
+        return response.data[0].embedding
+    except Exception as e:
+        print(f"Embedding failed: {e}")
+        return []
+
+
+async def _acreate_embedding(text: str):
+    """Async _create_embedding: through the dispatcher, or the async client when batching is disabled."""
+    if EMBEDDING_BATCHING_ENABLED:
+        return await embedding_batcher.aembed(text)
+    try:
+        response = await async_openai_client.embeddings.create(
+            input=[text],
+            model=EMBEDDING_MODEL
+        )
+        return response.data[0].embedding
+    except Exception as e:
+        print(f"Embedding failed: {e}")
+        return []
+
+
+def _store_get(text: str):
+    """Return the embedding for text from the disk store, or None."""
+    store = get_embedding_store()
+    if store is not None:
+        try:
+            return store.get(text)
+        except Exception as e:
+            print(f"Embedding store read failed: {e}")
+    return None
+
+
+def _store_put(text: str, embedding):
+    """Save an embedding to the disk store."""
+    store = get_embedding_store()
+    if embedding and store is not None:
+        try:
+            store.put(text, embedding)
+        except Exception as e:
+            print(f"Embedding store write failed: {e}")
+
+
+def _stored_embedding(text: str):
+    """Return the embedding for text from the disk store, falling back to the API."""
+    embedding = _store_get(text)
+    if embedding is not None:
+        return embedding
+
+    embedding = _create_embedding(text)
+    _store_put(text, embedding)
+    return embedding
+
+
+def embed_query(text: str):
+    """Generate embedding for search query, served from the cache when possible."""
+    normalized = normalize_text(text)
+    if not normalized:
+        return []
+    return _query_cache.get_or_compute(
+        (EMBEDDING_MODEL, normalized),
+        lambda: _stored_embedding(normalized)
+    )
+
+
+async def aembed_query(text: str):
+    """Async embed_query: the cache and disk store first, then the embeddings API."""
+    normalized = normalize_text(text)
+    if not normalized:
+        return []
+
+    async def compute():
+        embedding = await asyncio.to_thread(_store_get, normalized)
+        if embedding is None:
+            embedding = await _acreate_embedding(normalized)
+            await asyncio.to_thread(_store_put, normalized, embedding)
+        return embedding
+
+    return await _query_cache.aget_or_compute((EMBEDDING_MODEL, normalized), compute)
+
+
+def embed_text(text: str):
+    """Generate embedding for document text exactly as given, using the disk store first."""
+    if not text:
+        return []
+    return _stored_embedding(text)
+
+
+def get_embedding_cache_stats() -> dict:
+    """Return statistics for the shared query embedding cache."""
+    return _query_cache.stats()
+
+
+def get_embedding_batch_stats() -> dict:
+    """Return batch-size and wait-time metrics for the embedding dispatcher."""
+    return embedding_batcher.stats()
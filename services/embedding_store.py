@@ -0,0 +1,174 @@
+"""
+Persistent on-disk embedding store shared across processes and restarts.
+
+Vectors live in one float32 matrix file per model that is read through a
+memory map; a SQLite index maps the content hash of each embedded text to its
+row. Writers serialize on a SQLite write transaction, and a row only becomes
+visible in the index after its vector bytes have been written, so any number
+of worker processes can read concurrently.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from config import EMBEDDING_MODEL, VECTOR_DIM, EMBEDDING_STORE_DIR, EMBEDDING_STORE_ENABLED
+
+
+def content_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Hash the embedded text together with the model that embedded it."""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """SQLite index + memory-mapped float32 matrix keyed by content hash and model."""
+
+    def __init__(self, directory: str = EMBEDDING_STORE_DIR, model: str = EMBEDDING_MODEL,
+                 dim: int = VECTOR_DIM):
+        self.directory = directory
+        self.model = model
+        self.dim = dim
+        self.row_bytes = dim * 4
+        os.makedirs(directory, exist_ok=True)
+
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.index_path = os.path.join(directory, "index.sqlite3")
+        self.matrix_path = os.path.join(directory, f"{safe_model}.{dim}.f32")
+
+        self._local = threading.local()
+        self._map_lock = threading.Lock()
+        self._matrix = None
+        self._fd = os.open(self.matrix_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS embeddings_model_row ON embeddings (model, row)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (autocommit, WAL for concurrent readers)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _rows_view(self, needed_rows: int):
+        """Return a memory map covering at least needed_rows rows, remapping if the file grew."""
+        with self._map_lock:
+            if self._matrix is None or self._matrix.shape[0] < needed_rows:
+                total_rows = os.fstat(self._fd).st_size // self.row_bytes
+                if total_rows == 0:
+                    return None
+                self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r",
+                                         shape=(total_rows, self.dim))
+            return self._matrix
+
+    def get_many(self, texts) -> dict:
+        """Return {text: embedding} for every text already in the store."""
+        keys = {content_key(text, self.model): text for text in texts}
+        if not keys:
+            return {}
+
+        conn = self._connection()
+        rows = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, row in conn.execute(
+                    f"SELECT key, row FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [self.model, *chunk]):
+                rows[key] = row
+
+        if not rows:
+            return {}
+
+        matrix = self._rows_view(max(rows.values()) + 1)
+        if matrix is None:
+            return {}
+        return {keys[key]: matrix[row].tolist() for key, row in rows.items() if row < matrix.shape[0]}
+
+    def get(self, text: str):
+        """Return the stored embedding for text, or None."""
+        return self.get_many([text]).get(text)
+
+    def put_many(self, items: dict):
+        """Persist {text: embedding} pairs that are not stored yet."""
+        items = {text: emb for text, emb in items.items() if emb is not None and len(emb) == self.dim}
+        if not items:
+            return
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = []
+            for text, embedding in items.items():
+                key = content_key(text, self.model)
+                if conn.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone():
+                    continue
+                pending.append((key, embedding))
+
+            if pending:
+                next_row = conn.execute(
+                    "SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE model = ?", (self.model,)
+                ).fetchone()[0]
+                block = np.asarray([emb for _, emb in pending], dtype=np.float32)
+                # Vector bytes are written before the index rows are committed
+                os.pwrite(self._fd, block.tobytes(), next_row * self.row_bytes)
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO embeddings (key, model, row, created_at) VALUES (?, ?, ?, ?)",
+                    [(key, self.model, next_row + i, now) for i, (key, _) in enumerate(pending)]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put(self, text: str, embedding):
+        """Persist a single embedding."""
+        self.put_many({text: embedding})
+
+    def stats(self) -> dict:
+        """Return the number of stored vectors for this model and the matrix size on disk."""
+        count = self._connection().execute(
+            "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)
+        ).fetchone()[0]
+        return {
+            "model": self.model,
+            "vectors": count,
+            "matrix_bytes": os.fstat(self._fd).st_size,
+            "directory": self.directory
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """Return the process-wide disk store, or None if it cannot be opened."""
+    global _store
+    if not EMBEDDING_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = DiskEmbeddingStore()
+                except Exception as e:
+                    print(f"Embedding store unavailable: {e}")
+                    _store = False
+    return _store or None
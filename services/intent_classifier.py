@@ -0,0 +1,123 @@
+"""
+Embedding-based intent classifier.
+
+Each intent has a few prototype phrasings. Their embeddings are computed once
+(and kept in the disk embedding store), stacked into one normalized matrix,
+and a query is classified with a single matrix-vector product against the
+query embedding the search will use anyway, so no extra API call is made.
+Prototypes are normalized like queries (``normalize_text``) before embedding.
+If they cannot be embedded, every query is left unclassified until
+``INTENT_RETRY_SECONDS`` have passed.
+"""
+import threading
+import time
+
+import numpy as np
+from config import INTENT_MIN_SIMILARITY, INTENT_MIN_MARGIN, INTENT_RETRY_SECONDS
+from services.embedding_pipeline import embed_texts
+from services.embedding_service import normalize_text
+from services.vector_index import normalize_rows
+
+INTENT_PROTOTYPES = {
+    'count': [
+        "How many courses do you have?",
+        "How big is your catalog?",
+        "What is the total number of tasks and resources?",
+        "How much content is in the database?"
+    ],
+    'list_courses': [
+        "List all courses",
+        "What courses are available?",
+        "Show me the course catalog",
+        "Which classes do you offer?"
+    ],
+    'find_tasks': [
+        "Give me 5 blockchain tasks",
+        "I need practice exercises on Python",
+        "Show me assignments about data science",
+        "Any hands-on projects for machine learning?"
+    ],
+    'find_courses': [
+        "Find machine learning courses",
+        "Is there a class that teaches web development?",
+        "Recommend a course on economics",
+        "Which program covers cloud computing?"
+    ],
+    'find_resources': [
+        "Show me Python resources",
+        "Links and articles about blockchain",
+        "Good tutorials or documentation for React",
+        "Books and videos on statistics"
+    ],
+    'learning_plan': [
+        "I want to learn web development",
+        "Create a learning plan for AI in 3 months",
+        "How should I get started becoming a data scientist?",
+        "Help me build a study roadmap for cybersecurity"
+    ]
+}
+
+
+class IntentClassifier:
+    """Nearest-prototype intent classifier over cosine similarity."""
+
+    def __init__(self, prototypes: dict = INTENT_PROTOTYPES, min_similarity: float = INTENT_MIN_SIMILARITY,
+                 min_margin: float = INTENT_MIN_MARGIN, retry_seconds: float = INTENT_RETRY_SECONDS):
+        self.prototypes = prototypes
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.retry_seconds = retry_seconds
+        self.intents = list(prototypes)
+        self._matrix = None
+        self._starts = None  # first matrix row of each intent, for np.maximum.reduceat
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def _load(self) -> bool:
+        """Embed the prototypes once and build the normalized matrix; False while they are unavailable."""
+        if self._matrix is not None:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        with self._lock:
+            if self._matrix is not None:
+                return True
+            if time.monotonic() < self._retry_at:
+                return False
+            # Same normalization as embed_query, so prototypes and queries are embedded alike
+            phrases = [normalize_text(phrase) for intent in self.intents for phrase in self.prototypes[intent]]
+            try:
+                embeddings = embed_texts(phrases)
+                if any(not embedding for embedding in embeddings):
+                    raise RuntimeError("empty embedding returned")
+            except Exception as e:
+                print(f"Failed to embed intent prototypes, retrying in {self.retry_seconds}s: {e}")
+                self._retry_at = time.monotonic() + self.retry_seconds
+                return False
+            sizes = [len(self.prototypes[intent]) for intent in self.intents]
+            self._starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            self._matrix = np.ascontiguousarray(normalize_rows(np.asarray(embeddings, dtype=np.float32)))
+            return True
+
+    def scores(self, query_embedding) -> dict:
+        """Return the best prototype similarity per intent (all 0.0 while the prototypes are unavailable)."""
+        if not self._load():
+            return {intent: 0.0 for intent in self.intents}
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return {intent: 0.0 for intent in self.intents}
+        best = np.maximum.reduceat(self._matrix @ (query / norm), self._starts)
+        return dict(zip(self.intents, best.tolist()))
+
+    def classify(self, query_embedding):
+        """Return (intent, similarity), or (None, similarity) when no intent is clearly closest."""
+        scores = self.scores(query_embedding)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (intent, best), (_, runner_up) = ranked[0], ranked[1]
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return None, best
+        return intent, best
+
+
+intent_classifier = IntentClassifier()
@@ -0,0 +1,47 @@
+"""
+Shared helpers for taking user queries apart: tokens, number words, stopwords.
+
+Used by the fast-path router to extract slots and by anything that needs a
+normalized form of a query.
+"""
+import re
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15, 'sixteen': 16,
+    'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20, 'a couple': 2, 'a few': 3,
+    'couple': 2, 'few': 3, 'dozen': 12
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'me', 'i', 'you', 'we', 'us', 'my', 'your', 'our', 'some', 'any', 'about', 'on', 'for',
+    'of', 'in', 'to', 'with', 'and', 'or', 'please', 'can', 'could', 'would', 'will', 'do', 'does', 'is',
+    'are', 'there', 'have', 'has', 'what', 'which', 'that', 'this', 'these', 'those', 'give', 'show',
+    'find', 'get', 'list', 'need', 'want', 'like', 'looking', 'search', 'recommend', 'suggest', 'more',
+    'good', 'best', 'top', 'related', 'regarding', 'around', 'into', 'at', 'by', 'from', 'all', 'available',
+    'hi', 'hello', 'hey', 'thanks', 'thank', 'be', 'it', 'its', 'other', 'few', 'couple', 'dozen', 'tell'
+}
+
+_WORD = re.compile(r"[a-z0-9+#.]+(?:'[a-z]+)?")
+_NUMBER_PHRASE = re.compile(r"\b(" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")\b")
+
+
+def tokenize(text: str):
+    """Lowercase word tokens (keeps things like 'c++', 'c#' and 'node.js' together)."""
+    return [token.strip('.') for token in _WORD.findall(text.lower()) if token.strip('.')]
+
+
+def numbers_to_digits(text: str) -> str:
+    """Replace number words ('five', 'a few') with digits."""
+    return _NUMBER_PHRASE.sub(lambda match: str(NUMBER_WORDS[match.group(1)]), text.lower())
+
+
+def extract_count(text: str, default=None):
+    """Return the first small number in text (digits or number words), or default."""
+    match = re.search(r"\b(\d{1,3})\b", numbers_to_digits(text))
+    return int(match.group(1)) if match else default
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query for cache keys: lowercase, number words as digits, no punctuation or stopwords."""
+    return ' '.join(token for token in tokenize(numbers_to_digits(text)) if token not in STOPWORDS)
@@ -0,0 +1,398 @@
+"""
+Vector search backend shared by the search tools.
+
+``search_table`` answers ``match_courses`` / ``match_tasks`` /
+``match_resources`` queries through the Supabase RPCs, the local in-memory
+index, or the IVF-PQ ANN index, depending on ``SEARCH_BACKEND``.
+
+``match_all`` searches several tables in a single round trip using the
+``match_all`` SQL function (db_setup/sql/match_all.sql). ``memory_match_all``
+is a NumPy re-implementation of it over the in-memory indexes: it takes the
+same parameters and returns the same JSON shape, but it does not run the SQL.
+tests/test_match_all.py checks the two stay in step.
+
+``ladder_search`` fetches top-k once at the lowest threshold tier and picks
+the strictest tier that still yields the requested count, replacing the
+"search again with a lower threshold" retries the agent used to make.
+
+Results are cached per (table, embedding, threshold, count, course_filter)
+and invalidated when the table's data version changes.
+
+Passing ``snippet_length`` selects slim mode: long text columns are cut on
+the server by the ``match_*_slim`` functions (db_setup/sql/match_slim.sql),
+and ``fetch_by_ids`` hydrates full rows later for the ids that need them.
+
+``asearch_table``, ``aladder_search`` and ``amatch_all`` are the async
+counterparts, sharing the result cache and local indexes but sending RPCs
+through the async Supabase client. Cache lookups and in-memory index
+searches (which may have to load an index) run in worker threads so they
+never block the event loop.
+"""
+import asyncio
+import time
+
+from supabase import create_client, acreate_client
+from config import (SUPABASE_URL, SUPABASE_KEY, SEARCH_BACKEND, UNIFIED_SEARCH_RPC, UNIFIED_SEARCH_RETRY_SECONDS,
+                    SIMILARITY_THRESHOLD_LADDER, SEARCH_CACHE_ENABLED, SLIM_SNIPPET_LENGTH)
+from services.ann_index import ANNStore, IndexNotReady
+from services.data_version import data_versions
+from services.search_cache import SearchResultCache, make_key
+from services.vector_index import LocalVectorStore, TABLE_COLUMNS
+
+# Initialize client
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+RPC_FUNCTIONS = {
+    "courses": "match_courses",
+    "tasks": "match_tasks",
+    "resources": "match_resources"
+}
+
+SLIM_RPC_FUNCTIONS = {
+    "courses": "match_courses_slim",
+    "tasks": "match_tasks_slim"
+}
+
+# Long text column of each table that slim mode truncates
+TEXT_COLUMNS = {
+    "courses": "description",
+    "tasks": "content"
+}
+
+COUNT_PARAMS = {
+    "courses": "course_count",
+    "tasks": "task_count",
+    "resources": "resource_count"
+}
+
+local_store = LocalVectorStore(supabase, versions=data_versions)
+ann_store = ANNStore(local_store)
+search_cache = SearchResultCache(data_versions)
+
+# Async client, created on first use (it has to be created inside the event loop)
+_async_supabase = None
+
+# When the match_all / slim functions are missing we fall back until these times
+_match_all_retry_at = 0.0
+_slim_retry_at = 0.0
+
+
+def truncate_rows(table: str, rows, snippet_length=None):
+    """Cut the table's long text column to snippet_length characters (client-side slim mode)."""
+    column = TEXT_COLUMNS.get(table)
+    if snippet_length is None or column is None:
+        return rows
+    truncated = []
+    for row in rows:
+        if row.get(column) and len(row[column]) > snippet_length:
+            row = dict(row)
+            row[column] = row[column][:snippet_length]
+        truncated.append(row)
+    return truncated
+
+
+def snippet(text, length: int = SLIM_SNIPPET_LENGTH):
+    """Mark text truncated by slim mode (which keeps length + 1 characters) with an ellipsis."""
+    if text and len(text) > length:
+        return text[:length] + "..."
+    return text
+
+
+async def get_async_client():
+    """Return the shared async Supabase client."""
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _async_supabase
+
+
+def _rpc_params(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None):
+    """Parameters of the table's match_* function."""
+    params = {
+        'query_embedding': query_embedding,
+        'match_threshold': match_threshold,
+        'match_count': match_count
+    }
+    if table != "courses":
+        params['course_filter'] = course_filter
+    return params
+
+
+def _use_slim_rpc(table: str, snippet_length) -> bool:
+    """True if the slim match_* variant should be tried."""
+    return snippet_length is not None and table in SLIM_RPC_FUNCTIONS and time.monotonic() >= _slim_retry_at
+
+
+def _slim_rpc_failed(table: str, e: Exception):
+    """Stop trying the slim functions for a while."""
+    global _slim_retry_at
+    print(f"{SLIM_RPC_FUNCTIONS[table]} unavailable, truncating full rows instead: {e}")
+    _slim_retry_at = time.monotonic() + UNIFIED_SEARCH_RETRY_SECONDS
+
+
+def rpc_search(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+               snippet_length=None):
+    """Run the table's match_* RPC (or its slim variant) on the database."""
+    params = _rpc_params(table, query_embedding, match_threshold, match_count, course_filter)
+
+    if _use_slim_rpc(table, snippet_length):
+        try:
+            return supabase.rpc(SLIM_RPC_FUNCTIONS[table],
+                                {**params, 'snippet_length': snippet_length}).execute().data or []
+        except Exception as e:
+            _slim_rpc_failed(table, e)
+
+    rows = supabase.rpc(RPC_FUNCTIONS[table], params).execute().data or []
+    return truncate_rows(table, rows, snippet_length)
+
+
+async def arpc_search(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                      snippet_length=None):
+    """Async rpc_search."""
+    client = await get_async_client()
+    params = _rpc_params(table, query_embedding, match_threshold, match_count, course_filter)
+
+    if _use_slim_rpc(table, snippet_length):
+        try:
+            response = await client.rpc(SLIM_RPC_FUNCTIONS[table],
+                                        {**params, 'snippet_length': snippet_length}).execute()
+            return response.data or []
+        except Exception as e:
+            _slim_rpc_failed(table, e)
+
+    response = await client.rpc(RPC_FUNCTIONS[table], params).execute()
+    return truncate_rows(table, response.data or [], snippet_length)
+
+
+def _cached_or_version(key):
+    """Return (cached rows, None) on a hit, or (None, the table's data version) on a miss."""
+    rows = search_cache.get(key)
+    return (rows, None) if rows is not None else (None, search_cache.version(key[0]))
+
+
+def search_table(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                 snippet_length=None):
+    """Return match_* rows for table, from the result cache or the configured backend."""
+    if not SEARCH_CACHE_ENABLED:
+        return _search_uncached(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+
+    key = make_key(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+    rows, version = _cached_or_version(key)
+    if rows is None:
+        rows = _search_uncached(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+        search_cache.put(key, rows, version)
+    return rows
+
+
+async def asearch_table(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                        snippet_length=None):
+    """Async search_table."""
+    if not SEARCH_CACHE_ENABLED:
+        return await _asearch_uncached(table, query_embedding, match_threshold, match_count, course_filter,
+                                       snippet_length)
+
+    key = make_key(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+    rows, version = await asyncio.to_thread(_cached_or_version, key)
+    if rows is None:
+        rows = await _asearch_uncached(table, query_embedding, match_threshold, match_count, course_filter,
+                                       snippet_length)
+        await asyncio.to_thread(search_cache.put, key, rows, version)
+    return rows
+
+
+def _local_search(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                  snippet_length=None):
+    """Search the in-memory index for the local backends; None if there is none or it failed."""
+    if SEARCH_BACKEND not in ("local", "ann"):
+        return None
+    store = ann_store if SEARCH_BACKEND == "ann" else local_store
+    try:
+        rows = store.search(table, query_embedding, match_threshold, match_count, course_filter)
+        return truncate_rows(table, rows, snippet_length)
+    except IndexNotReady:
+        return None
+    except Exception as e:
+        print(f"{SEARCH_BACKEND} {table} index unavailable, falling back to RPC: {e}")
+        return None
+
+
+def _search_uncached(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                     snippet_length=None):
+    """Return match_* rows for table using the configured backend."""
+    rows = _local_search(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+    if rows is not None:
+        return rows
+    return rpc_search(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+
+
+async def _asearch_uncached(table: str, query_embedding, match_threshold: float, match_count: int,
+                            course_filter=None, snippet_length=None):
+    """Async _search_uncached."""
+    if SEARCH_BACKEND in ("local", "ann"):
+        rows = await asyncio.to_thread(_local_search, table, query_embedding, match_threshold, match_count,
+                                       course_filter, snippet_length)
+        if rows is not None:
+            return rows
+    return await arpc_search(table, query_embedding, match_threshold, match_count, course_filter, snippet_length)
+
+
+def fetch_by_ids(table: str, ids, columns=None):
+    """Hydrate full rows by id (e.g. after a slim search), in the order the ids were given."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    columns = columns or TABLE_COLUMNS[table]
+    rows = supabase.table(table).select(", ".join(columns)).in_("id", ids).execute().data or []
+    by_id = {row["id"]: row for row in rows}
+    return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+
+def threshold_tiers(match_threshold: float, ladder=SIMILARITY_THRESHOLD_LADDER):
+    """Return the requested threshold followed by every lower ladder tier, strictest first."""
+    return sorted({match_threshold, *(tier for tier in ladder if tier < match_threshold)}, reverse=True)
+
+
+def apply_threshold_ladder(rows, match_threshold: float, match_count: int, ladder=SIMILARITY_THRESHOLD_LADDER):
+    """Pick the strictest tier with at least match_count rows; rows must be sorted by similarity.
+
+    Returns (rows, threshold_used). When no tier satisfies the count, every row
+    above the lowest tier is returned.
+    """
+    tiers = threshold_tiers(match_threshold, ladder)
+    for tier in tiers:
+        selected = [row for row in rows if row['similarity'] > tier]
+        if len(selected) >= match_count:
+            return selected[:match_count], tier
+    return rows[:match_count], tiers[-1]
+
+
+def ladder_search(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                  ladder=SIMILARITY_THRESHOLD_LADDER, snippet_length=None):
+    """Fetch top-k once at the lowest tier and apply the threshold ladder client-side."""
+    floor = threshold_tiers(match_threshold, ladder)[-1]
+    rows = search_table(table, query_embedding, floor, match_count, course_filter, snippet_length)
+    return apply_threshold_ladder(rows, match_threshold, match_count, ladder)
+
+
+async def aladder_search(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+                         ladder=SIMILARITY_THRESHOLD_LADDER, snippet_length=None):
+    """Async ladder_search."""
+    floor = threshold_tiers(match_threshold, ladder)[-1]
+    rows = await asearch_table(table, query_embedding, floor, match_count, course_filter, snippet_length)
+    return apply_threshold_ladder(rows, match_threshold, match_count, ladder)
+
+
+def memory_match_all(params: dict) -> dict:
+    """Answer a match_all call from the in-memory indexes (same parameters and result shape as the SQL)."""
+    store = ann_store if SEARCH_BACKEND == "ann" else local_store
+    include = params.get("include_tables") or list(RPC_FUNCTIONS)
+    return {
+        table: truncate_rows(table, store.search(table, params["query_embedding"], params["match_threshold"],
+                                                 params.get(count_param, 3)), params.get("snippet_length"))
+        if table in include else []
+        for table, count_param in COUNT_PARAMS.items()
+    }
+
+
+def _match_all_request(query_embedding, match_threshold: float, limits: dict, tables, snippet_length):
+    """Build the match_all parameters and serve cached tables. Returns (params, results, keys, versions, missing)."""
+    tables = [table for table in (tables or RPC_FUNCTIONS) if table in RPC_FUNCTIONS]
+    params = {
+        'query_embedding': query_embedding,
+        'match_threshold': match_threshold,
+        'include_tables': tables,
+        'snippet_length': snippet_length
+    }
+    for table, count_param in COUNT_PARAMS.items():
+        params[count_param] = limits.get(table, 0) if table in tables else 0
+
+    # Tables already in the result cache are served from it; only the rest are searched
+    results, keys, versions = {}, {}, {}
+    for table in tables:
+        if SEARCH_CACHE_ENABLED:
+            keys[table] = make_key(table, query_embedding, match_threshold, params[COUNT_PARAMS[table]],
+                                   snippet_length=snippet_length)
+            cached = search_cache.get(keys[table])
+            if cached is not None:
+                results[table] = cached
+            else:
+                versions[table] = search_cache.version(table)
+    missing = [table for table in tables if table not in results]
+    params['include_tables'] = missing
+    return params, results, keys, versions, missing
+
+
+def _memory_match_all_or_none(params: dict):
+    """memory_match_all for the local backends; None if not applicable or it failed."""
+    if SEARCH_BACKEND in ("local", "ann"):
+        try:
+            return memory_match_all(params)
+        except IndexNotReady:
+            return None
+        except Exception as e:
+            print(f"Local match_all failed, falling back to RPC: {e}")
+    return None
+
+
+def _match_all_rpc_available() -> bool:
+    """True unless match_all is disabled or recently failed."""
+    return UNIFIED_SEARCH_RPC and time.monotonic() >= _match_all_retry_at
+
+
+def _match_all_rpc_failed(e: Exception):
+    """Use per-table searches for a while."""
+    global _match_all_retry_at
+    print(f"match_all RPC unavailable, using per-table searches: {e}")
+    _match_all_retry_at = time.monotonic() + UNIFIED_SEARCH_RETRY_SECONDS
+
+
+def _match_all_results(data: dict, results: dict, keys: dict, versions: dict, missing):
+    """Merge freshly searched tables into results and cache them under the versions read before searching."""
+    for table in missing:
+        results[table] = data.get(table) or []
+        if SEARCH_CACHE_ENABLED:
+            search_cache.put(keys[table], results[table], versions[table])
+    return results
+
+
+def match_all(query_embedding, match_threshold: float, limits: dict, tables=None, snippet_length=None):
+    """Search several tables in one call. Returns {table: rows}, or None if the unified RPC is unavailable."""
+    params, results, keys, versions, missing = _match_all_request(query_embedding, match_threshold, limits, tables,
+                                                                  snippet_length)
+    if not missing:
+        return results
+
+    data = _memory_match_all_or_none(params)
+    if data is None:
+        if not _match_all_rpc_available():
+            return None
+        try:
+            data = supabase.rpc('match_all', params).execute().data or {}
+        except Exception as e:
+            _match_all_rpc_failed(e)
+            return None
+
+    return _match_all_results(data, results, keys, versions, missing)
+
+
+async def amatch_all(query_embedding, match_threshold: float, limits: dict, tables=None, snippet_length=None):
+    """Async match_all."""
+    params, results, keys, versions, missing = await asyncio.to_thread(
+        _match_all_request, query_embedding, match_threshold, limits, tables, snippet_length)
+    if not missing:
+        return results
+
+    data = None
+    if SEARCH_BACKEND in ("local", "ann"):
+        data = await asyncio.to_thread(_memory_match_all_or_none, params)
+    if data is None:
+        if not _match_all_rpc_available():
+            return None
+        try:
+            client = await get_async_client()
+            data = (await client.rpc('match_all', params).execute()).data or {}
+        except Exception as e:
+            _match_all_rpc_failed(e)
+            return None
+
+    return await asyncio.to_thread(_match_all_results, data, results, keys, versions, missing)
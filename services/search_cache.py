@@ -0,0 +1,117 @@
+"""
+Result cache in front of the match_* searches.
+
+Entries are keyed by (table, query-embedding hash, threshold, count,
+course_filter, snippet length), bounded by an estimate of their memory footprint, and tagged
+with the table's data version. Callers read the version before searching and
+pass it to put(), which drops the rows if the version moved on meanwhile. An
+entry whose table version has changed since it was stored is treated as a
+miss, so seeding or edits never serve stale rows.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from config import SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_TTL
+
+
+def embedding_hash(query_embedding) -> str:
+    """Stable short hash of a query embedding."""
+    return hashlib.blake2b(np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+
+def make_key(table: str, query_embedding, match_threshold: float, match_count: int, course_filter=None,
+             snippet_length=None):
+    """Build the cache key for one match_* call."""
+    return (table, embedding_hash(query_embedding), round(float(match_threshold), 4), int(match_count),
+            course_filter, snippet_length)
+
+
+class SearchResultCache:
+    """Memory-bounded LRU of search results with TTL and data-version invalidation."""
+
+    def __init__(self, versions, max_bytes: int = SEARCH_CACHE_MAX_BYTES, ttl: float = SEARCH_CACHE_TTL):
+        self.versions = versions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, version, size, rows)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    def version(self, table: str):
+        """Return the table's data version; read it before searching and pass it to put()."""
+        return self.versions.version(table)
+
+    def get(self, key):
+        """Return cached rows for key, or None on a miss or a stale entry."""
+        version = self.versions.version(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_version, size, rows = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(rows)
+
+    def put(self, key, rows, version):
+        """Store rows for key, searched at data version; dropped if the table has changed since."""
+        if version is None:
+            return  # version unknown, so we could never invalidate this entry
+        if version != self.versions.version(key[0]):
+            self.stale_puts += 1
+            return
+        size = len(json.dumps(rows, default=str)) + 200  # payload plus key/bookkeeping overhead
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, version, size, list(rows))
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        """Drop one entry. Caller holds the lock."""
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and memory use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,190 @@
+"""
+Local in-memory vector index for courses, tasks and resources.
+
+Each table's ``embedding`` column is loaded into one contiguous, L2-normalized
+float32 matrix so a search is a single matrix-vector product followed by
+``argpartition``. Results mirror the rows returned by the ``match_courses``,
+``match_tasks`` and ``match_resources`` RPCs, including ``similarity``.
+"""
+import json
+import threading
+import time
+
+import numpy as np
+from config import VECTOR_DIM, VECTOR_INDEX_PAGE_SIZE, VECTOR_INDEX_REFRESH_SECONDS
+
+# Columns each match_* RPC returns (besides similarity)
+TABLE_COLUMNS = {
+    "courses": ["id", "title", "description"],
+    "tasks": ["id", "title", "content", "course_id"],
+    "resources": ["id", "title", "url", "tags", "course_id"]
+}
+
+
+def parse_embedding(value):
+    """PostgREST returns pgvector columns as text; accept either a list or its JSON string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def iter_pages(client, table: str, columns, page_size: int = VECTOR_INDEX_PAGE_SIZE, after_id=None,
+               updated_since=None, course_id=None):
+    """Yield pages of table rows in id order using keyset pagination (id > last id seen).
+
+    after_id skips rows up to that id; updated_since keeps only rows with updated_at >= it;
+    course_id keeps only rows of that course.
+    """
+    last_id = after_id
+    while True:
+        query = client.table(table).select(", ".join(columns)).order("id").limit(page_size)
+        if updated_since is not None:
+            query = query.gte("updated_at", updated_since)
+        if course_id is not None:
+            query = query.eq("course_id", course_id)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.execute().data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def fetch_rows(client, table: str, columns, page_size: int = VECTOR_INDEX_PAGE_SIZE, after_id=None,
+               updated_since=None):
+    """Fetch every row of table in id order using keyset pagination."""
+    rows = []
+    for page in iter_pages(client, table, columns, page_size, after_id, updated_since):
+        rows.extend(page)
+    return rows
+
+
+class VectorIndex:
+    """Brute-force cosine similarity index over one table."""
+
+    def __init__(self, table: str, rows, embeddings, dim: int = VECTOR_DIM):
+        self.table = table
+        self.rows = rows
+        self.loaded_at = time.time()
+        self.version = None  # data version the rows were loaded at, if known
+
+        if rows:
+            matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(rows), dim)
+        else:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+        self.matrix = np.ascontiguousarray(normalize_rows(matrix))
+        self.ids = np.fromiter((row["id"] for row in rows), dtype=np.int64, count=len(rows))
+        self.course_ids = np.fromiter(
+            (row.get("course_id") if row.get("course_id") is not None else -1 for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+
+    @classmethod
+    def load(cls, client, table: str):
+        """Load every row of table that has an embedding."""
+        columns = TABLE_COLUMNS[table]
+        rows, embeddings = [], []
+        for row in fetch_rows(client, table, columns + ["embedding"]):
+            embedding = parse_embedding(row.pop("embedding", None))
+            if embedding is None or len(embedding) != VECTOR_DIM:
+                continue
+            rows.append(row)
+            embeddings.append(embedding)
+        return cls(table, rows, embeddings)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def scores(self, query_embedding) -> np.ndarray:
+        """Return the cosine similarity of the query to every row."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.rows), dtype=np.float32)
+        return self.matrix @ (query / norm)
+
+    def search(self, query_embedding, match_threshold: float, match_count: int, course_filter=None):
+        """Return up to match_count rows above match_threshold, most similar first."""
+        if not self.rows or match_count <= 0:
+            return []
+
+        scores = self.scores(query_embedding)
+        if course_filter is not None:
+            scores = np.where(self.course_ids == course_filter, scores, -np.inf)
+
+        k = min(match_count, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for i in candidates:
+            similarity = float(scores[i])
+            if similarity <= match_threshold:
+                break
+            row = dict(self.rows[i])
+            row["similarity"] = similarity
+            results.append(row)
+        return results
+
+
+class LocalVectorStore:
+    """Lazily loaded indexes for the three searchable tables, reloaded when stale or when the data changes."""
+
+    def __init__(self, client, refresh_seconds: float = VECTOR_INDEX_REFRESH_SECONDS, versions=None):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.versions = versions
+        self._indexes = {}
+        self._locks = {table: threading.Lock() for table in TABLE_COLUMNS}
+
+    def _is_fresh(self, index, version) -> bool:
+        """True if index is younger than refresh_seconds and built from the current data version."""
+        if index is None or time.time() - index.loaded_at >= self.refresh_seconds:
+            return False
+        return version is None or index.version is None or index.version == version
+
+    def get_index(self, table: str) -> VectorIndex:
+        """Return the index for table, loading or reloading it when missing or stale."""
+        version = self.versions.version(table) if self.versions is not None else None
+        index = self._indexes.get(table)
+        if self._is_fresh(index, version):
+            return index
+
+        with self._locks[table]:
+            index = self._indexes.get(table)
+            if not self._is_fresh(index, version):
+                index = VectorIndex.load(self.client, table)
+                index.version = version
+                self._indexes[table] = index
+        return index
+
+    def refresh(self, table: str = None):
+        """Force a reload of one table, or of every loaded table."""
+        for name in [table] if table else list(self._indexes):
+            with self._locks[name]:
+                index = VectorIndex.load(self.client, name)
+                index.version = self.versions.version(name) if self.versions is not None else None
+                self._indexes[name] = index
+
+    def search(self, table: str, query_embedding, match_threshold: float, match_count: int,
+               course_filter=None):
+        """Answer a match_* query from the local index."""
+        return self.get_index(table).search(query_embedding, match_threshold, match_count, course_filter)
+
+    def stats(self) -> dict:
+        """Return the size and age of every loaded index."""
+        return {
+            table: {"rows": len(index), "age_seconds": round(time.time() - index.loaded_at, 1)}
+            for table, index in self._indexes.items()
+        }
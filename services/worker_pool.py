@@ -0,0 +1,84 @@
+"""
+Bounded thread pool for blocking work called from the event loop.
+
+``asyncio.to_thread`` uses the loop's default executor, which is sized for
+short I/O calls. Crew runs take seconds to minutes, so they get their own
+fixed-size pool; callers beyond its size queue instead of starting more
+threads. Queue depth and queue wait time are tracked for monitoring.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import WORKER_POOL_SIZE
+
+
+class WorkerPool:
+    """Fixed-size thread pool with queue depth and wait-time metrics."""
+
+    def __init__(self, max_workers: int = WORKER_POOL_SIZE, name: str = "worker"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "queued": 0,
+            "running": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_run_ms": 0.0
+        }
+
+    def _call(self, submitted_at: float, func, args, kwargs):
+        """Run func in a pool thread, recording how long it waited in the queue."""
+        started = time.perf_counter()
+        wait_ms = (started - submitted_at) * 1000
+        with self._metrics_lock:
+            self._metrics["queued"] -= 1
+            self._metrics["running"] += 1
+            self._metrics["total_wait_ms"] += wait_ms
+            self._metrics["max_wait_ms"] = max(self._metrics["max_wait_ms"], wait_ms)
+
+        outcome = "failed"
+        try:
+            result = func(*args, **kwargs)
+            outcome = "completed"
+            return result
+        finally:
+            with self._metrics_lock:
+                self._metrics["running"] -= 1
+                self._metrics[outcome] += 1
+                self._metrics["total_run_ms"] += (time.perf_counter() - started) * 1000
+
+    async def run(self, func, *args, **kwargs):
+        """Await func(*args, **kwargs) run in the pool."""
+        with self._metrics_lock:
+            self._metrics["submitted"] += 1
+            self._metrics["queued"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, time.perf_counter(), func, args, kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and (optionally) wait for running calls."""
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """Return queue depth, occupancy and wait/run time metrics."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        started = metrics["submitted"] - metrics["queued"]
+        finished = metrics["completed"] + metrics["failed"]
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": metrics["queued"],
+            "running": metrics["running"],
+            "submitted": metrics["submitted"],
+            "completed": metrics["completed"],
+            "failed": metrics["failed"],
+            "avg_wait_ms": round(metrics["total_wait_ms"] / started, 2) if started else 0.0,
+            "max_wait_ms": round(metrics["max_wait_ms"], 2),
+            "avg_run_ms": round(metrics["total_run_ms"] / finished, 2) if finished else 0.0
+        }
@@ -0,0 +1,316 @@
+"""
+Bounded store of Telegram user sessions.
+
+Sessions are compact slotted records kept in LRU order. A session unused for
+``SESSION_IDLE_TTL`` seconds expires, and the least recently used sessions
+are evicted once there are more than ``SESSION_MAX_ENTRIES`` of them or their
+estimated size passes ``SESSION_MAX_BYTES``.
+
+If ``SESSION_DB_PATH`` is set, sessions are also saved to SQLite,
+write-behind. Updates only mark a session dirty, and a background thread
+writes the dirty sessions every ``SESSION_FLUSH_INTERVAL`` seconds (and at
+exit), so the message path never waits on disk. At startup the most recently
+seen sessions are loaded back. A user who is not in memory (evicted, or not
+among those loaded) starts a fresh session right away; before writing it, the
+writer thread merges it with the saved session if that one was still live.
+"""
+import atexit
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from telegram_config import (SESSION_MAX_ENTRIES, SESSION_MAX_BYTES, SESSION_IDLE_TTL, SESSION_DB_PATH,
+                             SESSION_FLUSH_INTERVAL, MAX_STORED_QUERY_LENGTH)
+
+# Rough size of a Session record and its dict slot, excluding the stored query text
+SESSION_OVERHEAD_BYTES = 200
+
+
+class Session:
+    """One user's session."""
+
+    __slots__ = ("user_id", "started_at", "last_seen", "message_count", "last_query")
+
+    def __init__(self, user_id: int, started_at: float, last_seen: float, message_count: int = 0,
+                 last_query: str = None):
+        self.user_id = user_id
+        self.started_at = started_at
+        self.last_seen = last_seen
+        self.message_count = message_count
+        self.last_query = last_query
+
+    def size(self) -> int:
+        """Estimated memory used by this session."""
+        return SESSION_OVERHEAD_BYTES + (sys.getsizeof(self.last_query) if self.last_query else 0)
+
+    def row(self):
+        """Database row for this session."""
+        return self.user_id, self.started_at, self.last_seen, self.message_count, self.last_query
+
+
+class SessionStore:
+    """LRU + idle-TTL session store with a memory cap and optional write-behind SQLite persistence."""
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, max_bytes: int = SESSION_MAX_BYTES,
+                 idle_ttl: float = SESSION_IDLE_TTL, db_path: str = SESSION_DB_PATH,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._sessions = OrderedDict()  # user_id -> Session, least recently used first
+        self._bytes = 0
+        self._dirty = {}  # user_id -> row waiting to be written
+        self._unreconciled = set()  # users whose new session may continue a saved one
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.persistent = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+        if db_path:
+            try:
+                self._open()
+                self.persistent = True
+            except Exception as e:
+                print(f"Session database unavailable, keeping sessions in memory only: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (autocommit, WAL so reads don't wait for the writer)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _open(self):
+        """Create the table, load the most recent sessions and start the writer thread."""
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id INTEGER PRIMARY KEY,
+                started_at REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                message_count INTEGER NOT NULL,
+                last_query TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+        cutoff = time.time() - self.idle_ttl
+        rows = conn.execute(
+            "SELECT user_id, started_at, last_seen, message_count, last_query FROM sessions "
+            "WHERE last_seen > ? ORDER BY last_seen DESC LIMIT ?", (cutoff, self.max_entries)).fetchall()
+        with self._lock:
+            for row in reversed(rows):
+                self._insert(Session(*row))
+            self._enforce_limits()
+
+        self._thread = threading.Thread(target=self._flush_loop, name="session-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _insert(self, session: Session):
+        """Add a session as most recently used. Caller holds the lock."""
+        self._sessions[session.user_id] = session
+        self._bytes += session.size()
+
+    def _remove(self, user_id: int):
+        """Drop a session from memory. Caller holds the lock."""
+        session = self._sessions.pop(user_id)
+        self._bytes -= session.size()
+
+    def _enforce_limits(self):
+        """Evict least recently used sessions over the entry or memory cap. Caller holds the lock."""
+        while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _expired(self, session: Session, now: float) -> bool:
+        """True if the session has been idle longer than the TTL."""
+        return now - session.last_seen > self.idle_ttl
+
+    def get(self, user_id: int):
+        """Return the user's live session, or None. Only looks in memory, never in the database."""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                if not self._expired(session, now):
+                    self._sessions.move_to_end(user_id)
+                    return session
+                self._remove(user_id)
+                self.expirations += 1
+                return None
+
+            # Evicted but not written yet: bring it back from the pending row
+            pending = self._dirty.get(user_id)
+            if pending is None:
+                return None
+            session = Session(*pending)
+            if self._expired(session, now):
+                return None
+            self._insert(session)
+            self._enforce_limits()
+            return session
+
+    def start(self, user_id: int, reconcile: bool = False) -> Session:
+        """Begin a fresh session for the user (e.g. on /start).
+
+        With reconcile, the writer thread merges it into the saved session if that is still live.
+        """
+        now = time.time()
+        session = Session(user_id, now, now)
+        with self._lock:
+            if user_id in self._sessions:
+                self._remove(user_id)
+            self._insert(session)
+            self._enforce_limits()
+            self._mark_dirty(session)
+            if reconcile and self.persistent:
+                self._unreconciled.add(user_id)
+            else:
+                self._unreconciled.discard(user_id)
+        return session
+
+    def record_query(self, user_id: int, query: str) -> Session:
+        """Count a message from the user and remember it as their last query."""
+        session = self.get(user_id) or self.start(user_id, reconcile=True)
+        query = query[:MAX_STORED_QUERY_LENGTH]
+        with self._lock:
+            if self._sessions.get(user_id) is session:
+                self._bytes -= session.size()
+                session.message_count += 1
+                session.last_query = query
+                session.last_seen = time.time()
+                self._bytes += session.size()
+                self._enforce_limits()
+            else:
+                # Evicted in the meantime: update the record so it is still persisted
+                session.message_count += 1
+                session.last_query = query
+                session.last_seen = time.time()
+            self._mark_dirty(session)
+        return session
+
+    def _mark_dirty(self, session: Session):
+        """Queue the session for the next write. Caller holds the lock."""
+        if self.persistent:
+            self._dirty[session.user_id] = session.row()
+
+    def _flush_loop(self):
+        """Writer thread: flush and sweep every flush interval until closed."""
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.sweep()
+
+    def _reconcile(self, conn: sqlite3.Connection, rows, users):
+        """Merge new sessions of users with their saved sessions that were still live; returns the rows to write."""
+        users = list(users)
+        saved = {}
+        for i in range(0, len(users), 500):
+            chunk = users[i:i + 500]
+            saved.update((row[0], row) for row in conn.execute(
+                "SELECT user_id, started_at, last_seen, message_count FROM sessions WHERE user_id IN (%s)"
+                % ",".join("?" * len(chunk)), chunk))
+
+        merged_rows = []
+        with self._lock:
+            for row in rows:
+                stored = saved.get(row[0])
+                if stored is None or row[1] - stored[2] > self.idle_ttl:
+                    merged_rows.append(row)
+                    continue
+                started_at, count = stored[1], stored[3]
+                merged_rows.append((row[0], started_at, row[2], row[3] + count, row[4]))
+                # The session may have moved on since the row was taken; it is identified by its start time
+                session = self._sessions.get(row[0])
+                if session is not None and session.started_at == row[1]:
+                    session.started_at = started_at
+                    session.message_count += count
+                pending = self._dirty.get(row[0])
+                if pending is not None and pending[1] == row[1]:
+                    self._dirty[row[0]] = (row[0], started_at, pending[2], pending[3] + count, pending[4])
+        return merged_rows
+
+    def flush(self):
+        """Write the dirty sessions to the database."""
+        if not self.persistent:
+            return
+        with self._lock:
+            rows, self._dirty = list(self._dirty.values()), {}
+            unreconciled, self._unreconciled = self._unreconciled, set()
+        if not rows:
+            return
+        conn = self._connection()
+        try:
+            if unreconciled:
+                rows = self._reconcile(conn, rows, unreconciled)
+                unreconciled = set()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sessions (user_id, started_at, last_seen, message_count, last_query) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self.flushes += 1
+            self.rows_written += len(rows)
+        except Exception as e:
+            print(f"Session flush failed: {e}")
+            with self._lock:
+                # Keep them for the next attempt unless they were updated since
+                for row in rows:
+                    self._dirty.setdefault(row[0], row)
+                self._unreconciled |= unreconciled
+
+    def sweep(self):
+        """Expire idle sessions in memory and delete them from the database."""
+        now = time.time()
+        with self._lock:
+            idle = [user_id for user_id, session in self._sessions.items() if self._expired(session, now)]
+            for user_id in idle:
+                self._remove(user_id)
+            self.expirations += len(idle)
+        if self.persistent:
+            try:
+                self._connection().execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.idle_ttl,))
+            except Exception as e:
+                print(f"Session cleanup failed: {e}")
+
+    def close(self):
+        """Stop the writer thread and write any remaining dirty sessions."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        """Return session counts, memory estimate and persistence counters."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "approx_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent": self.persistent,
+                "pending_writes": len(self._dirty),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written
+            }
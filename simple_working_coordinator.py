@@ -1,82 +1,114 @@
-from crewai import Crew, Process, Task
-from agents.educational_assistant import create_educational_assistant
-from tools.database_query_tool import database_query_tool
-import json
+import asyncio
+import queue
+
+from config import FAST_PATH_ENABLED, CREW_POOL_SIZE, ANSWER_CACHE_ENABLED, WORKER_POOL_SIZE, SEARCH_BACKEND
+from crew_pool import CrewPool, ProgressReporter
+from query_router import query_router
+from services.answer_cache import answer_cache
+from services.catalog_mirror import catalog_mirror
+from services.catalog_stats import catalog_stats
+from services.data_version import data_versions
+from services.search_backend import ann_store
+from services.worker_pool import WorkerPool
+
+
+# Already answered from memory (stats snapshot, catalog mirror) and would go stale in the answer cache
+UNCACHED_INTENTS = {'count', 'list_courses'}
 
 
 class SimpleWorkingCoordinator:
     """Simple coordinator that actually works and finds real data."""
 
-    def __init__(self):
-        self.assistant = create_educational_assistant()
-
-    def process_query(self, user_query: str) -> str:
-        """Process user query and return helpful response."""
-
-        # Handle simple informational queries directly
-        query_lower = user_query.lower()
-
-        if any(phrase in query_lower for phrase in ['how many courses', 'count courses']):
-            try:
-                result = database_query_tool._run('count_all')
-                data = json.loads(result)
-                return f"📊 We have **{data['total_courses']} courses**, {data['total_tasks']} tasks, and {data['total_resources']} resources in our database."
-            except Exception as e:
-                return f"I had trouble checking the database: {e}"
-
-        elif any(phrase in query_lower for phrase in ['list courses', 'show courses', 'all courses']):
-            try:
-                result = database_query_tool._run('list_courses', limit=10)
-                data = json.loads(result)
-                response = f"📚 **Our {data['total_courses']} courses:**\n\n"
-                for i, course in enumerate(data['courses'], 1):
-                    response += f"{i}. **{course['title']}**\n   {course['description'][:100]}...\n\n"
-                return response
-            except Exception as e:
-                return f"I had trouble listing courses: {e}"
-
-        # For all other queries, create a simple task for the assistant
-        task = Task(
-            description=f"""
-            The user asked: "{user_query}"
-
-            Your job is to help them by searching our educational database.
-
-            STEP BY STEP:
-            1. Look at what they're asking for (tasks, courses, resources, plans)
-            2. Use the appropriate search tool to find real content
-            3. Present what you actually find in the database
-            4. If they want a specific number of items, try to provide that many
-            5. If they mention a timeframe, organize accordingly
-
-            SEARCH STRATEGY:
-            - Start with similarity_threshold=0.4
-            - If no results, try similarity_threshold=0.2  
-            - Use comprehensive_search_tool for broad requests
-            - Use specific tools (task_search_tool, course_search_tool, resource_search_tool) for focused requests
-
-            BE HELPFUL AND HONEST:
-            - Show actual titles and descriptions from the database
-            - If you don't find much, say so and suggest alternatives
-            - Always offer to help find more or different content
-            """,
-            agent=self.assistant,
-            expected_output="A helpful response with actual database content that addresses the user's specific request"
-        )
-
-        # Execute the task
-        crew = Crew(
-            agents=[self.assistant],
-            tasks=[task],
-            process=Process.sequential,
-            verbose=False
-        )
-
+    def __init__(self, pool_size: int = None):
+        # Pre-built assistant crews, checked out per query so the coordinator can be shared by threads
+        self.crew_pool = CrewPool(pool_size or CREW_POOL_SIZE)
+        # Bounded threads for crew runs started by aprocess_query
+        self.worker_pool = WorkerPool(WORKER_POOL_SIZE, name="coordinator")
+        # Poll table versions in the background so cache lookups never query the database for them
+        data_versions.start_polling()
+        # Build the counts snapshot in the background so the first stats request is already cached
+        catalog_stats.start()
+        catalog_stats.request_refresh()
+        # Load the course catalog mirror used for course browsing
+        try:
+            catalog_mirror.ensure_loaded()
+        except Exception as e:
+            print(f"Catalog mirror load failed: {e}")
+        # Load or build the ANN indexes in the background; searches use the RPC until they are ready
+        if SEARCH_BACKEND == "ann":
+            ann_store.start()
+
+    def process_query(self, user_query: str, progress=None) -> str:
+        """Process user query and return helpful response.
+
+        progress, if given, is called from the worker thread with partial text while the crew runs.
+        """
+        if ANSWER_CACHE_ENABLED:
+            cached = answer_cache.get(user_query)
+            if cached is not None:
+                return cached
+
+        answer, cacheable = self._answer(user_query, progress)
+        if ANSWER_CACHE_ENABLED and cacheable:
+            answer_cache.put(user_query, answer)
+        return answer
+
+    async def aprocess_query(self, user_query: str, progress=None) -> str:
+        """Async process_query for event-loop callers such as the Telegram bot.
+
+        The fast path awaits the async tools; the crew (which is synchronous) runs in the bounded
+        worker pool, so a long crew run never blocks other chats.
+        """
+        if ANSWER_CACHE_ENABLED:
+            # Lookups check the data versions and semantic mode embeds the query, both blocking
+            cached = await asyncio.to_thread(answer_cache.get, user_query)
+            if cached is not None:
+                return cached
+
+        answer, cacheable = await self._aanswer(user_query, progress)
+        if ANSWER_CACHE_ENABLED and cacheable:
+            await asyncio.to_thread(answer_cache.put, user_query, answer)
+        return answer
+
+    def _answer(self, user_query: str, progress=None):
+        """Return (answer, cacheable)."""
+
+        # Answer counts, course listings and simple searches directly, without the crew
+        if FAST_PATH_ENABLED:
+            intent, answer = query_router.route(user_query)
+            if answer is not None:
+                return answer, intent not in UNCACHED_INTENTS
+
+        return self._crew_answer(user_query, progress)
+
+    async def _aanswer(self, user_query: str, progress=None):
+        """Async _answer."""
+        if FAST_PATH_ENABLED:
+            intent, answer = await query_router.aroute(user_query)
+            if answer is not None:
+                return answer, intent not in UNCACHED_INTENTS
+
+        return await self.worker_pool.run(self._crew_answer, user_query, progress)
+
+    def _crew_answer(self, user_query: str, progress=None):
+        """Run a pooled assistant crew; returns (answer, cacheable)."""
         try:
-            result = crew.kickoff()
-            return str(result)
+            with self.crew_pool.worker() as worker:
+                if progress is None:
+                    return worker.run(user_query), True
+                reporter = ProgressReporter(progress)
+                return worker.run(user_query, step_callback=reporter.step, task_callback=reporter.task), True
+        except queue.Empty:
+            return "I'm helping a lot of learners right now. Please try again in a moment.", False
         except Exception as e:
-            return f"I encountered an issue: {e}. Let me try a different approach - what specific topic are you interested in?"
+            return f"I encountered an issue: {e}. Let me try a different approach - what specific topic are you interested in?", False
+
+    def stats(self) -> dict:
+        """Return crew pool and worker pool metrics."""
+        return {
+            "crew_pool": self.crew_pool.stats(),
+            "worker_pool": self.worker_pool.stats()
+        }
 
 
 def main():
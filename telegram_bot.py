@@ -4,15 +4,20 @@ Compatible with python-telegram-bot v20+
 """
 
 import asyncio
+import functools
 import logging
+from contextlib import asynccontextmanager
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 
 import telegram_config
 from simple_working_coordinator import SimpleWorkingCoordinator
+from telegram_streaming import MessageStreamer, split_message
+from rate_limiter import RateLimiter
+from session_store import SessionStore
+from services.data_version import data_versions
 import traceback
 import time
-from datetime import datetime
 
 # Configure logging
 logging.basicConfig(
@@ -21,13 +26,73 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _reject(update: Update, message: str):
+    """Answer a rejected update with message."""
+    if update.callback_query:
+        await update.callback_query.answer()
+    if update.effective_message:
+        await update.effective_message.reply_text(message)
+
+
+def rate_limited(handler):
+    """Check the user's rate limit, replying with the rate-limit message if it is exceeded."""
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if user is not None and self.rate_limiter.check(user.id) is not None:
+            return await _reject(update, telegram_config.ERROR_MESSAGES['rate_limit_exceeded'])
+        return await handler(self, update, context)
+    return wrapper
+
+
+def load_shed(handler):
+    """Hold one of the global request slots while handling, replying with the overload message if none is free.
+
+    Goes inside per_chat, so updates waiting for their chat's turn don't hold slots. A shed update gives
+    back the rate-limit token it took, since it was never handled.
+    """
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if self.rate_limiter.acquire() is not None:
+            if update.effective_user is not None:
+                self.rate_limiter.refund(update.effective_user.id)
+            return await _reject(update, telegram_config.ERROR_MESSAGES['overloaded'])
+        try:
+            return await handler(self, update, context)
+        finally:
+            self.rate_limiter.release()
+    return wrapper
+
+
+def per_chat(handler):
+    """Handle one update per chat at a time, in arrival order (updates of different chats run concurrently).
+
+    Waiting updates hold one of the application's concurrent update slots, so each chat may have at most
+    MAX_PENDING_UPDATES_PER_CHAT; more are answered with the busy message instead of waiting.
+    """
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat = update.effective_chat
+        if chat is None:
+            return await handler(self, update, context)
+        if self.pending_updates(chat.id) >= telegram_config.MAX_PENDING_UPDATES_PER_CHAT:
+            self.busy_rejections += 1
+            return await _reject(update, telegram_config.ERROR_MESSAGES['chat_busy'])
+        async with self.chat_turn(chat.id):
+            return await handler(self, update, context)
+    return wrapper
+
+
 class EducationalTelegramBot:
     """Telegram bot that uses the educational RAG system."""
 
     def __init__(self, telegram_token: str):
         self.telegram_token = telegram_token
         self.coordinator = None
-        self.user_sessions = {}  # Track user conversation history
+        self.user_sessions = SessionStore()  # Track user conversation history
+        self.chat_locks = {}  # chat_id -> [lock, updates holding or waiting for it]
+        self.busy_rejections = 0
+        self.rate_limiter = RateLimiter(exempt_users=telegram_config.ADMIN_USER_IDS)
 
     def initialize_coordinator(self):
         """Initialize the educational coordinator synchronously."""
@@ -39,17 +104,35 @@ class EducationalTelegramBot:
             logger.error(f"❌ Failed to initialize coordinator: {e}")
             return False
 
+    def pending_updates(self, chat_id: int) -> int:
+        """Number of this chat's updates being handled or waiting for their turn."""
+        entry = self.chat_locks.get(chat_id)
+        return entry[1] if entry is not None else 0
+
+    @asynccontextmanager
+    async def chat_turn(self, chat_id: int):
+        """Wait for this chat's earlier updates to finish (asyncio.Lock wakes waiters in FIFO order)."""
+        entry = self.chat_locks.get(chat_id)
+        if entry is None:
+            entry = self.chat_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.chat_locks[chat_id]
+
+    @per_chat
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
         user = update.effective_user
         user_id = user.id
 
         # Initialize user session
-        self.user_sessions[user_id] = {
-            'started_at': datetime.now(),
-            'message_count': 0,
-            'last_query': None
-        }
+        if telegram_config.ENABLE_USER_SESSIONS:
+            self.user_sessions.start(user_id)
 
         welcome_text = f"""🎓 **Welcome to Educational Assistant Bot!**
 
@@ -136,22 +219,28 @@ Just send me any learning-related question and I'll help! 🚀"""
 
         await update.message.reply_text(help_text, parse_mode='Markdown')
 
+    @rate_limited
+    @per_chat
+    @load_shed
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command."""
         await update.message.reply_text("📊 Getting database statistics...")
 
         try:
-            result = self.coordinator.process_query("How many courses are there?")
+            result = await self.coordinator.aprocess_query("How many courses are there?")
             await update.message.reply_text(f"📊 **Database Statistics**\n\n{result}", parse_mode='Markdown')
         except Exception as e:
             await update.message.reply_text(f"❌ Error getting stats: {e}")
 
+    @rate_limited
+    @per_chat
+    @load_shed
     async def courses_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /courses command."""
         await update.message.reply_text("📚 Getting list of all courses...")
 
         try:
-            result = self.coordinator.process_query("List all courses")
+            result = await self.coordinator.aprocess_query("List all courses")
 
             # Split long messages if needed
             if len(result) > 4000:
@@ -173,6 +262,37 @@ Just send me any learning-related question and I'll help! 🚀"""
         except Exception as e:
             await update.message.reply_text(f"❌ Error getting courses: {e}")
 
+    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /status command (admins only): worker queue depth and wait times."""
+        if update.effective_user.id not in telegram_config.ADMIN_USER_IDS:
+            return
+        if not self.coordinator:
+            await update.message.reply_text(telegram_config.ERROR_MESSAGES['coordinator_not_available'])
+            return
+
+        stats = self.coordinator.stats()
+        workers = stats['worker_pool']
+        crews = stats['crew_pool']
+        admission = self.rate_limiter.stats()
+        sessions = self.user_sessions.stats()
+        await update.message.reply_text(
+            f"⚙️ Bot status\n\n"
+            f"Chats with queued updates: {len(self.chat_locks)}, busy replies: {self.busy_rejections}\n"
+            f"Worker queue depth: {workers['queue_depth']} (running {workers['running']}/{workers['max_workers']})\n"
+            f"Worker wait: avg {workers['avg_wait_ms']} ms, max {workers['max_wait_ms']} ms\n"
+            f"Crews in use: {crews['in_use']}/{crews['size']}, waiting {crews['waiting']}\n"
+            f"Crew wait: avg {crews['avg_wait_ms']} ms, max {crews['max_wait_ms']} ms\n"
+            f"Requests in progress: {admission['in_flight']}/{admission['max_concurrent']}\n"
+            f"Admitted: {admission['admitted']}, rate limited: {admission['rejected_rate_limit']}, "
+            f"shed: {admission['rejected_overload']}\n"
+            f"Sessions: {sessions['sessions']} (~{sessions['approx_bytes'] // 1024} KB), "
+            f"evicted {sessions['evictions']}, expired {sessions['expirations']}, "
+            f"pending writes {sessions['pending_writes']}"
+        )
+
+    @rate_limited
+    @per_chat
+    @load_shed
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks."""
         query = update.callback_query
@@ -181,7 +301,7 @@ Just send me any learning-related question and I'll help! 🚀"""
         if query.data == "list_courses":
             await query.message.reply_text("📚 Getting all courses...")
             try:
-                result = self.coordinator.process_query("List all courses")
+                result = await self.coordinator.aprocess_query("List all courses")
                 # Handle long messages
                 if len(result) > 3800:
                     result = result[:3800] + "\n\n... (use /courses for full list)"
@@ -192,7 +312,7 @@ Just send me any learning-related question and I'll help! 🚀"""
         elif query.data == "stats":
             await query.message.reply_text("📊 Getting database statistics...")
             try:
-                result = self.coordinator.process_query("How many courses are there?")
+                result = await self.coordinator.aprocess_query("How many courses are there?")
                 await query.message.reply_text(result, parse_mode='Markdown')
             except Exception as e:
                 await query.message.reply_text(f"❌ Error: {e}")
@@ -221,6 +341,9 @@ Just type any of these or your own question! 🚀"""
         elif query.data == "help":
             await self.help_command(update, context)
 
+    @rate_limited
+    @per_chat
+    @load_shed
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle regular text messages."""
         user = update.effective_user
@@ -228,15 +351,8 @@ Just type any of these or your own question! 🚀"""
         message_text = update.message.text
 
         # Update user session
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {
-                'started_at': datetime.now(),
-                'message_count': 0,
-                'last_query': None
-            }
-
-        self.user_sessions[user_id]['message_count'] += 1
-        self.user_sessions[user_id]['last_query'] = message_text
+        if telegram_config.ENABLE_USER_SESSIONS:
+            self.user_sessions.record_query(user_id, message_text)
 
         # Show typing indicator
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
@@ -244,6 +360,7 @@ Just type any of these or your own question! 🚀"""
         # Log the query
         logger.info(f"User {user_id} ({user.first_name}): {message_text}")
 
+        streamer = None
         try:
             # Check if coordinator is available
             if not self.coordinator:
@@ -252,57 +369,46 @@ Just type any of these or your own question! 🚀"""
                 )
                 return
 
-            # Process the query
-            start_time = time.time()
-            result = self.coordinator.process_query(message_text)
-            processing_time = time.time() - start_time
-
-            # Handle long responses by splitting them
-            max_length = 3800  # Leave some room for formatting
-
-            if len(result) > max_length:
-                # Split into chunks
-                chunks = []
-                lines = result.split('\n')
-                current_chunk = ""
-
-                for line in lines:
-                    # If adding this line would exceed limit, start new chunk
-                    if len(current_chunk + line + '\n') > max_length:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                            current_chunk = line + '\n'
-                        else:
-                            # Single line is too long, force split
-                            chunks.append(line[:max_length])
-                            current_chunk = line[max_length:] + '\n'
-                    else:
-                        current_chunk += line + '\n'
-
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-
-                # Send chunks
-                for i, chunk in enumerate(chunks):
-                    if i == 0:
-                        await update.message.reply_text(
-                            f"🤖 **Educational Assistant** (Part {i + 1}/{len(chunks)}):\n\n{chunk}",
-                            parse_mode='Markdown'
-                        )
-                    else:
-                        await update.message.reply_text(
-                            f"**Part {i + 1}/{len(chunks)} (continued):**\n\n{chunk}",
-                            parse_mode='Markdown'
-                        )
+            # Leave some room for formatting
+            max_length = 3800
 
-                    # Small delay between chunks
-                    if i < len(chunks) - 1:
-                        await asyncio.sleep(1)
+            start_time = time.time()
+            if telegram_config.ENABLE_STREAMING:
+                # Reply right away and edit it as the crew makes progress
+                streamer = MessageStreamer(context.bot, update.effective_chat.id,
+                                           header="🤖 **Educational Assistant:**\n\n", max_length=max_length)
+                await streamer.start("🤖 Working on it...")
+                result = await self.coordinator.aprocess_query(message_text, streamer.update_threadsafe)
+                processing_time = time.time() - start_time
+                await streamer.finish(result)
             else:
-                await update.message.reply_text(
-                    f"🤖 **Educational Assistant:**\n\n{result}",
-                    parse_mode='Markdown'
-                )
+                # Process the query
+                result = await self.coordinator.aprocess_query(message_text)
+                processing_time = time.time() - start_time
+
+                # Handle long responses by splitting them
+                chunks = split_message(result, max_length)
+                if len(chunks) > 1:
+                    for i, chunk in enumerate(chunks):
+                        if i == 0:
+                            await update.message.reply_text(
+                                f"🤖 **Educational Assistant** (Part {i + 1}/{len(chunks)}):\n\n{chunk}",
+                                parse_mode='Markdown'
+                            )
+                        else:
+                            await update.message.reply_text(
+                                f"**Part {i + 1}/{len(chunks)} (continued):**\n\n{chunk}",
+                                parse_mode='Markdown'
+                            )
+
+                        # Small delay between chunks
+                        if i < len(chunks) - 1:
+                            await asyncio.sleep(1)
+                else:
+                    await update.message.reply_text(
+                        f"🤖 **Educational Assistant:**\n\n{result}",
+                        parse_mode='Markdown'
+                    )
 
             # Add quick action buttons for certain types of responses
             if any(word in message_text.lower() for word in ['course', 'list', 'show', 'find']):
@@ -322,9 +428,13 @@ Just type any of these or your own question! 🚀"""
 
         except Exception as e:
             error_msg = f"❌ Sorry, I encountered an error: {str(e)[:100]}..."
-            await update.message.reply_text(error_msg)
             logger.error(f"Error processing message from {user_id}: {e}")
             logger.error(traceback.format_exc())
+            if streamer is not None:
+                # Replace the "working" message with the error and stop the progress edits
+                await streamer.finish(error_msg)
+            else:
+                await update.message.reply_text(error_msg)
 
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors."""
@@ -350,14 +460,20 @@ Just type any of these or your own question! 🚀"""
 
         print("✅ Educational coordinator ready!")
 
+        # Keep the data versions used by the caches fresh from a background thread
+        data_versions.start_polling()
+
         # Create application
-        application = Application.builder().token(self.telegram_token).build()
+        # Updates of different chats are handled concurrently; per_chat keeps each chat in order
+        application = Application.builder().token(self.telegram_token) \
+            .concurrent_updates(telegram_config.MAX_CONCURRENT_UPDATES).build()
 
         # Add handlers
         application.add_handler(CommandHandler("start", self.start_command))
         application.add_handler(CommandHandler("help", self.help_command))
         application.add_handler(CommandHandler("stats", self.stats_command))
         application.add_handler(CommandHandler("courses", self.courses_command))
+        application.add_handler(CommandHandler("status", self.status_command))
         application.add_handler(CallbackQueryHandler(self.handle_callback_query))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         application.add_error_handler(self.error_handler)
@@ -15,9 +15,13 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 BOT_USERNAME = os.getenv('BOT_USERNAME')
 MAX_MESSAGE_LENGTH = 4000  # Telegram's limit is 4096
 RESPONSE_TIMEOUT = 30  # seconds
+MAX_CONCURRENT_UPDATES = 32  # updates handled at once (one at a time per chat)
+MAX_PENDING_UPDATES_PER_CHAT = 3  # updates of one chat running or waiting their turn; more get the busy message
+STREAM_EDIT_INTERVAL = 1.5  # seconds between edits of a streamed message (Telegram throttles edits)
 
 # Feature Toggles
 ENABLE_INLINE_KEYBOARDS = True
+ENABLE_STREAMING = True  # show crew progress by editing the reply as it runs
 ENABLE_USER_SESSIONS = True
 ENABLE_ANALYTICS = True
 ENABLE_ERROR_REPORTING = True
@@ -25,6 +29,15 @@ ENABLE_ERROR_REPORTING = True
 # Rate Limiting (to prevent spam)
 MAX_REQUESTS_PER_MINUTE = 20
 MAX_REQUESTS_PER_HOUR = 100
+MAX_CONCURRENT_REQUESTS = 16  # requests in progress across all users; more are rejected right away
+
+# User Sessions
+SESSION_MAX_ENTRIES = 10000  # sessions kept in memory (least recently used are evicted)
+SESSION_MAX_BYTES = 8 * 1024 * 1024  # estimated memory cap for all sessions
+SESSION_IDLE_TTL = 7 * 24 * 3600  # seconds without messages before a session expires
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH')  # SQLite file to persist sessions; unset = memory only
+SESSION_FLUSH_INTERVAL = 5  # seconds between write-behind flushes
+MAX_STORED_QUERY_LENGTH = 500  # characters of the last query kept per session
 
 # Admin Configuration (optional)
 ADMIN_USER_IDS = []  # Add admin Telegram user IDs here
@@ -64,6 +77,8 @@ ERROR_MESSAGES = {
     'coordinator_not_available': "❌ Educational system is not available right now. Please try again later.",
     'processing_error': "❌ Sorry, I encountered an error processing your request. Please try again.",
     'rate_limit_exceeded': "⏰ You're sending messages too quickly. Please wait a moment and try again.",
+    'overloaded': "🚦 I'm helping a lot of learners right now. Please try again in a moment.",
+    'chat_busy': "⏳ I'm still working on your previous messages. Please wait for those answers first.",
     'invalid_token': "❌ Bot token is not configured. Please contact the administrator.",
     'timeout_error': "⏰ Request timed out. Please try a simpler query or try again later."
 }
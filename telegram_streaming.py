@@ -0,0 +1,156 @@
+"""
+Progressive Telegram replies.
+
+A MessageStreamer sends one message right away and keeps editing it as new
+text arrives from the coordinator (which runs in a worker thread), at most
+once every ``STREAM_EDIT_INTERVAL`` seconds. The final answer waits for the
+interval only after a progress edit, so quick answers replace the first
+message at once. Text longer than ``MAX_MESSAGE_LENGTH`` rolls over into
+additional messages.
+"""
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, RetryAfter
+
+from telegram_config import MAX_MESSAGE_LENGTH, STREAM_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH):
+    """Split text into chunks of at most max_length characters, on line breaks where possible."""
+    chunks = []
+    current_chunk = ""
+
+    for line in text.split('\n'):
+        # If adding this line would exceed limit, start new chunk
+        while len(line) > max_length:
+            if current_chunk:
+                chunks.append(current_chunk.rstrip('\n'))
+                current_chunk = ""
+            # Single line is too long, force split
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+        if len(current_chunk + line + '\n') > max_length:
+            chunks.append(current_chunk.rstrip('\n'))
+            current_chunk = ""
+        current_chunk += line + '\n'
+
+    if current_chunk.strip() or not chunks:
+        chunks.append(current_chunk.rstrip('\n'))
+    return chunks
+
+
+def _seconds(delay) -> float:
+    """RetryAfter.retry_after is an int or a timedelta depending on the library version."""
+    return delay.total_seconds() if hasattr(delay, 'total_seconds') else float(delay)
+
+
+class MessageStreamer:
+    """Streams text into one or more Telegram messages via throttled edits."""
+
+    def __init__(self, bot, chat_id: int, header: str = "", edit_interval: float = STREAM_EDIT_INTERVAL,
+                 max_length: int = MAX_MESSAGE_LENGTH):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.header = header
+        self.edit_interval = edit_interval
+        self.max_length = max_length
+        self.messages = []  # sent messages, in order
+        self._sent = []  # text currently shown in each message
+        self._text = ""
+        self._changed = asyncio.Event()
+        self._last_edit = 0.0
+        self._progressed = False  # a progress edit was made after start()
+        self._loop = None
+        self._task = None
+        self.edits = 0
+
+    async def start(self, text: str):
+        """Send the first message and start applying updates."""
+        self._loop = asyncio.get_running_loop()
+        await self._render(text, final=False)
+        self._task = asyncio.create_task(self._run())
+
+    def update_threadsafe(self, text: str):
+        """Replace the streamed text; safe to call from a worker thread."""
+        self._loop.call_soon_threadsafe(self._set, text)
+
+    def _set(self, text: str):
+        self._text = text
+        self._changed.set()
+
+    async def _run(self):
+        """Apply the latest text at most once per edit interval."""
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(max(0.0, self._last_edit + self.edit_interval - time.monotonic()))
+            self._changed.clear()
+            await self._render(self._text, final=False)
+            self._progressed = True
+
+    async def finish(self, text: str):
+        """Show the final text (with Markdown) and stop streaming."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # A failed progress edit must not stop the final answer from being shown
+                logger.warning(f"Streaming progress update failed: {e}")
+            self._task = None
+        if self._progressed:
+            # Back-to-back edits of the same message; otherwise RetryAfter covers flood control
+            await asyncio.sleep(max(0.0, self._last_edit + self.edit_interval - time.monotonic()))
+        await self._render(self.header + text, final=True)
+
+    async def _render(self, text: str, final: bool):
+        """Make the sent messages show text, editing changed chunks and sending new ones as needed."""
+        chunks = split_message(text, self.max_length)
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self._sent[i] != chunk:
+                    await self._call(self.messages[i].edit_text, chunk, final)
+                    self._sent[i] = chunk
+            else:
+                message = await self._call(self.bot.send_message, chunk, final, chat_id=self.chat_id)
+                if message is not None:
+                    self.messages.append(message)
+                    self._sent.append(chunk)
+
+        # The final text can be shorter than the progress shown so far
+        while len(self.messages) > len(chunks):
+            message = self.messages.pop()
+            self._sent.pop()
+            try:
+                await message.delete()
+            except Exception as e:
+                logger.warning(f"Could not delete streamed message: {e}")
+        self._last_edit = time.monotonic()
+
+    async def _call(self, method, text: str, final: bool, **kwargs):
+        """Send or edit once, honouring flood-control waits; Markdown only for final text."""
+        for attempt in range(2):
+            try:
+                if final:
+                    try:
+                        return await method(text=text, parse_mode='Markdown', **kwargs)
+                    except BadRequest as e:
+                        if 'not modified' in str(e).lower():
+                            return None
+                        # Unbalanced Markdown in model output: fall back to plain text
+                        return await method(text=text, **kwargs)
+                self.edits += 1
+                return await method(text=text, **kwargs)
+            except RetryAfter as e:
+                if attempt:
+                    raise
+                await asyncio.sleep(_seconds(e.retry_after))
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    return None
+                raise
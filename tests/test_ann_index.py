@@ -0,0 +1,33 @@
+import numpy as np
+
+from services.ann_index import IVFPQIndex, default_nlist, recall_report
+from services.vector_index import VectorIndex
+
+
+def make_indexes(keep_vectors, n=300, dim=16):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    rows = [{"id": i} for i in range(n)]
+    ann = IVFPQIndex.build("tasks", rows, vectors, m=4, keep_vectors=keep_vectors)
+    exact = VectorIndex("tasks", rows, vectors, dim=dim)
+    return ann, exact, vectors[:5]
+
+
+def test_nlist_follows_row_count():
+    ann, _, _ = make_indexes(keep_vectors=False)
+    assert len(ann.coarse) == default_nlist(300) == 69
+    assert default_nlist(1) == 4
+    assert default_nlist(1000000) == 4000
+
+
+def test_report_skips_rerank_without_vectors():
+    ann, exact, queries = make_indexes(keep_vectors=False)
+    report = recall_report(ann, exact, queries, k=5, nprobe_values=(4,), rerank_values=(0, 4))
+    assert [line["rerank"] for line in report] == [0]
+
+
+def test_report_includes_rerank_with_vectors():
+    ann, exact, queries = make_indexes(keep_vectors=True)
+    report = recall_report(ann, exact, queries, k=5, nprobe_values=(4,), rerank_values=(0, 4))
+    assert [line["rerank"] for line in report] == [0, 4]
+    assert report[1]["recall@5"] >= report[0]["recall@5"]
@@ -0,0 +1,65 @@
+from services.answer_cache import AnswerCache
+from services.query_parsing import normalize_query
+
+
+class FakeVersions:
+    def __init__(self):
+        self.version = (1,)
+
+    def catalog_version(self):
+        return self.version
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("versions", FakeVersions())
+    kwargs.setdefault("semantic", False)
+    return AnswerCache(**kwargs)
+
+
+def test_normalize_query_collisions():
+    assert normalize_query("List all courses!") == normalize_query("list   courses")
+    assert normalize_query("Give me five Python tasks") == normalize_query("give me 5 python tasks")
+    assert normalize_query("5 python tasks") != normalize_query("10 python tasks")
+    assert normalize_query("python tasks") != normalize_query("python resources")
+
+
+def test_hit_for_equivalent_query():
+    cache = make_cache()
+    cache.put("List all courses!", "answer")
+    assert cache.get("list courses") == "answer"
+    assert cache.get("10 python tasks") is None
+
+
+def test_ttl_expiry():
+    cache = make_cache(ttl=-1)
+    cache.put("python tasks", "answer")
+    assert cache.get("python tasks") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lru_eviction():
+    cache = make_cache(max_entries=2)
+    cache.put("python tasks", "a")
+    cache.put("rust tasks", "b")
+    assert cache.get("python tasks") == "a"  # now most recently used
+    cache.put("go tasks", "c")
+    assert cache.get("rust tasks") is None
+    assert cache.get("python tasks") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_version_change_invalidates():
+    versions = FakeVersions()
+    cache = make_cache(versions=versions)
+    cache.put("python tasks", "answer")
+    versions.version = (2,)
+    assert cache.get("python tasks") is None
+
+
+def test_semantic_hit_requires_same_numbers():
+    # Every query embeds to the same vector, so only the numbers guard can tell them apart
+    cache = make_cache(semantic=True, semantic_cutoff=0.9, embed=lambda text: [1.0, 0.0, 0.0])
+    cache.put("5 python tasks", "five")
+    assert cache.get("python exercises 5") == "five"
+    assert cache.get("10 python tasks") is None
+    assert cache.stats()["semantic_hits"] == 1
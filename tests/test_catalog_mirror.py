@@ -0,0 +1,80 @@
+import json
+import sys
+import time
+
+import pytest
+
+import tools.database_query_tool  # noqa: F401  (tools/__init__ re-exports the tool instance)
+from services.catalog_mirror import CatalogMirror
+
+database_query_module = sys.modules["tools.database_query_tool"]
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.ids = None
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, ids):
+        self.ids = list(ids)
+        return self
+
+    def execute(self):
+        self.client.queries.append((self.table, len(self.ids)))
+        rows = self.client.rows[self.table]
+        return type("Response", (), {"data": [rows[item_id] for item_id in self.ids if item_id in rows]})()
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def table(self, table):
+        return FakeQuery(self, table)
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    rows = {
+        "courses": {i: {"id": i, "title": f"Course {i}", "description": "d"} for i in range(1, 21)},
+        "tasks": {i: {"id": i, "course_id": i % 20 + 1, "title": f"Task {i}", "content": "c"}
+                  for i in range(1, 201)},
+        "resources": {i: {"id": i, "course_id": i % 20 + 1, "title": f"Resource {i}", "url": "u", "tags": []}
+                      for i in range(1, 101)}
+    }
+    mirror = CatalogMirror(FakeClient(rows), versions=None, poll_seconds=3600, reload_seconds=3600)
+    for table, table_rows in rows.items():
+        state = mirror._tables[table]
+        mirror._apply(state, [{key: row[key] for key in ("id", "course_id") if key in row}
+                              if table != "courses" else row for row in table_rows.values()], replace=True)
+        state.loaded, state.loaded_at = True, time.time()
+    monkeypatch.setattr(database_query_module, "catalog_mirror", mirror)
+    return mirror
+
+
+def test_page_hydrates_one_query(mirror):
+    rows, cursor = mirror.page("tasks", 5, course_id=2)
+    assert [row["id"] for row in rows] == [1, 21, 41, 61, 81]
+    assert cursor == 81
+    rows, cursor = mirror.page("tasks", 5, after_id=cursor, course_id=2)
+    assert [row["id"] for row in rows] == [101, 121, 141, 161, 181]
+    assert cursor is None
+    assert mirror.client.queries == [("tasks", 5), ("tasks", 5)]
+
+
+def test_list_by_courses_uses_one_query_per_table(mirror):
+    tool = database_query_module.DatabaseQueryTool()
+    result = json.loads(tool._run("list_by_courses", course_ids=list(range(1, 20)) + [999], page_size=3))
+
+    assert sorted(table for table, _ in mirror.client.queries) == ["resources", "tasks"]
+    assert result["courses"]["999"] == {"error": "Course with ID 999 not found."}
+    course = result["courses"]["2"]
+    assert [task["id"] for task in course["tasks"]] == [1, 21, 41]
+    assert [resource["id"] for resource in course["resources"]] == [1, 21, 41]
+    assert course["tasks_count"] == 10 and course["resources_count"] == 5
+    assert course["next_cursor"] == "tasks:41,resources:41"
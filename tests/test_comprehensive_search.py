@@ -0,0 +1,59 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+import tools.comprehensive_search_tool  # noqa: F401  (tools/__init__ re-exports the tool instance)
+
+search_module = sys.modules["tools.comprehensive_search_tool"]
+
+TIMEOUT = 0.4
+
+
+@pytest.fixture
+def slow_backend(monkeypatch):
+    """match_all never answers in time; tasks answer after 0.3s, the other tables at once."""
+    delays = {"courses": 0.0, "tasks": 0.3, "resources": 0.0}
+
+    def match_all(*args, **kwargs):
+        time.sleep(1.0)
+
+    def search_table(table, *args, **kwargs):
+        time.sleep(delays[table])
+        return [{"id": 1, "table": table}]
+
+    async def amatch_all(*args, **kwargs):
+        await asyncio.sleep(1.0)
+
+    async def asearch_table(table, *args, **kwargs):
+        await asyncio.sleep(delays[table])
+        return [{"id": 1, "table": table}]
+
+    monkeypatch.setattr(search_module, "match_all", match_all)
+    monkeypatch.setattr(search_module, "search_table", search_table)
+    monkeypatch.setattr(search_module, "amatch_all", amatch_all)
+    monkeypatch.setattr(search_module, "asearch_table", asearch_table)
+    monkeypatch.setattr(search_module, "COMPREHENSIVE_SEARCH_TIMEOUTS",
+                        {"courses": TIMEOUT, "tasks": TIMEOUT, "resources": TIMEOUT})
+    monkeypatch.setattr(search_module, "UNIFIED_SEARCH_TIMEOUT_SHARE", 0.5)
+
+
+def check_fallback(results, metadata, elapsed):
+    assert metadata["match_all_timed_out"]
+    # The fallback only gets what is left of the budget after match_all, so slow tasks time out
+    assert elapsed < TIMEOUT + 0.15
+    assert metadata["timed_out"] == ["tasks"]
+    assert results["courses"] and results["resources"] and results["tasks"] == []
+
+
+def test_fallback_stays_within_the_table_timeout(slow_backend):
+    started = time.perf_counter()
+    results, metadata = search_module.search_tables([1.0], 0.2, 3)
+    check_fallback(results, metadata, time.perf_counter() - started)
+
+
+def test_async_fallback_stays_within_the_table_timeout(slow_backend):
+    started = time.perf_counter()
+    results, metadata = asyncio.run(search_module.asearch_tables([1.0], 0.2, 3))
+    check_fallback(results, metadata, time.perf_counter() - started)
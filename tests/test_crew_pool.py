@@ -0,0 +1,57 @@
+import crew_pool
+from crew_pool import CrewPool, CrewWorker
+
+
+class FakeAgent:
+    step_callback = None
+
+
+class FakeTask:
+    def __init__(self, **kwargs):
+        self.output = None
+
+
+class FakeCrew:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.step_callback = None
+        self.task_callback = None
+        self.inputs = []
+
+    def kickoff(self, inputs):
+        self.inputs.append(inputs)
+        return f"answer to {inputs['user_query']}"
+
+
+def make_worker(monkeypatch):
+    monkeypatch.setattr(crew_pool, "create_educational_assistant", FakeAgent)
+    monkeypatch.setattr(crew_pool, "Task", FakeTask)
+    monkeypatch.setattr(crew_pool, "Crew", FakeCrew)
+    return CrewWorker()
+
+
+def test_crew_is_built_without_shared_memory(monkeypatch):
+    worker = make_worker(monkeypatch)
+    assert worker.crew.kwargs["memory"] is False
+
+
+def test_reset_clears_only_the_workers_own_state(monkeypatch):
+    worker = make_worker(monkeypatch)
+    callback = object()
+    assert worker.run("python tasks", step_callback=callback) == "answer to python tasks"
+    worker.task.output = "previous answer"
+
+    worker.reset()
+    assert worker.assistant.step_callback is None
+    assert worker.crew.step_callback is None
+    assert worker.task.output is None
+
+
+def test_pool_reuses_workers(monkeypatch):
+    pool = CrewPool(size=1, factory=lambda: make_worker(monkeypatch))
+    with pool.worker() as first:
+        first.run("a")
+    with pool.worker() as second:
+        second.run("b")
+    assert first is second and first.runs == 2
+    assert pool.stats()["rebuilds"] == 0
@@ -0,0 +1,19 @@
+import importlib
+
+import tiktoken
+
+from services import embedding_pipeline
+
+
+def test_import_does_not_load_the_tokenizer(monkeypatch):
+    def offline(*args, **kwargs):
+        raise OSError("no network")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", offline)
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    try:
+        module = importlib.reload(embedding_pipeline)
+        assert module._encoding is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(embedding_pipeline)
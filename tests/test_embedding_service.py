@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from services import embedding_service
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Record which path reaches the API; the disk store is skipped."""
+    calls = []
+
+    async def batched(text):
+        calls.append(("batcher", text))
+        await asyncio.sleep(0.01)
+        return [1.0, 0.0]
+
+    async def direct(**kwargs):
+        calls.append(("client", kwargs["input"][0]))
+        return type("Response", (), {"data": [type("Item", (), {"embedding": [0.0, 1.0]})()]})()
+
+    monkeypatch.setattr(embedding_service.embedding_batcher, "aembed", batched)
+    monkeypatch.setattr(embedding_service.async_openai_client.embeddings, "create", direct)
+    monkeypatch.setattr(embedding_service, "get_embedding_store", lambda: None)
+    monkeypatch.setattr(embedding_service, "_query_cache", embedding_service.EmbeddingCache())
+    return calls
+
+
+def test_aembed_query_goes_through_the_batcher(api, monkeypatch):
+    monkeypatch.setattr(embedding_service, "EMBEDDING_BATCHING_ENABLED", True)
+
+    async def scenario():
+        return await asyncio.gather(*(embedding_service.aembed_query(text)
+                                      for text in ["Python tasks", "python  TASKS", "rust"]))
+
+    assert asyncio.run(scenario()) == [[1.0, 0.0]] * 3
+    # Equivalent queries share one in-flight request
+    assert sorted(api) == [("batcher", "python tasks"), ("batcher", "rust")]
+
+
+def test_aembed_query_uses_the_client_when_batching_is_disabled(api, monkeypatch):
+    monkeypatch.setattr(embedding_service, "EMBEDDING_BATCHING_ENABLED", False)
+    assert asyncio.run(embedding_service.aembed_query("go")) == [0.0, 1.0]
+    assert api == [("client", "go")]
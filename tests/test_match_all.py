@@ -0,0 +1,100 @@
+"""memory_match_all must accept the same parameters and return the same shape as db_setup/sql/match_all.sql."""
+import os
+import re
+
+import numpy as np
+import pytest
+
+from config import VECTOR_DIM
+from services import search_backend
+from services.search_backend import COUNT_PARAMS, memory_match_all
+from services.vector_index import LocalVectorStore, VectorIndex, TABLE_COLUMNS
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db_setup", "sql",
+                        "match_all.sql")
+
+
+def read_sql():
+    with open(SQL_PATH) as f:
+        return f.read()
+
+
+def sql_parameters():
+    """Map each match_all parameter to its default (None if it has none)."""
+    signature = re.search(r"create or replace function match_all\((.*?)\)\s*returns", read_sql(), re.S).group(1)
+    parameters = {}
+    for line in signature.split(",\n"):
+        match = re.match(r"\s*(\w+)\s+[^\n]*?(?:\s+default\s+(.*))?$", line.strip())
+        parameters[match.group(1)] = match.group(2)
+    return parameters
+
+
+def sql_columns(table: str):
+    """Columns selected for table in match_all, besides similarity."""
+    select = re.search(rf"select ({table}\.id.*?) as similarity", read_sql(), re.S).group(1)
+    columns = []
+    for part in select.split(","):
+        part = part.strip()
+        alias = re.search(r"as (\w+)\)?$", part)
+        if alias:
+            columns.append(alias.group(1))
+        elif part.startswith(f"{table}."):
+            columns.append(part.split(".", 1)[1])
+    return columns
+
+
+@pytest.fixture
+def memory_store(monkeypatch):
+    rng = np.random.default_rng(0)
+    store = LocalVectorStore(client=None, refresh_seconds=3600)
+    for table, columns in TABLE_COLUMNS.items():
+        rows = [{column: f"{column} {i} " * 50 if column in ("description", "content") else i
+                 for column in columns} for i in range(20)]
+        store._indexes[table] = VectorIndex(table, rows, rng.standard_normal((20, VECTOR_DIM)).astype(np.float32))
+    monkeypatch.setattr(search_backend, "local_store", store)
+    monkeypatch.setattr(search_backend, "SEARCH_BACKEND", "local")
+    return store
+
+
+def test_count_parameters_match_sql():
+    parameters = sql_parameters()
+    for count_param in COUNT_PARAMS.values():
+        assert parameters[count_param] == "3"
+    assert {"query_embedding", "match_threshold", "include_tables", "snippet_length"} <= set(parameters)
+
+
+def test_columns_match_sql():
+    for table in TABLE_COLUMNS:
+        assert sql_columns(table) == TABLE_COLUMNS[table]
+
+
+def test_result_shape(memory_store):
+    query = memory_store._indexes["tasks"].matrix[0]
+    result = memory_match_all({"query_embedding": query.tolist(), "match_threshold": -1.0, "task_count": 5})
+
+    assert set(result) == {"courses", "tasks", "resources"}
+    assert len(result["courses"]) == 3
+    assert len(result["tasks"]) == 5
+    assert result["tasks"][0]["id"] == 0
+    for table, rows in result.items():
+        similarities = [row["similarity"] for row in rows]
+        assert similarities == sorted(similarities, reverse=True)
+        for row in rows:
+            assert set(row) == set(TABLE_COLUMNS[table]) | {"similarity"}
+
+
+def test_threshold_is_exclusive(memory_store):
+    query = memory_store._indexes["courses"].matrix[0].tolist()
+    best = memory_match_all({"query_embedding": query, "match_threshold": -1.0})["courses"][0]
+    result = memory_match_all({"query_embedding": query, "match_threshold": best["similarity"]})
+    assert best["id"] not in [row["id"] for row in result["courses"]]
+
+
+def test_include_tables_and_snippet_length(memory_store):
+    query = memory_store._indexes["courses"].matrix[0]
+    result = memory_match_all({"query_embedding": query.tolist(), "match_threshold": -1.0,
+                               "include_tables": ["courses", "tasks"], "snippet_length": 10})
+
+    assert result["resources"] == []
+    assert all(len(row["description"]) <= 10 for row in result["courses"])
+    assert all(len(row["content"]) <= 10 for row in result["tasks"])
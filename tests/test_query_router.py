@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import query_router
+from query_router import classify, extract_slots
+
+
+@pytest.mark.parametrize("text, intent, course_id, content_types", [
+    ("how many courses do you have", "count", None, ["courses"]),
+    ("how many tasks in course 2", "course_count", 2, ["tasks"]),
+    ("how many resources does course 3 have", "course_count", 3, ["resources"]),
+    ("How many tasks and resources are in course #4?", "course_count", 4, ["tasks", "resources"]),
+])
+def test_count_questions(text, intent, course_id, content_types):
+    routed, slots = classify(text)
+    assert routed == intent
+    assert slots["course_id"] == course_id
+    assert slots["content_types"] == content_types
+
+
+def test_tell_is_not_part_of_the_topic():
+    assert extract_slots("Tell me about the Blockchain course")["topic"] == "blockchain"
+
+
+class FakeDatabaseTool:
+    def _run(self, query_type, course_id=None, **kwargs):
+        if query_type == "count_all":
+            return json.dumps({"total_courses": 4, "total_tasks": 30, "total_resources": 12,
+                               "snapshot_age_seconds": 5})
+        if course_id != 3:
+            return f"Course with ID {course_id} not found."
+        return json.dumps({"course_details": {"id": 3, "title": "Rust"},
+                           "content_summary": {"total_tasks": 7, "total_resources": 2}})
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(query_router, "database_query_tool", FakeDatabaseTool())
+    return query_router.QueryRouter()
+
+
+def test_course_count_answers_for_the_course(router):
+    assert router.answer("how many resources does course 3 have") == "📊 **Rust** (course 3) has **2 resources**."
+    assert router.answer("how many tasks and resources are in course 3") == "📊 **Rust** (course 3) has **7 tasks** and **2 resources**."
+    assert router.answer("how many tasks in course 9") == "Course with ID 9 not found."
+
+
+def test_global_count_answers_the_type_asked_about(router):
+    assert router.answer("how many tasks are there").startswith("📊 We have **30 tasks** in our database.")
+    assert router.answer("how many courses, tasks and resources do you have").startswith(
+        "📊 We have **4 courses**, **30 tasks** and **12 resources** in our database.")
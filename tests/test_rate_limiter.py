@@ -0,0 +1,74 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, RATE_LIMITED, OVERLOADED, PRUNE_THRESHOLD
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_minute_bucket_limits_and_refills(clock):
+    limiter = RateLimiter(per_minute=3, per_hour=100)
+    assert [limiter.check(1) for _ in range(4)] == [None, None, None, RATE_LIMITED]
+    assert limiter.check(2) is None  # buckets are per user
+
+    clock[0] += 20  # one token back (3 per minute)
+    assert limiter.check(1) is None
+    assert limiter.check(1) == RATE_LIMITED
+
+
+def test_hour_bucket_limits(clock):
+    limiter = RateLimiter(per_minute=10, per_hour=12)
+    admitted = 0
+    for _ in range(5):
+        admitted += sum(limiter.check(1) is None for _ in range(10))
+        clock[0] += 60
+    assert admitted == 12  # the minute bucket refills, but the hour bucket regains under one token
+
+
+def test_exempt_users_are_not_limited(clock):
+    limiter = RateLimiter(per_minute=1, per_hour=1, exempt_users=[7])
+    assert all(limiter.check(7) is None for _ in range(10))
+
+
+def test_global_slots(clock):
+    limiter = RateLimiter(max_concurrent=2)
+    assert limiter.acquire() is None
+    assert limiter.acquire() is None
+    assert limiter.acquire() == OVERLOADED
+    limiter.release()
+    assert limiter.acquire() is None
+    stats = limiter.stats()
+    assert stats["in_flight"] == 2
+    assert stats["rejected_overload"] == 1
+
+
+def test_prune_is_amortized(clock):
+    limiter = RateLimiter(per_minute=5, per_hour=100)
+    for user_id in range(PRUNE_THRESHOLD):
+        limiter.check(user_id)
+    clock[0] += 3600  # everyone has refilled
+
+    limiter.check(-1)  # the next new user triggers a prune
+    assert len(limiter._users) == 1
+
+    for user_id in range(PRUNE_THRESHOLD, 3 * PRUNE_THRESHOLD):
+        limiter.check(user_id)
+    # Once pruning finds nothing to drop, it waits until the count doubles again
+    assert limiter._prune_at >= 2 * PRUNE_THRESHOLD
+
+
+def test_refund_gives_back_one_token(clock):
+    limiter = RateLimiter(per_minute=2, per_hour=100)
+    assert limiter.check(1) is None
+    assert limiter.check(1) is None
+    limiter.refund(1)
+    assert limiter.check(1) is None
+    assert limiter.check(1) == RATE_LIMITED
+
+    limiter.refund(2)  # unknown users have full buckets already
+    assert 2 not in limiter._users
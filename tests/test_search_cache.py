@@ -0,0 +1,39 @@
+from services.search_cache import SearchResultCache, make_key
+
+
+class FakeVersions:
+    def __init__(self):
+        self.versions = {"tasks": (10, "2026-01-01")}
+
+    def version(self, table):
+        return self.versions.get(table)
+
+
+def test_hit_until_the_version_changes():
+    versions = FakeVersions()
+    cache = SearchResultCache(versions)
+    key = make_key("tasks", [0.1, 0.2], 0.4, 5)
+    cache.put(key, [{"id": 1}], cache.version("tasks"))
+    assert cache.get(key) == [{"id": 1}]
+
+    versions.versions["tasks"] = (11, "2026-01-02")
+    assert cache.get(key) is None
+
+
+def test_rows_searched_before_a_change_are_not_stored():
+    versions = FakeVersions()
+    cache = SearchResultCache(versions)
+    key = make_key("tasks", [0.1, 0.2], 0.4, 5)
+    version = cache.version("tasks")  # read before the search
+    versions.versions["tasks"] = (11, "2026-01-02")  # data changed while searching
+    cache.put(key, [{"id": 1}], version)
+
+    assert cache.get(key) is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_unknown_version_is_not_cached():
+    cache = SearchResultCache(FakeVersions())
+    key = make_key("courses", [0.1], 0.4, 5)
+    cache.put(key, [{"id": 1}], cache.version("courses"))
+    assert cache.get(key) is None
@@ -0,0 +1,103 @@
+import sqlite3
+
+from session_store import SessionStore
+
+
+def make_store(tmp_path=None, **kwargs):
+    kwargs.setdefault("db_path", str(tmp_path / "sessions.db") if tmp_path else None)
+    kwargs.setdefault("flush_interval", 3600)  # flushed explicitly by the tests
+    return SessionStore(**kwargs)
+
+
+def saved_rows(store):
+    conn = sqlite3.connect(store.db_path)
+    try:
+        return {row[0]: row for row in conn.execute(
+            "SELECT user_id, started_at, last_seen, message_count, last_query FROM sessions")}
+    finally:
+        conn.close()
+
+
+def test_lru_eviction_by_entries():
+    store = make_store(max_entries=2)
+    store.record_query(1, "a")
+    store.record_query(2, "b")
+    store.record_query(1, "c")  # 1 is now most recently used
+    store.record_query(3, "d")
+    assert store.get(2) is None
+    assert store.get(1).message_count == 2
+    assert store.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    store = make_store(max_bytes=1000)
+    for user_id in range(10):
+        store.record_query(user_id, "x" * 100)
+    assert store.stats()["approx_bytes"] <= 1000
+    assert len(store) < 10
+    assert store.get(9) is not None
+
+
+def test_idle_sessions_expire():
+    store = make_store(idle_ttl=-1)
+    store.record_query(1, "a")
+    assert store.get(1) is None
+    store.record_query(2, "b")
+    store.sweep()
+    assert len(store) == 0
+
+
+def test_stored_query_is_capped():
+    store = make_store()
+    session = store.record_query(1, "x" * 100000)
+    assert len(session.last_query) < 100000
+
+
+def test_flush_writes_dirty_sessions(tmp_path):
+    store = make_store(tmp_path)
+    store.record_query(1, "a")
+    store.record_query(1, "b")
+    assert saved_rows(store) == {}
+
+    store.flush()
+    assert saved_rows(store)[1][3:] == (2, "b")
+    assert store.stats()["pending_writes"] == 0
+    store.close()
+
+
+def test_evicted_session_is_written_and_recovered(tmp_path):
+    store = make_store(tmp_path, max_entries=1)
+    store.record_query(1, "a")
+    store.record_query(2, "b")  # evicts 1 before it was written
+    assert store.get(1).message_count == 1
+    store.flush()
+    assert set(saved_rows(store)) == {1, 2}
+    store.close()
+
+
+def test_restart_continues_saved_session(tmp_path):
+    store = make_store(tmp_path)
+    store.record_query(1, "a")
+    store.record_query(1, "b")
+    store.close()
+
+    restarted = make_store(tmp_path)
+    assert restarted.get(1).message_count == 2
+    restarted.close()
+
+
+def test_session_not_in_memory_is_merged_on_flush(tmp_path):
+    store = make_store(tmp_path)
+    store.record_query(1, "a")
+    store.record_query(1, "b")
+    store.close()
+
+    # Only the most recent session is loaded, so user 1 starts fresh without reading the database
+    restarted = make_store(tmp_path, max_entries=1)
+    restarted.record_query(2, "c")
+    session = restarted.record_query(1, "d")
+    assert session.message_count == 1
+
+    restarted.flush()
+    assert saved_rows(restarted)[1][3:] == (3, "d")
+    restarted.close()
@@ -0,0 +1,70 @@
+import asyncio
+import types
+
+import pytest
+
+import telegram_bot
+import telegram_config
+from telegram_bot import EducationalTelegramBot
+
+
+class FakeMessage:
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def make_update(replies, user_id=1, chat_id=1):
+    return types.SimpleNamespace(effective_user=types.SimpleNamespace(id=user_id, first_name="x"),
+                                 effective_chat=types.SimpleNamespace(id=chat_id),
+                                 effective_message=FakeMessage(replies), callback_query=None)
+
+
+class SlowBot(EducationalTelegramBot):
+    """Replaces the coordinator work with a short sleep."""
+
+    def __init__(self):
+        super().__init__("token")
+        self.handled = 0
+
+    @telegram_bot.rate_limited
+    @telegram_bot.per_chat
+    @telegram_bot.load_shed
+    async def handle(self, update, context):
+        await asyncio.sleep(0.05)
+        self.handled += 1
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setattr(telegram_config, "MAX_PENDING_UPDATES_PER_CHAT", 2)
+    return SlowBot()
+
+
+def test_burst_in_one_chat_is_capped(bot):
+    replies = []
+
+    async def scenario():
+        await asyncio.gather(*(bot.handle(make_update(replies), None) for _ in range(5)),
+                             bot.handle(make_update(replies, user_id=2, chat_id=2), None))
+
+    asyncio.run(scenario())
+    # Two updates of chat 1 run or wait; the other three are told to wait, and chat 2 is unaffected
+    assert bot.handled == 3
+    assert replies == [telegram_config.ERROR_MESSAGES['chat_busy']] * 3
+    assert bot.busy_rejections == 3
+    assert bot.chat_locks == {}
+
+
+def test_shed_update_keeps_its_rate_limit_token(bot):
+    bot.rate_limiter = telegram_bot.RateLimiter(per_minute=2, per_hour=100, max_concurrent=0)
+    replies = []
+    for _ in range(3):
+        asyncio.run(bot.handle(make_update(replies), None))
+    assert replies == [telegram_config.ERROR_MESSAGES['overloaded']] * 3
+
+    bot.rate_limiter.max_concurrent = 1
+    asyncio.run(bot.handle(make_update(replies), None))
+    assert bot.handled == 1
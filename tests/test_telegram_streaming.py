@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from telegram_streaming import MessageStreamer, split_message
+
+
+class FakeMessage:
+    def __init__(self, bot, text):
+        self.bot = bot
+        self.text = text
+        self.deleted = False
+
+    async def edit_text(self, text, **kwargs):
+        if self.bot.fail_edits and "parse_mode" not in kwargs:
+            raise RuntimeError("network error")
+        self.text = text
+        return self
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeBot:
+    def __init__(self, fail_edits=False):
+        self.fail_edits = fail_edits
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        message = FakeMessage(self, text)
+        self.sent.append(message)
+        return message
+
+
+def test_split_message_keeps_short_text():
+    assert split_message("hello\nworld", 100) == ["hello\nworld"]
+    assert split_message("", 100) == [""]
+
+
+def test_split_message_on_line_breaks():
+    chunks = split_message("aaaa\nbbbb\ncccc", 10)
+    assert chunks == ["aaaa\nbbbb", "cccc"]
+    assert all(len(chunk) <= 10 for chunk in chunks)
+
+
+def test_split_message_force_splits_long_lines():
+    chunks = split_message("x" * 25, 10)
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def run_streamer(bot, updates, final, max_length=20):
+    async def scenario():
+        streamer = MessageStreamer(bot, chat_id=1, edit_interval=0.01, max_length=max_length)
+        await streamer.start("working")
+        for text in updates:
+            streamer.update_threadsafe(text)
+            await asyncio.sleep(0.03)
+        await streamer.finish(final)
+        return streamer
+    return asyncio.run(scenario())
+
+
+def test_streamer_rolls_over_into_new_messages():
+    bot = FakeBot()
+    streamer = run_streamer(bot, ["step 1", "step 1\n" + "y" * 30], "done")
+    # Progress grew to three messages; the short final text deletes the extra ones
+    assert len(bot.sent) == 3
+    assert [message.text for message in streamer.messages] == ["done"]
+    assert all(message.deleted for message in bot.sent[1:])
+
+
+def test_streamer_shows_final_text_after_failed_progress_edit():
+    bot = FakeBot(fail_edits=True)
+    streamer = run_streamer(bot, ["step 1"], "done")
+    assert streamer.messages[0].text == "done"
+
+
+def test_quick_answer_is_not_held_back():
+    async def scenario():
+        streamer = MessageStreamer(FakeBot(), chat_id=1, edit_interval=1.0)
+        await streamer.start("working")
+        started = time.monotonic()
+        await streamer.finish("done")
+        return streamer, time.monotonic() - started
+
+    streamer, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert streamer.messages[0].text == "done"
+
+
+def test_final_answer_waits_after_a_progress_edit():
+    async def scenario():
+        streamer = MessageStreamer(FakeBot(), chat_id=1, edit_interval=0.2)
+        await streamer.start("working")
+        streamer.update_threadsafe("step 1")
+        await asyncio.sleep(0.25)  # the progress edit lands
+        started = time.monotonic()
+        await streamer.finish("done")
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.1
@@ -0,0 +1,37 @@
+from services.search_backend import apply_threshold_ladder, threshold_tiers
+
+LADDER = [0.4, 0.2]
+
+
+def rows(*similarities):
+    return [{"id": i, "similarity": s} for i, s in enumerate(similarities)]
+
+
+def test_tiers_start_at_requested_threshold():
+    assert threshold_tiers(0.7, LADDER) == [0.7, 0.4, 0.2]
+    assert threshold_tiers(0.4, LADDER) == [0.4, 0.2]
+    assert threshold_tiers(0.3, LADDER) == [0.3, 0.2]
+
+
+def test_strictest_tier_with_enough_rows():
+    selected, used = apply_threshold_ladder(rows(0.9, 0.8, 0.5, 0.3), 0.7, 2, LADDER)
+    assert [row["similarity"] for row in selected] == [0.9, 0.8]
+    assert used == 0.7
+
+
+def test_relaxes_until_count_is_met():
+    selected, used = apply_threshold_ladder(rows(0.9, 0.5, 0.45, 0.3), 0.7, 3, LADDER)
+    assert [row["similarity"] for row in selected] == [0.9, 0.5, 0.45]
+    assert used == 0.4
+
+
+def test_returns_everything_above_the_floor_when_short():
+    selected, used = apply_threshold_ladder(rows(0.9, 0.3), 0.7, 5, LADDER)
+    assert len(selected) == 2
+    assert used == 0.2
+
+
+def test_thresholds_are_exclusive():
+    selected, used = apply_threshold_ladder(rows(0.7, 0.4), 0.7, 1, LADDER)
+    assert [row["similarity"] for row in selected] == [0.7]
+    assert used == 0.4
@@ -1,33 +1,163 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Type, List, Optional
 from pydantic import BaseModel, Field
-from supabase import create_client
-import openai
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
 import json
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
+import time
+from config import COMPREHENSIVE_SEARCH_WORKERS, COMPREHENSIVE_SEARCH_TIMEOUTS, UNIFIED_SEARCH_TIMEOUT_SHARE
+from services.embedding_service import embed_query, aembed_query
+from services.search_backend import (search_table, match_all, asearch_table, amatch_all, threshold_tiers,
+                                     apply_threshold_ladder)
 
-# Initialize clients
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+SEARCH_TABLES = ['courses', 'tasks', 'resources']
 
+# Descriptions and contents are shown cut to this many characters; the server sends one more
+# so we can still tell whether to add "..."
+SNIPPET_LENGTH = 200
 
-def embed_query(text: str):
-    """Generate embedding for search query."""
+# Shared pool so the three table searches run in parallel
+search_executor = ThreadPoolExecutor(max_workers=COMPREHENSIVE_SEARCH_WORKERS,
+                                     thread_name_prefix="comprehensive-search")
+
+
+def _timed_search(table: str, query_embedding, similarity_threshold: float, limit: int):
+    """Run one table search and return (rows, elapsed_ms)."""
+    started = time.perf_counter()
+    rows = search_table(table, query_embedding, similarity_threshold, limit, snippet_length=SNIPPET_LENGTH + 1)
+    return rows, round((time.perf_counter() - started) * 1000, 1)
+
+
+def _remaining(table: str, started: float) -> float:
+    """Seconds left of table's timeout, counted from started."""
+    return max(0.0, COMPREHENSIVE_SEARCH_TIMEOUTS[table] - (time.perf_counter() - started))
+
+
+def search_all_tables(query_embedding, similarity_threshold: float, limit: int, tables=None, started=None):
+    """Search every table concurrently; slow tables return [] once their timeout passes.
+
+    Timeouts count from started (default now), so a caller that already spent part of the budget
+    passes its own start time.
+    """
+    started = started or time.perf_counter()
+    futures = {
+        table: search_executor.submit(_timed_search, table, query_embedding, similarity_threshold, limit)
+        for table in (tables or SEARCH_TABLES)
+    }
+
+    results = {}
+    metadata = {'timings_ms': {}, 'timed_out': [], 'failed': []}
+    for table, future in futures.items():
+        try:
+            results[table], metadata['timings_ms'][table] = future.result(timeout=_remaining(table, started))
+        except FutureTimeoutError:
+            results[table] = []
+            metadata['timed_out'].append(table)
+            print(f"{table.capitalize()[:-1]} search timed out after {COMPREHENSIVE_SEARCH_TIMEOUTS[table]}s")
+        except Exception as e:
+            results[table] = []
+            metadata['failed'].append(table)
+            print(f"{table.capitalize()[:-1]} search failed: {e}")
+
+    metadata['mode'] = 'parallel'
+    metadata['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return results, metadata
+
+
+async def _atimed_search(table: str, query_embedding, similarity_threshold: float, limit: int, timeout: float):
+    """Async _timed_search, giving up after timeout seconds."""
+    started = time.perf_counter()
+    rows = await asyncio.wait_for(
+        asearch_table(table, query_embedding, similarity_threshold, limit, snippet_length=SNIPPET_LENGTH + 1),
+        timeout=timeout)
+    return rows, round((time.perf_counter() - started) * 1000, 1)
+
+
+async def asearch_all_tables(query_embedding, similarity_threshold: float, limit: int, tables=None,
+                             started=None):
+    """Async search_all_tables: the table searches run concurrently on the event loop."""
+    started = started or time.perf_counter()
+    tables = tables or SEARCH_TABLES
+    outcomes = await asyncio.gather(
+        *(_atimed_search(table, query_embedding, similarity_threshold, limit, _remaining(table, started))
+          for table in tables),
+        return_exceptions=True)
+
+    results = {}
+    metadata = {'timings_ms': {}, 'timed_out': [], 'failed': []}
+    for table, outcome in zip(tables, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            results[table] = []
+            metadata['timed_out'].append(table)
+            print(f"{table.capitalize()[:-1]} search timed out after {COMPREHENSIVE_SEARCH_TIMEOUTS[table]}s")
+        elif isinstance(outcome, Exception):
+            results[table] = []
+            metadata['failed'].append(table)
+            print(f"{table.capitalize()[:-1]} search failed: {outcome}")
+        else:
+            results[table], metadata['timings_ms'][table] = outcome
+
+    metadata['mode'] = 'concurrent'
+    metadata['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return results, metadata
+
+
+def _match_all_timeout(tables) -> float:
+    """Time allowed for match_all: a share of the shortest per-table timeout, leaving the rest for the fallback."""
+    return min(COMPREHENSIVE_SEARCH_TIMEOUTS[table] for table in tables) * UNIFIED_SEARCH_TIMEOUT_SHARE
+
+
+def search_tables(query_embedding, similarity_threshold: float, limit: int, tables=None):
+    """Search with the single-round-trip match_all RPC, falling back to parallel per-table searches.
+
+    If match_all does not answer in time, the per-table searches run instead and return whatever
+    tables finish within what is left of their own timeouts, so the whole call stays within them.
+    """
+    tables = [table for table in (tables or SEARCH_TABLES) if table in SEARCH_TABLES] or SEARCH_TABLES
+    started = time.perf_counter()
+    timeout = _match_all_timeout(tables)
+    future = search_executor.submit(match_all, query_embedding, similarity_threshold,
+                                    {table: limit for table in tables}, tables, snippet_length=SNIPPET_LENGTH + 1)
+    try:
+        results = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        print(f"match_all timed out after {timeout}s, searching tables separately")
+        results, metadata = search_all_tables(query_embedding, similarity_threshold, limit, tables, started)
+        metadata['match_all_timed_out'] = True
+        return results, metadata
+    if results is None:
+        return search_all_tables(query_embedding, similarity_threshold, limit, tables, started)
+    return results, {'mode': 'match_all', 'total_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+
+async def asearch_tables(query_embedding, similarity_threshold: float, limit: int, tables=None):
+    """Async search_tables."""
+    tables = [table for table in (tables or SEARCH_TABLES) if table in SEARCH_TABLES] or SEARCH_TABLES
+    started = time.perf_counter()
+    timeout = _match_all_timeout(tables)
     try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return []
+        results = await asyncio.wait_for(
+            amatch_all(query_embedding, similarity_threshold, {table: limit for table in tables}, tables,
+                       snippet_length=SNIPPET_LENGTH + 1),
+            timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"match_all timed out after {timeout}s, searching tables separately")
+        results, metadata = await asearch_all_tables(query_embedding, similarity_threshold, limit, tables,
+                                                     started)
+        metadata['match_all_timed_out'] = True
+        return results, metadata
+    if results is None:
+        return await asearch_all_tables(query_embedding, similarity_threshold, limit, tables, started)
+    return results, {'mode': 'match_all', 'total_ms': round((time.perf_counter() - started) * 1000, 1)}
 
 
 class ComprehensiveSearchInput(BaseModel):
     query: str = Field(..., description="Search query for finding relevant content across all tables")
     limit_per_table: int = Field(default=3, description="Number of results per table (max 10)")
-    similarity_threshold: float = Field(default=0.7, description="Minimum similarity threshold (0-1)")
+    similarity_threshold: float = Field(default=0.7,
+                                        description="Preferred similarity threshold (0-1); automatically relaxed to 0.4, then 0.2, if too few results match")
+    tables: Optional[List[str]] = Field(default=None,
+                                        description="Tables to search: any of 'courses', 'tasks', 'resources' (default all)")
 
 
 class ComprehensiveSearchTool(BaseTool):
@@ -35,93 +165,85 @@ class ComprehensiveSearchTool(BaseTool):
     description: str = "Search across all tables (courses, tasks, resources) simultaneously to get a comprehensive view of relevant content. Use this for broad queries or when you need context from multiple sources."
     args_schema: Type[BaseModel] = ComprehensiveSearchInput
 
-    def _run(self, query: str, limit_per_table: int = 3, similarity_threshold: float = 0.7) -> str:
+    def _run(self, query: str, limit_per_table: int = 3, similarity_threshold: float = 0.7,
+             tables: Optional[List[str]] = None) -> str:
         try:
             # Generate embedding for the query
             query_embedding = embed_query(query)
             if not query_embedding:
                 return "Failed to generate embedding for query"
 
-            results = {}
             limit = min(limit_per_table, 10)
 
-            # Search courses
-            try:
-                course_result = supabase.rpc('match_courses', {
-                    'query_embedding': query_embedding,
-                    'match_threshold': similarity_threshold,
-                    'match_count': limit
-                }).execute()
-                results['courses'] = course_result.data or []
-            except Exception as e:
-                results['courses'] = []
-                print(f"Course search failed: {e}")
-
-            # Search tasks
-            try:
-                task_result = supabase.rpc('match_tasks', {
-                    'query_embedding': query_embedding,
-                    'match_threshold': similarity_threshold,
-                    'match_count': limit,
-                    'course_filter': None
-                }).execute()
-                results['tasks'] = task_result.data or []
-            except Exception as e:
-                results['tasks'] = []
-                print(f"Task search failed: {e}")
-
-            # Search resources
-            try:
-                resource_result = supabase.rpc('match_resources', {
-                    'query_embedding': query_embedding,
-                    'match_threshold': similarity_threshold,
-                    'match_count': limit,
-                    'course_filter': None
-                }).execute()
-                results['resources'] = resource_result.data or []
-            except Exception as e:
-                results['resources'] = []
-                print(f"Resource search failed: {e}")
-
-            # Format comprehensive results
-            formatted_results = {
-                'query': query,
-                'total_results': len(results['courses']) + len(results['tasks']) + len(results['resources']),
-                'courses': [
-                    {
-                        'id': c['id'],
-                        'title': c['title'],
-                        'description': c['description'][:200] + '...' if len(c['description']) > 200 else c[
-                            'description'],
-                        'similarity': round(c['similarity'], 3)
-                    } for c in results['courses']
-                ],
-                'tasks': [
-                    {
-                        'id': t['id'],
-                        'title': t['title'],
-                        'content': t['content'][:200] + '...' if len(t['content']) > 200 else t['content'],
-                        'course_id': t['course_id'],
-                        'similarity': round(t['similarity'], 3)
-                    } for t in results['tasks']
-                ],
-                'resources': [
-                    {
-                        'id': r['id'],
-                        'title': r['title'],
-                        'url': r['url'],
-                        'tags': r['tags'],
-                        'course_id': r['course_id'],
-                        'similarity': round(r['similarity'], 3)
-                    } for r in results['resources']
-                ]
-            }
-
-            return json.dumps(formatted_results, indent=2)
+            # Search the requested tables in one round trip (or in parallel as a fallback) at the
+            # lowest threshold tier, then apply the threshold ladder per table client-side
+            floor = threshold_tiers(similarity_threshold)[-1]
+            results, search_metadata = search_tables(query_embedding, floor, limit, tables)
+            return self._format(query, results, search_metadata, similarity_threshold, limit)
 
         except Exception as e:
             return f"Error in comprehensive search: {str(e)}"
 
+    async def _arun(self, query: str, limit_per_table: int = 3, similarity_threshold: float = 0.7,
+                    tables: Optional[List[str]] = None) -> str:
+        try:
+            query_embedding = await aembed_query(query)
+            if not query_embedding:
+                return "Failed to generate embedding for query"
+
+            limit = min(limit_per_table, 10)
+            floor = threshold_tiers(similarity_threshold)[-1]
+            results, search_metadata = await asearch_tables(query_embedding, floor, limit, tables)
+            return self._format(query, results, search_metadata, similarity_threshold, limit)
+
+        except Exception as e:
+            return f"Error in comprehensive search: {str(e)}"
+
+    def _format(self, query: str, results: dict, search_metadata: dict, similarity_threshold: float,
+                limit: int) -> str:
+        search_metadata['thresholds_used'] = {}
+        for table in SEARCH_TABLES:
+            results[table], search_metadata['thresholds_used'][table] = apply_threshold_ladder(
+                results.get(table, []), similarity_threshold, limit)
+
+        # Format comprehensive results
+        formatted_results = {
+            'query': query,
+            'total_results': len(results['courses']) + len(results['tasks']) + len(results['resources']),
+            'courses': [
+                {
+                    'id': c['id'],
+                    'title': c['title'],
+                    'description': c['description'][:SNIPPET_LENGTH] + '...'
+                    if len(c['description']) > SNIPPET_LENGTH else c['description'],
+                    'similarity': round(c['similarity'], 3)
+                } for c in results['courses']
+            ],
+            'tasks': [
+                {
+                    'id': t['id'],
+                    'title': t['title'],
+                    'content': t['content'][:SNIPPET_LENGTH] + '...'
+                    if len(t['content']) > SNIPPET_LENGTH else t['content'],
+                    'course_id': t['course_id'],
+                    'similarity': round(t['similarity'], 3)
+                } for t in results['tasks']
+            ],
+            'resources': [
+                {
+                    'id': r['id'],
+                    'title': r['title'],
+                    'url': r['url'],
+                    'tags': r['tags'],
+                    'course_id': r['course_id'],
+                    'similarity': round(r['similarity'], 3)
+                } for r in results['resources']
+            ],
+            'search_metadata': search_metadata
+        }
+
+        return json.dumps(formatted_results, indent=2)
+
 
 # Export tool instance
 comprehensive_search_tool = ComprehensiveSearchTool()
\ No newline at end of file
@@ -1,72 +1,74 @@
 from crewai.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
-from supabase import create_client
-import openai
 import json
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
-
-# Initialize clients
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def embed_query(text: str):
-    """Generate embedding for search query."""
-    try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return []
+from services.embedding_service import embed_query, aembed_query
+from services.search_backend import ladder_search, aladder_search, snippet
+from config import SLIM_SNIPPET_LENGTH
 
 
 class CourseSearchInput(BaseModel):
     query: str = Field(..., description="Search query for finding relevant courses")
     limit: int = Field(default=5, description="Number of courses to return (max 20)")
-    similarity_threshold: float = Field(default=0.7, description="Minimum similarity threshold (0-1)")
+    similarity_threshold: float = Field(default=0.7,
+                                        description="Preferred similarity threshold (0-1); automatically relaxed to 0.4, then 0.2, if too few results match")
+    slim: bool = Field(default=False,
+                       description="Return short snippets instead of full text (use database_query get_items to load full rows by id)")
 
 
 class CourseSearchTool(BaseTool):
     name: str = "course_search"
-    description: str = "Search for relevant courses based on semantic similarity to your query. Use this when you need to find courses related to specific topics or subjects."
+    description: str = "Search for relevant courses based on semantic similarity to your query. Use this when you need to find courses related to specific topics or subjects. Pass slim=True when you only need titles (e.g. for long lists); it returns short description snippets, and database_query get_items loads the full rows by id."
     args_schema: Type[BaseModel] = CourseSearchInput
 
-    def _run(self, query: str, limit: int = 5, similarity_threshold: float = 0.7) -> str:
+    def _run(self, query: str, limit: int = 5, similarity_threshold: float = 0.7, slim: bool = False) -> str:
         try:
             # Generate embedding for the query
             query_embedding = embed_query(query)
             if not query_embedding:
                 return "Failed to generate embedding for query"
 
-            # Perform similarity search
-            result = supabase.rpc('match_courses', {
-                'query_embedding': query_embedding,
-                'match_threshold': similarity_threshold,
-                'match_count': min(limit, 20)
-            }).execute()
+            # Perform similarity search (one fetch, threshold ladder applied client-side)
+            matches, threshold_used = ladder_search('courses', query_embedding, similarity_threshold,
+                                                    min(limit, 20),
+                                                    snippet_length=SLIM_SNIPPET_LENGTH + 1 if slim else None)
+            return self._format(query, matches, threshold_used, slim)
 
-            if not result.data:
-                return f"No courses found for query: '{query}'"
+        except Exception as e:
+            return f"Error searching courses: {str(e)}"
 
-            # Format results
-            courses = []
-            for course in result.data:
-                courses.append({
-                    'id': course['id'],
-                    'title': course['title'],
-                    'description': course['description'],
-                    'similarity': round(course['similarity'], 3)
-                })
+    async def _arun(self, query: str, limit: int = 5, similarity_threshold: float = 0.7, slim: bool = False) -> str:
+        try:
+            query_embedding = await aembed_query(query)
+            if not query_embedding:
+                return "Failed to generate embedding for query"
 
-            return json.dumps(courses, indent=2)
+            matches, threshold_used = await aladder_search('courses', query_embedding, similarity_threshold,
+                                                           min(limit, 20),
+                                                           snippet_length=SLIM_SNIPPET_LENGTH + 1 if slim else None)
+            return self._format(query, matches, threshold_used, slim)
 
         except Exception as e:
             return f"Error searching courses: {str(e)}"
 
+    def _format(self, query: str, matches, threshold_used: float, slim: bool) -> str:
+        if not matches:
+            return f"No courses found for query: '{query}'"
+
+        # Format results
+        courses = []
+        for course in matches:
+            courses.append({
+                'id': course['id'],
+                'title': course['title'],
+                'description': snippet(course['description']) if slim else course['description'],
+                'similarity': round(course['similarity'], 3)
+            })
+
+        if slim:
+            return json.dumps({'threshold_used': threshold_used, 'courses': courses}, separators=(',', ':'))
+        return json.dumps({'threshold_used': threshold_used, 'courses': courses}, indent=2)
+
 
 # Export tool instance
 course_search_tool = CourseSearchTool()
\ No newline at end of file
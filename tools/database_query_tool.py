@@ -1,19 +1,45 @@
 from crewai.tools import BaseTool
-from typing import Type, Optional
+from typing import Type, Optional, List
 from pydantic import BaseModel, Field
-from supabase import create_client
 import json
-from config import SUPABASE_URL, SUPABASE_KEY
+from services.catalog_mirror import catalog_mirror
+from services.catalog_stats import catalog_stats
+from services.search_backend import fetch_by_ids
 
-# Initialize client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+MAX_PAGE_SIZE = 100
+
+
+def parse_cursor(cursor: Optional[str]):
+    """Decode a 'table:last_id,...' cursor; None means start every list from the beginning."""
+    if not cursor:
+        return None
+    positions = {}
+    for part in cursor.split(","):
+        name, _, last_id = part.partition(":")
+        positions[name.strip()] = int(last_id)
+    return positions
+
+
+def format_cursor(positions: dict) -> Optional[str]:
+    """Encode the lists that still have rows after this page; None when every list is exhausted."""
+    parts = [f"{name}:{last_id}" for name, last_id in positions.items() if last_id is not None]
+    return ",".join(parts) or None
 
 
 class DatabaseQueryInput(BaseModel):
     query_type: str = Field(...,
-                            description="Type of query: 'count_all', 'list_courses', 'list_by_course', 'course_details', 'stats'")
+                            description="Type of query: 'count_all', 'list_courses', 'list_by_course', 'course_details', 'list_by_courses', 'courses_details', 'stats', 'get_items'")
     course_id: Optional[int] = Field(default=None, description="Course ID for specific queries")
     limit: int = Field(default=50, description="Limit for list queries")
+    page_size: Optional[int] = Field(default=None,
+                                     description="Items per page for list_courses / list_by_course (max 100; defaults to limit) and per course for list_by_courses (defaults to 10)")
+    cursor: Optional[str] = Field(default=None,
+                                  description="next_cursor from a previous list_courses / list_by_course result, to get the next page")
+    table: Optional[str] = Field(default=None,
+                                 description="Table for get_items queries: 'courses', 'tasks' or 'resources'")
+    ids: Optional[List[int]] = Field(default=None, description="Row IDs for get_items queries (max 50)")
+    course_ids: Optional[List[int]] = Field(default=None,
+                                            description="Course IDs for list_by_courses / courses_details queries (max 20)")
 
 
 class DatabaseQueryTool(BaseTool):
@@ -23,36 +49,57 @@ class DatabaseQueryTool(BaseTool):
 
     Query types:
     - 'count_all': Get counts of all courses, tasks, and resources
-    - 'list_courses': Get list of all available courses
-    - 'list_by_course': Get tasks and resources for a specific course
+    - 'list_courses': Get list of all available courses (paged; pass next_cursor back as cursor for more)
+    - 'list_by_course': Get tasks and resources for a specific course (paged the same way)
     - 'course_details': Get detailed info about a specific course
+    - 'list_by_courses' / 'courses_details': Same as list_by_course / course_details for several course_ids at once, keyed by course ID
     - 'stats': Get comprehensive statistics about the database
+    - 'get_items': Get full rows by ID (e.g. for results of a slim search); needs table and ids
     """
     args_schema: Type[BaseModel] = DatabaseQueryInput
 
-    def _run(self, query_type: str, course_id: Optional[int] = None, limit: int = 50) -> str:
+    def _run(self, query_type: str, course_id: Optional[int] = None, limit: int = 50,
+             page_size: Optional[int] = None, cursor: Optional[str] = None,
+             table: Optional[str] = None, ids: Optional[List[int]] = None,
+             course_ids: Optional[List[int]] = None) -> str:
         try:
             if query_type == "count_all":
                 return self._get_counts()
 
             elif query_type == "list_courses":
-                return self._list_courses(limit)
+                return self._list_courses(min(page_size or limit, MAX_PAGE_SIZE), cursor)
 
             elif query_type == "list_by_course":
                 if course_id is None:
                     return "Error: course_id required for list_by_course query"
-                return self._list_by_course(course_id, limit)
+                return self._list_by_course(course_id, min(page_size or limit, MAX_PAGE_SIZE), cursor)
 
             elif query_type == "course_details":
                 if course_id is None:
                     return "Error: course_id required for course_details query"
                 return self._get_course_details(course_id)
 
+            elif query_type == "list_by_courses":
+                if not course_ids:
+                    return "Error: course_ids required for list_by_courses query"
+                return self._list_by_courses(list(dict.fromkeys(course_ids))[:20],
+                                             min(page_size or 10, MAX_PAGE_SIZE))
+
+            elif query_type == "courses_details":
+                if not course_ids:
+                    return "Error: course_ids required for courses_details query"
+                return self._get_courses_details(list(dict.fromkeys(course_ids))[:20])
+
             elif query_type == "stats":
                 return self._get_comprehensive_stats()
 
+            elif query_type == "get_items":
+                if table not in ("courses", "tasks", "resources") or not ids:
+                    return "Error: table ('courses', 'tasks' or 'resources') and ids required for get_items query"
+                return self._get_items(table, ids[:50])
+
             else:
-                return f"Error: Unknown query_type '{query_type}'. Use: count_all, list_courses, list_by_course, course_details, stats"
+                return f"Error: Unknown query_type '{query_type}'. Use: count_all, list_courses, list_by_course, course_details, list_by_courses, courses_details, stats, get_items"
 
         except Exception as e:
             return f"Database query error: {str(e)}"
@@ -60,24 +107,19 @@ class DatabaseQueryTool(BaseTool):
     def _get_counts(self) -> str:
         """Get counts of all content types."""
         try:
-            # Get course count
-            courses_result = supabase.table("courses").select("id", count="exact").execute()
-            courses_count = courses_result.count
-
-            # Get tasks count
-            tasks_result = supabase.table("tasks").select("id", count="exact").execute()
-            tasks_count = tasks_result.count
-
-            # Get resources count
-            resources_result = supabase.table("resources").select("id", count="exact").execute()
-            resources_count = resources_result.count
+            # Served from the in-memory snapshot, refreshed in the background
+            snapshot = catalog_stats.get()
+            courses_count = snapshot["total_courses"]
+            tasks_count = snapshot["total_tasks"]
+            resources_count = snapshot["total_resources"]
 
             result = {
                 "total_courses": courses_count,
                 "total_tasks": tasks_count,
                 "total_resources": resources_count,
                 "total_content_items": courses_count + tasks_count + resources_count,
-                "summary": f"We have {courses_count} courses, {tasks_count} tasks, and {resources_count} resources available."
+                "summary": f"We have {courses_count} courses, {tasks_count} tasks, and {resources_count} resources available.",
+                "snapshot_age_seconds": round(catalog_stats.age(), 1)
             }
 
             return json.dumps(result, indent=2)
@@ -85,20 +127,22 @@ class DatabaseQueryTool(BaseTool):
         except Exception as e:
             return f"Error getting counts: {str(e)}"
 
-    def _list_courses(self, limit: int) -> str:
-        """Get list of all available courses."""
+    def _list_courses(self, page_size: int, cursor: Optional[str] = None) -> str:
+        """Get one page of the available courses."""
         try:
-            result = supabase.table("courses").select("id, title, description").limit(limit).execute()
+            positions = parse_cursor(cursor)
+            courses, next_id = catalog_mirror.page("courses", page_size, (positions or {}).get("courses"))
 
-            if not result.data:
+            if not courses:
                 return "No courses found in the database."
 
             courses_list = {
-                "total_courses": len(result.data),
+                "total_courses": len(courses),
+                "next_cursor": format_cursor({"courses": next_id}),
                 "courses": []
             }
 
-            for course in result.data:
+            for course in courses:
                 # Truncate description for readability
                 description = course['description']
                 if len(description) > 150:
@@ -115,55 +159,81 @@ class DatabaseQueryTool(BaseTool):
         except Exception as e:
             return f"Error listing courses: {str(e)}"
 
-    def _list_by_course(self, course_id: int, limit: int) -> str:
-        """Get tasks and resources for a specific course."""
+    def _list_by_course(self, course_id: int, page_size: int, cursor: Optional[str] = None) -> str:
+        """Get one page of tasks and resources for a specific course."""
         try:
-            # Get course info
-            course_result = supabase.table("courses").select("id, title, description").eq("id", course_id).execute()
+            # Get course info from the local catalog mirror
+            course = catalog_mirror.get_course(course_id)
 
-            if not course_result.data:
+            if course is None:
                 return f"Course with ID {course_id} not found."
 
-            course = course_result.data[0]
+            return json.dumps(self._course_content(course, page_size, parse_cursor(cursor)), indent=2)
+
+        except Exception as e:
+            return f"Error getting course content: {str(e)}"
 
-            # Get tasks for this course
-            tasks_result = supabase.table("tasks").select("id, title, content").eq("course_id", course_id).limit(
-                limit).execute()
+    def _course_content(self, course: dict, page_size: int, positions: Optional[dict] = None,
+                        pages: Optional[dict] = None) -> dict:
+        """Build the list_by_course result for one course, from pages if they were already fetched."""
+        course_id = course['id']
+
+        # Get the next page of tasks and resources; lists missing from a cursor are finished
+        if pages is None:
+            pages = {}
+            for name in ("tasks", "resources"):
+                if positions is not None and name not in positions:
+                    pages[name] = ([], None)
+                else:
+                    pages[name] = catalog_mirror.page(name, page_size, (positions or {}).get(name), course_id)
+        tasks, resources = pages["tasks"][0], pages["resources"][0]
+        summary = catalog_mirror.course_summary(course_id)
+
+        return {
+            "course": {
+                "id": course['id'],
+                "title": course['title'],
+                "description": course['description'][:200] + "..." if len(course['description']) > 200 else course[
+                    'description']
+            },
+            "tasks_count": summary["tasks"],
+            "resources_count": summary["resources"],
+            "next_cursor": format_cursor({name: page[1] for name, page in pages.items()}),
+            "tasks": [
+                {
+                    "id": task['id'],
+                    "title": task['title'],
+                    "content": task['content'][:100] + "..." if len(task['content']) > 100 else task['content']
+                }
+                for task in tasks
+            ],
+            "resources": [
+                {
+                    "id": resource['id'],
+                    "title": resource['title'],
+                    "url": resource['url'],
+                    "tags": resource['tags']
+                }
+                for resource in resources
+            ]
+        }
 
-            # Get resources for this course
-            resources_result = supabase.table("resources").select("id, title, url, tags").eq("course_id",
-                                                                                             course_id).limit(
-                limit).execute()
+    def _list_by_courses(self, course_ids: List[int], page_size: int) -> str:
+        """Get the first page of tasks and resources for several courses, keyed by course ID."""
+        try:
+            courses = {course_id: catalog_mirror.get_course(course_id) for course_id in course_ids}
+            found = [course_id for course_id, course in courses.items() if course is not None]
 
-            result = {
-                "course": {
-                    "id": course['id'],
-                    "title": course['title'],
-                    "description": course['description'][:200] + "..." if len(course['description']) > 200 else course[
-                        'description']
-                },
-                "tasks_count": len(tasks_result.data),
-                "resources_count": len(resources_result.data),
-                "tasks": [
-                    {
-                        "id": task['id'],
-                        "title": task['title'],
-                        "content": task['content'][:100] + "..." if len(task['content']) > 100 else task['content']
-                    }
-                    for task in tasks_result.data[:10]  # Show first 10
-                ],
-                "resources": [
-                    {
-                        "id": resource['id'],
-                        "title": resource['title'],
-                        "url": resource['url'],
-                        "tags": resource['tags']
-                    }
-                    for resource in resources_result.data[:10]  # Show first 10
-                ]
-            }
+            # One query per table for the first pages of every course
+            pages = {name: catalog_mirror.course_pages(name, page_size, found) for name in ("tasks", "resources")}
 
-            return json.dumps(result, indent=2)
+            results = {}
+            for course_id, course in courses.items():
+                results[str(course_id)] = (
+                    self._course_content(course, page_size, pages={name: pages[name][course_id] for name in pages})
+                    if course is not None else {"error": f"Course with ID {course_id} not found."})
+
+            return json.dumps({"courses": results}, indent=2)
 
         except Exception as e:
             return f"Error getting course content: {str(e)}"
@@ -171,44 +241,72 @@ class DatabaseQueryTool(BaseTool):
     def _get_course_details(self, course_id: int) -> str:
         """Get detailed information about a specific course."""
         try:
-            # Get course info
-            course_result = supabase.table("courses").select("*").eq("id", course_id).execute()
+            # Get course info from the local catalog mirror (no embedding column)
+            course = catalog_mirror.get_course(course_id)
 
-            if not course_result.data:
+            if course is None:
                 return f"Course with ID {course_id} not found."
 
-            course = course_result.data[0]
+            return json.dumps(self._course_details(course), indent=2)
 
-            # Get counts for this course
-            tasks_count = supabase.table("tasks").select("id", count="exact").eq("course_id", course_id).execute().count
-            resources_count = supabase.table("resources").select("id", count="exact").eq("course_id",
-                                                                                         course_id).execute().count
+        except Exception as e:
+            return f"Error getting course details: {str(e)}"
 
-            result = {
-                "course_details": {
-                    "id": course['id'],
-                    "title": course['title'],
-                    "description": course['description'],
-                    "created_at": course.get('created_at'),
-                    "updated_at": course.get('updated_at')
-                },
-                "content_summary": {
-                    "total_tasks": tasks_count,
-                    "total_resources": resources_count,
-                    "total_learning_items": tasks_count + resources_count
-                }
+    def _course_details(self, course: dict) -> dict:
+        """Build the course_details result for one course."""
+        # Get counts for this course
+        summary = catalog_mirror.course_summary(course['id'])
+        tasks_count = summary["tasks"]
+        resources_count = summary["resources"]
+
+        return {
+            "course_details": {
+                "id": course['id'],
+                "title": course['title'],
+                "description": course['description'],
+                "created_at": course.get('created_at'),
+                "updated_at": course.get('updated_at')
+            },
+            "content_summary": {
+                "total_tasks": tasks_count,
+                "total_resources": resources_count,
+                "total_learning_items": tasks_count + resources_count
             }
+        }
 
-            return json.dumps(result, indent=2)
+    def _get_courses_details(self, course_ids: List[int]) -> str:
+        """Get detailed information about several courses, keyed by course ID."""
+        try:
+            results = {}
+            for course_id in course_ids:
+                course = catalog_mirror.get_course(course_id)
+                results[str(course_id)] = (self._course_details(course) if course is not None
+                                           else {"error": f"Course with ID {course_id} not found."})
+
+            return json.dumps({"courses": results}, indent=2)
 
         except Exception as e:
             return f"Error getting course details: {str(e)}"
 
+    def _get_items(self, table: str, ids: List[int]) -> str:
+        """Get full rows (without embeddings) for the given IDs."""
+        try:
+            items = fetch_by_ids(table, ids)
+
+            if not items:
+                return f"No {table} found with IDs {ids}."
+
+            return json.dumps({table: items}, indent=2)
+
+        except Exception as e:
+            return f"Error getting {table}: {str(e)}"
+
     def _get_comprehensive_stats(self) -> str:
         """Get comprehensive statistics about the database."""
         try:
-            # Get all courses with their content counts
-            courses_result = supabase.table("courses").select("id, title").execute()
+            # Per-course task/resource counts from the in-memory snapshot (one grouped query per refresh)
+            snapshot = catalog_stats.get()
+            courses = snapshot["courses"]
 
             stats = {
                 "database_overview": {},
@@ -217,31 +315,27 @@ class DatabaseQueryTool(BaseTool):
             }
 
             # Overall counts
-            total_courses = len(courses_result.data)
-            total_tasks = supabase.table("tasks").select("id", count="exact").execute().count
-            total_resources = supabase.table("resources").select("id", count="exact").execute().count
+            total_courses = snapshot["total_courses"]
+            total_tasks = snapshot["total_tasks"]
+            total_resources = snapshot["total_resources"]
 
             stats["database_overview"] = {
                 "total_courses": total_courses,
                 "total_tasks": total_tasks,
                 "total_resources": total_resources,
                 "avg_tasks_per_course": round(total_tasks / total_courses, 1) if total_courses > 0 else 0,
-                "avg_resources_per_course": round(total_resources / total_courses, 1) if total_courses > 0 else 0
+                "avg_resources_per_course": round(total_resources / total_courses, 1) if total_courses > 0 else 0,
+                "snapshot_age_seconds": round(catalog_stats.age(), 1)
             }
 
             # Per-course breakdown
-            for course in courses_result.data:
-                course_tasks = supabase.table("tasks").select("id", count="exact").eq("course_id",
-                                                                                      course['id']).execute().count
-                course_resources = supabase.table("resources").select("id", count="exact").eq("course_id", course[
-                    'id']).execute().count
-
+            for course in courses:
                 stats["courses_breakdown"].append({
-                    "course_id": course['id'],
+                    "course_id": course['course_id'],
                     "course_title": course['title'],
-                    "tasks": course_tasks,
-                    "resources": course_resources,
-                    "total_content": course_tasks + course_resources
+                    "tasks": course['task_count'],
+                    "resources": course['resource_count'],
+                    "total_content": course['task_count'] + course['resource_count']
                 })
 
             return json.dumps(stats, indent=2)
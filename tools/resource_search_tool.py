@@ -1,34 +1,17 @@
 from crewai.tools import BaseTool
 from typing import Type, Optional
 from pydantic import BaseModel, Field
-from supabase import create_client
-import openai
 import json
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
-
-# Initialize clients
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def embed_query(text: str):
-    """Generate embedding for search query."""
-    try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return []
+from services.embedding_service import embed_query, aembed_query
+from services.search_backend import ladder_search, aladder_search
 
 
 class ResourceSearchInput(BaseModel):
     query: str = Field(..., description="Search query for finding relevant resources")
     course_id: Optional[int] = Field(default=None, description="Optional course ID to filter resources")
     limit: int = Field(default=5, description="Number of resources to return (max 20)")
-    similarity_threshold: float = Field(default=0.7, description="Minimum similarity threshold (0-1)")
+    similarity_threshold: float = Field(default=0.7,
+                                        description="Preferred similarity threshold (0-1); automatically relaxed to 0.4, then 0.2, if too few results match")
 
 
 class ResourceSearchTool(BaseTool):
@@ -44,34 +27,46 @@ class ResourceSearchTool(BaseTool):
             if not query_embedding:
                 return "Failed to generate embedding for query"
 
-            # Perform similarity search
-            result = supabase.rpc('match_resources', {
-                'query_embedding': query_embedding,
-                'match_threshold': similarity_threshold,
-                'match_count': min(limit, 20),
-                'course_filter': course_id
-            }).execute()
+            # Perform similarity search (one fetch, threshold ladder applied client-side)
+            matches, threshold_used = ladder_search('resources', query_embedding, similarity_threshold,
+                                                    min(limit, 20), course_id)
+            return self._format(query, matches, threshold_used)
 
-            if not result.data:
-                return f"No resources found for query: '{query}'"
+        except Exception as e:
+            return f"Error searching resources: {str(e)}"
 
-            # Format results
-            resources = []
-            for resource in result.data:
-                resources.append({
-                    'id': resource['id'],
-                    'title': resource['title'],
-                    'url': resource['url'],
-                    'tags': resource['tags'],
-                    'course_id': resource['course_id'],
-                    'similarity': round(resource['similarity'], 3)
-                })
+    async def _arun(self, query: str, course_id: Optional[int] = None, limit: int = 5,
+                    similarity_threshold: float = 0.7) -> str:
+        try:
+            query_embedding = await aembed_query(query)
+            if not query_embedding:
+                return "Failed to generate embedding for query"
 
-            return json.dumps(resources, indent=2)
+            matches, threshold_used = await aladder_search('resources', query_embedding, similarity_threshold,
+                                                           min(limit, 20), course_id)
+            return self._format(query, matches, threshold_used)
 
         except Exception as e:
             return f"Error searching resources: {str(e)}"
 
+    def _format(self, query: str, matches, threshold_used: float) -> str:
+        if not matches:
+            return f"No resources found for query: '{query}'"
+
+        # Format results
+        resources = []
+        for resource in matches:
+            resources.append({
+                'id': resource['id'],
+                'title': resource['title'],
+                'url': resource['url'],
+                'tags': resource['tags'],
+                'course_id': resource['course_id'],
+                'similarity': round(resource['similarity'], 3)
+            })
+
+        return json.dumps({'threshold_used': threshold_used, 'resources': resources}, indent=2)
+
 
 # Export tool instance
 resource_search_tool = ResourceSearchTool()
\ No newline at end of file
@@ -1,76 +1,78 @@
 from crewai.tools import BaseTool
 from typing import Type, Optional
 from pydantic import BaseModel, Field
-from supabase import create_client
-import openai
 import json
-from config import SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, EMBEDDING_MODEL
-
-# Initialize clients
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-
-def embed_query(text: str):
-    """Generate embedding for search query."""
-    try:
-        response = openai_client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding failed: {e}")
-        return []
+from services.embedding_service import embed_query, aembed_query
+from services.search_backend import ladder_search, aladder_search, snippet
+from config import SLIM_SNIPPET_LENGTH
 
 
 class TaskSearchInput(BaseModel):
     query: str = Field(..., description="Search query for finding relevant tasks")
     course_id: Optional[int] = Field(default=None, description="Optional course ID to filter tasks")
     limit: int = Field(default=5, description="Number of tasks to return (max 20)")
-    similarity_threshold: float = Field(default=0.7, description="Minimum similarity threshold (0-1)")
+    similarity_threshold: float = Field(default=0.7,
+                                        description="Preferred similarity threshold (0-1); automatically relaxed to 0.4, then 0.2, if too few results match")
+    slim: bool = Field(default=False,
+                       description="Return short snippets instead of full text (use database_query get_items to load full rows by id)")
 
 
 class TaskSearchTool(BaseTool):
     name: str = "task_search"
-    description: str = "Search for relevant tasks based on semantic similarity. Can optionally filter by course ID. Use this when you need to find specific tasks or assignments."
+    description: str = "Search for relevant tasks based on semantic similarity. Can optionally filter by course ID. Use this when you need to find specific tasks or assignments. Pass slim=True when you only need titles (e.g. for long lists); it returns short content snippets, and database_query get_items loads the full rows by id."
     args_schema: Type[BaseModel] = TaskSearchInput
 
     def _run(self, query: str, course_id: Optional[int] = None, limit: int = 5,
-             similarity_threshold: float = 0.7) -> str:
+             similarity_threshold: float = 0.7, slim: bool = False) -> str:
         try:
             # Generate embedding for the query
             query_embedding = embed_query(query)
             if not query_embedding:
                 return "Failed to generate embedding for query"
 
-            # Perform similarity search
-            result = supabase.rpc('match_tasks', {
-                'query_embedding': query_embedding,
-                'match_threshold': similarity_threshold,
-                'match_count': min(limit, 20),
-                'course_filter': course_id
-            }).execute()
+            # Perform similarity search (one fetch, threshold ladder applied client-side)
+            matches, threshold_used = ladder_search('tasks', query_embedding, similarity_threshold,
+                                                    min(limit, 20), course_id,
+                                                    snippet_length=SLIM_SNIPPET_LENGTH + 1 if slim else None)
+            return self._format(query, matches, threshold_used, slim)
 
-            if not result.data:
-                return f"No tasks found for query: '{query}'"
+        except Exception as e:
+            return f"Error searching tasks: {str(e)}"
 
-            # Format results
-            tasks = []
-            for task in result.data:
-                tasks.append({
-                    'id': task['id'],
-                    'title': task['title'],
-                    'content': task['content'],
-                    'course_id': task['course_id'],
-                    'similarity': round(task['similarity'], 3)
-                })
+    async def _arun(self, query: str, course_id: Optional[int] = None, limit: int = 5,
+                    similarity_threshold: float = 0.7, slim: bool = False) -> str:
+        try:
+            query_embedding = await aembed_query(query)
+            if not query_embedding:
+                return "Failed to generate embedding for query"
 
-            return json.dumps(tasks, indent=2)
+            matches, threshold_used = await aladder_search('tasks', query_embedding, similarity_threshold,
+                                                           min(limit, 20), course_id,
+                                                           snippet_length=SLIM_SNIPPET_LENGTH + 1 if slim else None)
+            return self._format(query, matches, threshold_used, slim)
 
         except Exception as e:
             return f"Error searching tasks: {str(e)}"
 
+    def _format(self, query: str, matches, threshold_used: float, slim: bool) -> str:
+        if not matches:
+            return f"No tasks found for query: '{query}'"
+
+        # Format results
+        tasks = []
+        for task in matches:
+            tasks.append({
+                'id': task['id'],
+                'title': task['title'],
+                'content': snippet(task['content']) if slim else task['content'],
+                'course_id': task['course_id'],
+                'similarity': round(task['similarity'], 3)
+            })
+
+        if slim:
+            return json.dumps({'threshold_used': threshold_used, 'tasks': tasks}, separators=(',', ':'))
+        return json.dumps({'threshold_used': threshold_used, 'tasks': tasks}, indent=2)
+
 
 # Export tool instance
 task_search_tool = TaskSearchTool()
\ No newline at end of file